@@ -4,113 +4,1105 @@ import pandas as pd
 import mysql.connector
 from mysql.connector import Error
 import os # Importar o módulo os para manipular caminhos de arquivo
+import csv
+import datetime
+import functools
+import glob
+import hashlib
+import itertools
+import multiprocessing
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from decimal import Decimal
 
 load_dotenv()
 
 user = os.getenv("LOGIN")
 password = os.getenv("PASSWORD")
 
-def gerar_sql_create_table(caminho_excel, nome_tabela):
+# --- Inferência de tipos das colunas ---
+# Linhas lidas do Excel para escolher o tipo de cada coluna
+AMOSTRA_INFERENCIA = 1000
+# Tamanhos de VARCHAR oferecidos; acima do último, TEXT
+TAMANHOS_VARCHAR = (16, 32, 64, 128, 255, 512, 1024, 2048)
+# Folga sobre o maior texto da amostra (linhas fora dela podem ser maiores)
+FOLGA_VARCHAR = 1.5
+# Folga sobre o maior inteiro da amostra antes de passar de INT para BIGINT
+FOLGA_INTEIRO = 2
+# Casas decimais máximas de um DECIMAL inferido
+ESCALA_MAXIMA = 10
+TIPO_PADRAO = "VARCHAR(255)"
+
+def limpar_nome_coluna(coluna):
+    """Nome de coluna válido para o MySQL: só letras, números e '_'."""
+    return ''.join(e for e in str(coluna) if e.isalnum() or e == '_').replace(' ', '_')
+
+def _tipo_inteiro(minimo, maximo):
+    """INT, ou BIGINT se a amostra (com folga) não cabe no INT; nunca TINYINT/SMALLINT."""
+    if minimo * FOLGA_INTEIRO >= -2**31 and maximo * FOLGA_INTEIRO < 2**31:
+        return "INT"
+    return "BIGINT"
+
+def _tipo_decimal(valores):
+    """DECIMAL(p, s) que comporta os valores da amostra, com 2 dígitos de folga."""
+    inteiros, escala = 1, 0
+    for valor in valores:
+        _, digitos, expoente = Decimal(str(valor)).normalize().as_tuple()
+        if expoente < 0:
+            escala = max(escala, min(-expoente, ESCALA_MAXIMA))
+        inteiros = max(inteiros, len(digitos) + expoente)
+    precisao = min(inteiros + 2 + escala, 65)
+    return f"DECIMAL({precisao},{escala})"
+
+def _tipo_texto(valores):
+    maior = max(len(str(v)) for v in valores)
+    for tamanho in TAMANHOS_VARCHAR:
+        if tamanho >= maior * FOLGA_VARCHAR:
+            return f"VARCHAR({tamanho})"
+    return "TEXT"
+
+def inferir_tipo_coluna(serie):
     """
-    Gera um script SQL CREATE TABLE a partir dos cabeçalhos da primeira linha de um arquivo Excel.
+    Escolhe o tipo MySQL de uma coluna a partir de uma amostra dos seus valores.
+
+    Inteiros viram INT (BIGINT se o intervalo pede); números com
+    casas decimais, DECIMAL; datas sem horário, DATE; com horário,
+    DATETIME; verdadeiro/falso, TINYINT(1); o resto, VARCHAR do tamanho
+    do maior texto (com folga). Textos só de dígitos com zero à esquerda
+    (códigos, CEPs) continuam texto.
     """
-    try:
-        df = pd.read_excel(caminho_excel, nrows=0)
-        colunas = df.columns.tolist()
+    valores = serie.dropna()
+    if valores.empty:
+        return TIPO_PADRAO
 
-        if not colunas:
-            return "Nenhum cabeçalho de coluna encontrado no arquivo Excel."
+    if pd.api.types.infer_dtype(valores, skipna=True) == "boolean":
+        return "TINYINT(1)"
+    if pd.api.types.is_datetime64_any_dtype(valores):
+        datas = pd.DatetimeIndex(valores)
+        return "DATE" if (datas == datas.normalize()).all() else "DATETIME"
+
+    if not pd.api.types.is_numeric_dtype(valores):
+        if valores.map(lambda v: isinstance(v, (datetime.datetime, datetime.date))).all():
+            com_hora = valores.map(lambda v: isinstance(v, datetime.datetime) and v.time() != datetime.time())
+            return "DATETIME" if com_hora.any() else "DATE"
+        textos = valores.astype(str).str.strip()
+        if textos.str.match(r'^0\d').any():
+            return _tipo_texto(valores)
+        numeros = pd.to_numeric(textos, errors='coerce')
+        if numeros.isna().any():
+            return _tipo_texto(valores)
+        valores = numeros
+
+    # "inf"/"Infinity" não cabem em DECIMAL nem em INT: continuam texto
+    if valores.abs().eq(float("inf")).any():
+        return _tipo_texto(serie.dropna())
+
+    # Inteiros (colunas inteiras com células vazias chegam como float)
+    if (valores == valores.round()).all() and valores.abs().max() < 2**63:
+        return _tipo_inteiro(int(valores.min()), int(valores.max()))
+    return _tipo_decimal(valores)
+
+def inferir_tipos_colunas(df, tipos_forcados=None):
+    """
+    Tipos MySQL de todas as colunas de um DataFrame (amostra do Excel).
+
+    Args:
+        df (pandas.DataFrame): Amostra das linhas
+        tipos_forcados (dict): Tipos fixos por coluna, pelo nome original
+                               ou pelo nome já limpo; ex.: {"codigo": "CHAR(7)"}
+
+    Returns:
+        dict: nome da coluna (limpo) -> tipo SQL, na ordem das colunas
+    """
+    tipos_forcados = tipos_forcados or {}
+    tipos = {}
+    for coluna in df.columns:
+        coluna_sql = limpar_nome_coluna(coluna)
+        tipo = tipos_forcados.get(coluna, tipos_forcados.get(coluna_sql))
+        tipos[coluna_sql] = tipo or inferir_tipo_coluna(df[coluna])
+    return tipos
+
+def montar_sql_create_table(nome_tabela, tipos):
+    """CREATE TABLE IF NOT EXISTS com as colunas e tipos informados ({coluna: tipo})."""
+    sql_script = f"CREATE TABLE IF NOT EXISTS `{nome_tabela}` (\n" # Adicionado IF NOT EXISTS e backticks
+    # Envolva os nomes das colunas com backticks
+    sql_script += ",\n".join(f"    `{coluna_sql}` {tipo}" for coluna_sql, tipo in tipos.items())
+    sql_script += "\n);"
+    return sql_script
 
-        sql_script = f"CREATE TABLE IF NOT EXISTS `{nome_tabela}` (\n" # Adicionado IF NOT EXISTS e backticks
+def gerar_sql_create_table(caminho_excel, nome_tabela, linhas_amostra=AMOSTRA_INFERENCIA, tipos_forcados=None):
+    """
+    Gera um script SQL CREATE TABLE a partir de um arquivo Excel.
+
+    Os nomes das colunas vêm dos cabeçalhos da primeira linha, pelas mesmas
+    regras da importação (_nomes_colunas); os tipos são inferidos das
+    primeiras linhas_amostra linhas (veja inferir_tipo_coluna), exceto os
+    informados em tipos_forcados.
+    """
+    try:
+        # Sem cabeçalho do pandas: a primeira linha passa por _nomes_colunas
+        bruto = pd.read_excel(caminho_excel, header=None, nrows=linhas_amostra + 1)
+        bruto = bruto.astype(object).where(bruto.notna(), None)
+        lido = _cabecalho_e_amostra(bruto.itertuples(index=False, name=None), linhas_amostra, tipos_forcados)
 
-        for i, coluna in enumerate(colunas):
-            coluna_sql = ''.join(e for e in coluna if e.isalnum() or e == '_').replace(' ', '_')
-            sql_script += f"    `{coluna_sql}` VARCHAR(255)" # Envolva os nomes das colunas com backticks
-            if i < len(colunas) - 1:
-                sql_script += ",\n"
-            else:
-                sql_script += "\n"
+        if lido is None:
+            return "Nenhum cabeçalho de coluna encontrado no arquivo Excel."
 
-        sql_script += ");"
-        return sql_script
+        return montar_sql_create_table(nome_tabela, lido[1])
 
     except FileNotFoundError:
         return f"Erro: O arquivo '{caminho_excel}' não foi encontrado."
     except Exception as e:
         return f"Ocorreu um erro ao gerar o SQL CREATE TABLE: {e}"
 
-def importar_excel_para_mysql(caminho_excel, db_config):
+# --- Importação em streaming ---
+# Linhas inseridas (e confirmadas com COMMIT) por vez
+LINHAS_POR_LOTE = 5000
+# Progresso de cada importação, atualizado na mesma transação de cada lote
+TABELA_CONTROLE = "importacoes_excel"
+CREATE_CONTROLE_SQL = f"""CREATE TABLE IF NOT EXISTS `{TABELA_CONTROLE}` (
+    tabela VARCHAR(64) NOT NULL PRIMARY KEY,
+    arquivo VARCHAR(500) NOT NULL,
+    tamanho BIGINT NOT NULL,
+    modificado DOUBLE NOT NULL,
+    hash_arquivo CHAR(64) NULL,
+    linhas INT UNSIGNED NOT NULL DEFAULT 0,
+    concluida TINYINT(1) NOT NULL DEFAULT 0,
+    atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);"""
+
+# Carga em massa: LOAD DATA LOCAL INFILE a partir de um TSV temporário
+MODO_LOTES = "lotes"            # INSERT em lotes (executemany)
+MODO_LOAD_DATA = "load_data"    # LOAD DATA LOCAL INFILE, com volta para lotes se recusado
+LINHAS_POR_CARGA = 100000       # Linhas por arquivo TSV (uma carga e um COMMIT cada)
+# Erros de LOAD DATA LOCAL desativado no cliente ou no servidor
+ERROS_LOCAL_INFILE = (1148, 2068, 3948)
+# Caracteres escapados no TSV (ESCAPED BY '\\' do LOAD DATA)
+_ESCAPES_TSV = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\0": "\\0"})
+
+# Importação incremental: chave natural declarada e hash do conteúdo de cada linha
+COLUNA_HASH = "_hash_linha"                             # MD5 (hex) da linha, gravado na tabela
+TIPO_HASH = "CHAR(32) CHARACTER SET ascii"
+LINHAS_POR_EXCLUSAO = 1000                              # Hashes por DELETE das linhas ausentes
+BLOCO_HASH_ARQUIVO = 1024 * 1024                        # Bytes lidos por vez no SHA-256 do arquivo
+
+def ler_linhas_excel(caminho_excel, planilha=None):
+    """
+    Linhas de uma planilha de um Excel (padrão: a ativa), uma tupla por vez (a primeira é o cabeçalho).
+
+    O arquivo é aberto em modo somente leitura: as linhas são lidas do
+    disco à medida que são pedidas, sem carregar a planilha inteira.
+    """
+    from openpyxl import load_workbook
+
+    livro = load_workbook(caminho_excel, read_only=True, data_only=True)
+    try:
+        folha = livro[planilha] if planilha is not None else livro.active
+        yield from folha.iter_rows(values_only=True)
+    finally:
+        livro.close()
+
+def _linhas_de_dados(linhas, total_colunas):
+    """Linhas com o tamanho do cabeçalho, sem as totalmente vazias (fim da planilha)."""
+    for linha in linhas:
+        if all(valor is None or valor == "" for valor in linha):
+            continue
+        linha = tuple(linha[:total_colunas])
+        yield linha + (None,) * (total_colunas - len(linha))
+
+def _criar_controle(cursor):
+    """Cria a tabela de controle (ou acrescenta hash_arquivo a uma criada antes dele)."""
+    cursor.execute(CREATE_CONTROLE_SQL)
+    cursor.execute(f"SHOW COLUMNS FROM `{TABELA_CONTROLE}` LIKE 'hash_arquivo'")
+    if cursor.fetchone() is None:
+        cursor.execute(f"ALTER TABLE `{TABELA_CONTROLE}` ADD COLUMN hash_arquivo CHAR(64) NULL AFTER modificado")
+
+def _retomar_importacao(cursor, nome_tabela, caminho_excel, recomecar):
+    """
+    Linhas já importadas deste arquivo (as próximas começam daí), ou None se não há o que fazer.
+
+    A importação é identificada pela tabela; o arquivo, pelo tamanho e pela
+    data de modificação. recomecar=True apaga as linhas da tabela e começa do zero.
+    """
+    tamanho = os.path.getsize(caminho_excel)
+    modificado = os.path.getmtime(caminho_excel)
+    cursor.execute(f"SELECT tamanho, modificado, linhas, concluida FROM `{TABELA_CONTROLE}` "
+                   f"WHERE tabela = %s", (nome_tabela,))
+    anterior = cursor.fetchone()
+
+    if anterior is not None and not recomecar:
+        mesmo_arquivo = anterior[0] == tamanho and anterior[1] == modificado
+        if not mesmo_arquivo:
+            print(f"O arquivo mudou desde a importação anterior para '{nome_tabela}' "
+                  f"({anterior[2]} linhas). Use recomecar=True para importar do zero, "
+                  f"ou chave=[...] para atualizar só as linhas alteradas.")
+            return None
+        if anterior[3]:
+            print(f"Arquivo já importado para '{nome_tabela}' ({anterior[2]} linhas).")
+            return None
+        print(f"Retomando a importação a partir da linha {anterior[2] + 1}.")
+        return anterior[2]
+
+    if anterior is not None:
+        cursor.execute(f"DELETE FROM `{nome_tabela}`")
+    cursor.execute(f"REPLACE INTO `{TABELA_CONTROLE}` (tabela, arquivo, tamanho, modificado, linhas, concluida) "
+                   f"VALUES (%s, %s, %s, %s, 0, 0)", (nome_tabela, os.path.abspath(caminho_excel), tamanho, modificado))
+    return 0
+
+def _gravar_lote(conexao, cursor, insert_sql, lote, nome_tabela, rejeitadas):
+    """
+    Insere um lote e confirma, junto com o progresso, em uma única transação.
+
+    Se o lote falhar, as linhas são inseridas uma a uma e só as que falham
+    ficam de fora (em rejeitadas), sem abortar a importação.
+    """
+    try:
+        cursor.executemany(insert_sql, lote)
+    except Error:
+        conexao.rollback()
+        for linha in lote:
+            try:
+                cursor.execute(insert_sql, linha)
+            except Error as e:
+                rejeitadas.append(linha + (str(e),))
+    cursor.execute(f"UPDATE `{TABELA_CONTROLE}` SET linhas = linhas + %s WHERE tabela = %s",
+                   (len(lote), nome_tabela))
+    conexao.commit()
+
+def _valor_tsv(valor):
+    """Valor de uma célula no formato de texto lido pelo LOAD DATA (NULL = \\N)."""
+    if valor is None:
+        return "\\N"
+    if isinstance(valor, bool):
+        return "1" if valor else "0"
+    if isinstance(valor, datetime.datetime):
+        return valor.isoformat(sep=" ")
+    if isinstance(valor, (datetime.date, datetime.time)):
+        return valor.isoformat()
+    if isinstance(valor, float):
+        return repr(valor)
+    return str(valor).translate(_ESCAPES_TSV)
+
+def _carregar_lote_tsv(conexao, cursor, nome_tabela, colunas, lote, caminho_tsv, tempos, substituir=False):
+    """
+    Grava o lote em um TSV e o carrega com LOAD DATA LOCAL INFILE, confirmando o lote
+    e o progresso em uma única transação. Com substituir=True (importação incremental),
+    a linha com a mesma chave natural é substituída (LOAD DATA ... REPLACE).
+
+    Returns:
+        int: Avisos do MySQL (valores truncados ou convertidos na carga)
+    """
+    inicio = time.perf_counter()
+    with open(caminho_tsv, 'w', encoding='utf-8', newline='\n') as f:
+        for linha in lote:
+            f.write("\t".join(map(_valor_tsv, linha)))
+            f.write("\n")
+    tempos["conversao"] += time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    colunas_sql = ", ".join(f"`{col}`" for col in colunas)
+    cursor.execute(f"LOAD DATA LOCAL INFILE %s {'REPLACE ' if substituir else ''}INTO TABLE `{nome_tabela}` "
+                   f"CHARACTER SET utf8mb4 "
+                   f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' "
+                   f"({colunas_sql})", (caminho_tsv.replace("\\", "/"),))
+    avisos = cursor.warning_count or 0
+    cursor.execute(f"UPDATE `{TABELA_CONTROLE}` SET linhas = linhas + %s WHERE tabela = %s",
+                   (len(lote), nome_tabela))
+    conexao.commit()
+    tempos["carga"] += time.perf_counter() - inicio
+    return avisos
+
+def _criar_indices(cursor, nome_tabela, indices, tipos):
+    """
+    Cria, de uma vez, os índices secundários que ainda não existem na tabela.
+
+    Chamado depois da carga: construir o índice uma vez, com os dados já na
+    tabela, custa menos que atualizá-lo a cada linha inserida.
+    """
+    cursor.execute(f"SHOW INDEX FROM `{nome_tabela}`")
+    existentes = {linha[2] for linha in cursor.fetchall()}
+    alteracoes = []
+    for indice in indices:
+        colunas = [limpar_nome_coluna(c) for c in ((indice,) if isinstance(indice, str) else indice)]
+        nome = ("ix_" + "_".join(colunas))[:64]
+        if nome in existentes:
+            continue
+        # Colunas TEXT só podem ser indexadas por um prefixo
+        partes = [f"`{c}`(255)" if tipos.get(c) == "TEXT" else f"`{c}`" for c in colunas]
+        alteracoes.append(f"ADD INDEX `{nome}` ({', '.join(partes)})")
+    if alteracoes:
+        print(f"Criando índices em '{nome_tabela}': {len(alteracoes)}")
+        cursor.execute(f"ALTER TABLE `{nome_tabela}` " + ", ".join(alteracoes))
+
+def _salvar_rejeitadas(caminho_rejeitadas, colunas, rejeitadas):
+    """Acrescenta as linhas recusadas pelo MySQL a um CSV, com o erro de cada uma."""
+    novo = not os.path.exists(caminho_rejeitadas)
+    with open(caminho_rejeitadas, 'a', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        if novo:
+            escritor.writerow(list(colunas) + ["erro"])
+        escritor.writerows(rejeitadas)
+
+def nome_tabela_para(caminho_excel, planilha=None):
+    """
+    Nome da tabela MySQL de um arquivo Excel (ou de uma das suas planilhas).
+
+    O nome do arquivo (sem extensão) é a tabela; com planilha, o nome da
+    planilha é acrescentado: Municipios.xlsx, planilha "2022" -> Municipios_2022.
+    """
+    # Extrai o nome do arquivo sem o caminho e a extensão para usar como nome da tabela
+    nome_base_arquivo = os.path.basename(caminho_excel)
+    nome_tabela = os.path.splitext(nome_base_arquivo)[0]
+    if planilha is not None:
+        nome_tabela += f"_{planilha}"
+
+    # Substitui caracteres inválidos para nomes de tabela MySQL (opcional, mas boa prática)
+    return ''.join(e for e in nome_tabela if e.isalnum() or e == '_').replace(' ', '_')[:64]
+
+def _nomes_colunas(cabecalho):
+    """
+    Nomes SQL das colunas do cabeçalho, sem células vazias no fim e sem repetições.
+
+    Células vazias no meio viram Unnamed<n> (n a partir de 0), como o pandas
+    fazia com "Unnamed: n"; nomes que coincidem depois de limpos ("Pop." e
+    "Pop") recebem um sufixo: Pop, Pop_2, ...
+    """
+    cabecalho = list(cabecalho)
+    while cabecalho and (cabecalho[-1] is None or str(cabecalho[-1]).strip() == ""):
+        cabecalho.pop()
+    colunas = []
+    usados = set()
+    for indice, celula in enumerate(cabecalho):
+        nome = limpar_nome_coluna(celula) if celula is not None else ""
+        if not nome:
+            nome = f"Unnamed{indice}"
+        base, sufixo = nome, 2
+        while nome.lower() in usados:
+            # O MySQL não diferencia maiúsculas nos nomes de coluna
+            nome = f"{base}_{sufixo}"
+            sufixo += 1
+        usados.add(nome.lower())
+        colunas.append(nome)
+    return colunas
+
+def _cabecalho_e_amostra(linhas, linhas_amostra, tipos_forcados):
+    """
+    Lê o cabeçalho e a amostra do fluxo de linhas e infere os tipos das colunas.
+
+    Returns:
+        tuple: (colunas, tipos, linhas de dados a partir da primeira), ou None se
+               a planilha não tem cabeçalho ou linhas de dados
+    """
+    linhas = iter(linhas)
+    cabecalho = next(linhas, None)
+    # Renomeia as colunas para nomes de coluna SQL válidos e distintos
+    colunas = _nomes_colunas(cabecalho or ())
+    if not colunas:
+        return None
+    # Tipos forçados pelo nome original do cabeçalho valem para o nome SQL dele
+    tipos_forcados = tipos_forcados or {}
+    tipos_forcados = {**{coluna: tipos_forcados[original] for original, coluna in zip(cabecalho, colunas)
+                         if original in tipos_forcados}, **tipos_forcados}
+    linhas = _linhas_de_dados(linhas, len(colunas))
+    amostra = list(itertools.islice(linhas, linhas_amostra))
+    if not amostra:
+        return None
+
+    tipos = inferir_tipos_colunas(pd.DataFrame(amostra, columns=colunas), tipos_forcados)
+    return colunas, tipos, itertools.chain(amostra, linhas)
+
+def _preparar_tabela(conexao, cursor, nome_tabela, caminho_excel, tipos, recomecar):
+    """Cria a tabela e o controle; devolve as linhas já importadas (None = nada a fazer)."""
+    create_table_sql = montar_sql_create_table(nome_tabela, tipos)
+    print(f"\nExecutando SQL para criar a tabela '{nome_tabela}':\n{create_table_sql}")
+    cursor.execute(create_table_sql)
+    _criar_controle(cursor)
+    print(f"Tabela '{nome_tabela}' criada (ou já existente).")
+
+    ja_importadas = _retomar_importacao(cursor, nome_tabela, caminho_excel, recomecar)
+    conexao.commit()
+    return ja_importadas
+
+def _montar_insert(nome_tabela, colunas):
+    colunas_sql = [f"`{col}`" for col in colunas] # Envolva os nomes das colunas com backticks
+    placeholders = ', '.join(['%s'] * len(colunas_sql))
+    return f"INSERT INTO `{nome_tabela}` ({', '.join(colunas_sql)}) VALUES ({placeholders})" # Use backticks aqui também
+
+def _inserir_lote(conexao, cursor, nome_tabela, colunas, insert_sql, lote, carga, tempos):
+    """
+    Insere e confirma um lote pelo modo da carga (LOAD DATA ou INSERT em lotes).
+
+    carga: {"load_data": bool, "tsv": arquivo temporário, "rejeitadas": CSV de
+    linhas recusadas, "substituir": bool (opcional, importação incremental)}.
+    Se LOAD DATA LOCAL for recusado, carga["load_data"] passa a False e este e
+    os próximos lotes usam INSERT.
+
+    Returns:
+        tuple: (linhas rejeitadas, avisos do MySQL)
+    """
+    if carga["load_data"]:
+        try:
+            return 0, _carregar_lote_tsv(conexao, cursor, nome_tabela, colunas, lote, carga["tsv"], tempos,
+                                         carga.get("substituir", False))
+        except Error as e:
+            if e.errno not in ERROS_LOCAL_INFILE:
+                raise
+            conexao.rollback()
+            print(f"LOAD DATA LOCAL INFILE não permitido ({e.msg}); continuando com INSERT em lotes.")
+            carga["load_data"] = False
+
+    marco = time.perf_counter()
+    rejeitadas = []
+    _gravar_lote(conexao, cursor, insert_sql, lote, nome_tabela, rejeitadas)
+    tempos["carga"] += time.perf_counter() - marco
+    if rejeitadas:
+        _salvar_rejeitadas(carga["rejeitadas"], colunas, rejeitadas)
+    return len(rejeitadas), 0
+
+def _concluir_tabela(conexao, cursor, nome_tabela, indices, tipos, tempos):
+    """Cria os índices secundários (depois da carga) e marca a importação como concluída."""
+    if indices:
+        marco = time.perf_counter()
+        _criar_indices(cursor, nome_tabela, indices, tipos)
+        tempos["indices"] += time.perf_counter() - marco
+    cursor.execute(f"UPDATE `{TABELA_CONTROLE}` SET concluida = 1 WHERE tabela = %s", (nome_tabela,))
+    conexao.commit()
+
+def _hash_linha(linha):
+    """MD5 (hex) do conteúdo de uma linha, com os valores no mesmo texto do TSV."""
+    return hashlib.md5("\t".join(map(_valor_tsv, linha)).encode("utf-8")).hexdigest()
+
+@functools.lru_cache(maxsize=64)
+def _hash_arquivo(caminho_excel, tamanho, modificado):
+    """SHA-256 do arquivo (tamanho e modificado só entram na chave do cache)."""
+    sha = hashlib.sha256()
+    with open(caminho_excel, 'rb') as f:
+        for bloco in iter(lambda: f.read(BLOCO_HASH_ARQUIVO), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+def _arquivo_sem_alteracoes(cursor, nome_tabela, caminho_excel, comparar_conteudo):
+    """
+    True se a tabela já tem este arquivo importado por completo.
+
+    O arquivo é o mesmo se o tamanho e a data de modificação não mudaram; com
+    comparar_conteudo, também se só a data mudou e o SHA-256 é o mesmo (salvo de
+    novo sem alterações), e então a nova data fica registrada no controle.
+    """
+    tamanho = os.path.getsize(caminho_excel)
+    modificado = os.path.getmtime(caminho_excel)
+    cursor.execute(f"SELECT arquivo, tamanho, modificado, hash_arquivo, concluida FROM `{TABELA_CONTROLE}` "
+                   f"WHERE tabela = %s", (nome_tabela,))
+    anterior = cursor.fetchone()
+    if anterior is None or not anterior[4] or anterior[0] != os.path.abspath(caminho_excel):
+        return False
+    if anterior[1] == tamanho and anterior[2] == modificado:
+        return True
+    if not comparar_conteudo or anterior[3] != _hash_arquivo(caminho_excel, tamanho, modificado):
+        return False
+    cursor.execute(f"UPDATE `{TABELA_CONTROLE}` SET tamanho = %s, modificado = %s WHERE tabela = %s",
+                   (tamanho, modificado, nome_tabela))
+    return True
+
+def _com_hash(linhas):
+    """Acrescenta o hash do conteúdo ao final de cada linha."""
+    for linha in linhas:
+        yield linha + (_hash_linha(linha),)
+
+def _filtrar_alteradas(linhas_com_hash, existentes, vistos):
+    """
+    Só as linhas novas ou alteradas: as que têm um hash que ainda não está na tabela.
+
+    Os hashes de todas as linhas do arquivo ficam em vistos (para achar as ausentes).
+    """
+    for linha in linhas_com_hash:
+        vistos.add(linha[-1])
+        if linha[-1] not in existentes:
+            yield linha
+
+def _montar_upsert(nome_tabela, colunas):
+    """INSERT que atualiza a linha com a mesma chave natural (ON DUPLICATE KEY UPDATE)."""
+    atualizacoes = ", ".join(f"`{col}` = VALUES(`{col}`)" for col in colunas)
+    return f"{_montar_insert(nome_tabela, colunas)} ON DUPLICATE KEY UPDATE {atualizacoes}"
+
+def _preparar_incremental(conexao, cursor, nome_tabela, caminho_excel, tipos, chave, recomecar):
+    """
+    Prepara a tabela para a importação incremental e devolve os hashes das linhas já gravadas.
+
+    A tabela ganha a coluna COLUNA_HASH, uma chave única (uk_chave) nas colunas da
+    chave natural e um índice no hash; uma tabela de uma importação completa
+    anterior recebe os três por ALTER TABLE (as suas linhas ficam sem hash e são
+    regravadas). Os hashes de todas as linhas ficam em memória (~100 bytes por linha).
+
+    Returns:
+        set: Hashes das linhas da tabela, ou None se a chave é inválida
+    """
+    chave = [limpar_nome_coluna(c) for c in chave]
+    faltando = [c for c in chave if c not in tipos]
+    if faltando:
+        print(f"Erro: colunas da chave não encontradas em '{nome_tabela}': {', '.join(faltando)}")
+        return None
+    texto = [c for c in chave if tipos[c] == "TEXT"]
+    if texto:
+        # Uma chave única em TEXT só valeria para um prefixo do valor
+        print(f"Erro: colunas da chave com tipo TEXT em '{nome_tabela}': {', '.join(texto)}. "
+              f"Informe um VARCHAR em tipos_forcados.")
+        return None
+
+    create_table_sql = montar_sql_create_table(nome_tabela, {**tipos, COLUNA_HASH: TIPO_HASH})
+    print(f"\nExecutando SQL para criar a tabela '{nome_tabela}':\n{create_table_sql}")
+    cursor.execute(create_table_sql)
+    _criar_controle(cursor)
+
+    cursor.execute(f"SHOW COLUMNS FROM `{nome_tabela}` LIKE %s", (COLUNA_HASH,))
+    alteracoes = [] if cursor.fetchone() else [f"ADD COLUMN `{COLUNA_HASH}` {TIPO_HASH} NULL"]
+    cursor.execute(f"SHOW INDEX FROM `{nome_tabela}`")
+    existentes = {linha[2] for linha in cursor.fetchall()}
+    if "uk_chave" not in existentes:
+        alteracoes.append(f"ADD UNIQUE KEY `uk_chave` ({', '.join(f'`{c}`' for c in chave)})")
+    if "ix_hash_linha" not in existentes:
+        alteracoes.append(f"ADD INDEX `ix_hash_linha` (`{COLUNA_HASH}`)")
+    if alteracoes:
+        # Falha se a tabela já tem chaves repetidas: use recomecar=True
+        cursor.execute(f"ALTER TABLE `{nome_tabela}` " + ", ".join(alteracoes))
+
+    if recomecar:
+        cursor.execute(f"DELETE FROM `{nome_tabela}`")
+    cursor.execute(f"REPLACE INTO `{TABELA_CONTROLE}` (tabela, arquivo, tamanho, modificado, linhas, concluida) "
+                   f"VALUES (%s, %s, %s, %s, 0, 0)", (nome_tabela, os.path.abspath(caminho_excel),
+                                                     os.path.getsize(caminho_excel), os.path.getmtime(caminho_excel)))
+    conexao.commit()
+
+    cursor.execute(f"SELECT `{COLUNA_HASH}` FROM `{nome_tabela}` WHERE `{COLUNA_HASH}` IS NOT NULL")
+    return {linha[0] for linha in cursor}
+
+def _concluir_incremental(conexao, cursor, nome_tabela, caminho_excel, ausentes, remover_ausentes, total_linhas):
+    """
+    Apaga (se pedido) as linhas que saíram do arquivo e registra o arquivo como importado.
+
+    ausentes: hashes gravados que não aparecem mais no arquivo. As linhas alteradas
+    já foram sobrescritas pelo upsert, então só as removidas do arquivo ainda os têm.
+
+    Returns:
+        int: Linhas apagadas
+    """
+    removidas = 0
+    if remover_ausentes:
+        ausentes = list(ausentes)
+        for inicio in range(0, len(ausentes), LINHAS_POR_EXCLUSAO):
+            parte = ausentes[inicio:inicio + LINHAS_POR_EXCLUSAO]
+            cursor.execute(f"DELETE FROM `{nome_tabela}` WHERE `{COLUNA_HASH}` IN ({', '.join(['%s'] * len(parte))})",
+                           parte)
+            removidas += cursor.rowcount
+        # Linhas de uma importação completa anterior (sem hash) que não foram regravadas
+        cursor.execute(f"DELETE FROM `{nome_tabela}` WHERE `{COLUNA_HASH}` IS NULL")
+        removidas += cursor.rowcount
+
+    tamanho = os.path.getsize(caminho_excel)
+    modificado = os.path.getmtime(caminho_excel)
+    cursor.execute(f"UPDATE `{TABELA_CONTROLE}` SET tamanho = %s, modificado = %s, hash_arquivo = %s, "
+                   f"linhas = %s, concluida = 1 WHERE tabela = %s",
+                   (tamanho, modificado, _hash_arquivo(caminho_excel, tamanho, modificado), total_linhas, nome_tabela))
+    conexao.commit()
+    return removidas
+
+def _caminho_rejeitadas(caminho_excel, nome_tabela):
+    """CSV das linhas recusadas de uma tabela, ao lado do arquivo Excel."""
+    return os.path.join(os.path.dirname(caminho_excel), nome_tabela + "_rejeitadas.csv")
+
+def _conectar(db_config, load_data):
+    if load_data:
+        # O cliente também precisa permitir o envio do arquivo local
+        return mysql.connector.connect(**{**db_config, "allow_local_infile": True})
+    return mysql.connector.connect(**db_config)
+
+def _novo_tsv(prefixo):
+    descritor, caminho_tsv = tempfile.mkstemp(suffix=".tsv", prefix=f"{prefixo}_")
+    os.close(descritor)
+    return caminho_tsv
+
+def importar_excel_para_mysql(caminho_excel, db_config, tipos_forcados=None, linhas_amostra=AMOSTRA_INFERENCIA,
+                              linhas_por_lote=LINHAS_POR_LOTE, recomecar=False, modo=MODO_LOTES, indices=None,
+                              planilha=None, chave=None, remover_ausentes=False):
     """
     Importa dados de um arquivo Excel para uma tabela MySQL, usando o nome do arquivo (sem extensão)
     como o nome da tabela.
 
+    As linhas são lidas em streaming e inseridas em lotes de linhas_por_lote, cada lote
+    confirmado com o seu próprio COMMIT. O progresso fica na tabela importacoes_excel,
+    atualizado na mesma transação do lote: se a importação for interrompida, a próxima
+    execução com o mesmo arquivo continua do último lote confirmado. Linhas recusadas
+    pelo MySQL vão para <arquivo>_rejeitadas.csv sem interromper a importação.
+
+    Com modo=MODO_LOAD_DATA, cada lote (LINHAS_POR_CARGA linhas) é convertido em um TSV
+    temporário e carregado com LOAD DATA LOCAL INFILE, muito mais rápido que o INSERT
+    parametrizado em planilhas grandes. Se o cliente ou o servidor não permitirem
+    LOAD DATA LOCAL (local_infile=OFF), a importação continua com INSERT em lotes.
+    Nessa carga, valores inválidos viram avisos do MySQL (e não linhas rejeitadas).
+    Os índices pedidos em indices são criados só depois da carga, nos dois modos.
+    Ao final, são exibidos os tempos de leitura, conversão, carga e índices.
+
+    Com chave (as colunas da chave natural), a importação é incremental: um arquivo
+    igual ao já importado (mesma data de modificação ou mesmo SHA-256) nem é lido;
+    senão, cada linha é comparada pelo hash do seu conteúdo (coluna _hash_linha) e
+    só as novas ou alteradas são gravadas, por upsert na chave natural. Com
+    remover_ausentes=True, as linhas que saíram do arquivo são apagadas da tabela.
+    Uma pequena alteração em uma planilha grande custa uma pequena carga.
+
+    Para vários arquivos e planilhas de uma vez, veja importar_diretorio.
+
     Args:
         caminho_excel (str): O caminho completo para o arquivo Excel.
         db_config (dict): Dicionário com as configurações de conexão do MySQL
                           (host, database, user, password).
+        tipos_forcados (dict): Tipos SQL fixos por coluna (os demais são inferidos).
+        linhas_amostra (int): Linhas usadas para inferir os tipos das colunas.
+        linhas_por_lote (int): Linhas por INSERT/COMMIT.
+        recomecar (bool): Apaga as linhas já importadas na tabela e importa do zero.
+        modo (str): MODO_LOTES (INSERT em lotes) ou MODO_LOAD_DATA (carga em massa).
+        indices (list): Índices secundários a criar ao final: nomes de coluna ou
+                        tuplas de colunas; ex.: ["Ano", ("UF", "Municipio")].
+        planilha (str): Planilha a importar (padrão: a ativa); a tabela recebe o
+                        nome da planilha como sufixo.
+        chave (list): Colunas da chave natural; ativa a importação incremental.
+        remover_ausentes (bool): Na importação incremental, apaga as linhas que
+                                 não estão mais no arquivo.
     """
-    # Extrai o nome do arquivo sem o caminho e a extensão para usar como nome da tabela
-    nome_base_arquivo = os.path.basename(caminho_excel)
-    nome_tabela = os.path.splitext(nome_base_arquivo)[0]
+    if modo not in (MODO_LOTES, MODO_LOAD_DATA):
+        print(f"Erro: modo de carga inválido: {modo!r}")
+        return
 
-    # Substitui caracteres inválidos para nomes de tabela MySQL (opcional, mas boa prática)
-    nome_tabela = ''.join(e for e in nome_tabela if e.isalnum() or e == '_').replace(' ', '_')
+    nome_tabela = nome_tabela_para(caminho_excel, planilha)
     if not nome_tabela: # Se o nome ficar vazio após a limpeza
         print("Erro: O nome da tabela derivado do arquivo Excel está vazio ou inválido.")
         return
 
     conexao = None
+    carga = {"load_data": modo == MODO_LOAD_DATA, "tsv": None,
+             "rejeitadas": _caminho_rejeitadas(caminho_excel, nome_tabela)}
     try:
         # 1. Conectar ao MySQL
-        conexao = mysql.connector.connect(**db_config)
+        conexao = _conectar(db_config, carga["load_data"])
         cursor = conexao.cursor()
         print("Conexão ao MySQL estabelecida com sucesso!")
 
-        # 2. Gerar e Executar o CREATE TABLE
-        create_table_sql = gerar_sql_create_table(caminho_excel, nome_tabela)
-        if "Erro:" in create_table_sql or "Nenhum cabeçalho" in create_table_sql:
-            print(create_table_sql)
-            return
-
-        print(f"\nExecutando SQL para criar a tabela '{nome_tabela}':\n{create_table_sql}")
-        cursor.execute(create_table_sql)
-        print(f"Tabela '{nome_tabela}' criada (ou já existente).")
-
-        # 3. Ler todos os dados do Excel
-        df = pd.read_excel(caminho_excel)
+        if chave and not recomecar:
+            _criar_controle(cursor)
+            sem_alteracoes = _arquivo_sem_alteracoes(cursor, nome_tabela, caminho_excel, True)
+            conexao.commit()
+            if sem_alteracoes:
+                print(f"Arquivo sem alterações desde a última importação para '{nome_tabela}'.")
+                return
 
-        if df.empty:
-            print("O arquivo Excel está vazio. Nenhuma linha para inserir.")
+        # 2. Ler o cabeçalho e a amostra para inferir os tipos, do mesmo fluxo de linhas
+        lido = _cabecalho_e_amostra(ler_linhas_excel(caminho_excel, planilha), linhas_amostra, tipos_forcados)
+        if lido is None:
+            print("O arquivo Excel está vazio ou sem cabeçalho. Nenhuma linha para inserir.")
             return
+        colunas, tipos, linhas = lido
+
+        # 3. Gerar e Executar o CREATE TABLE
+        if chave:
+            # Incremental: só as linhas com um hash que a tabela ainda não tem
+            existentes = _preparar_incremental(conexao, cursor, nome_tabela, caminho_excel, tipos, chave, recomecar)
+            if existentes is None:
+                return
+            ja_importadas = 0
+            vistos = set()
+            colunas = colunas + [COLUNA_HASH]
+            linhas = _filtrar_alteradas(_com_hash(linhas), existentes, vistos)
+            carga["substituir"] = True
+        else:
+            ja_importadas = _preparar_tabela(conexao, cursor, nome_tabela, caminho_excel, tipos, recomecar)
+            if ja_importadas is None:
+                return
 
         # 4. Preparar o comando INSERT
-        # Renomeia as colunas do DataFrame para corresponder aos nomes de coluna SQL válidos
-        df.columns = [''.join(e for e in col if e.isalnum() or e == '_').replace(' ', '_') for col in df.columns]
+        insert_sql = _montar_upsert(nome_tabela, colunas) if chave else _montar_insert(nome_tabela, colunas)
 
-        colunas_sql = [f"`{col}`" for col in df.columns] # Envolva os nomes das colunas com backticks
-        placeholders = ', '.join(['%s'] * len(colunas_sql))
-        insert_sql = f"INSERT INTO `{nome_tabela}` ({', '.join(colunas_sql)}) VALUES ({placeholders})" # Use backticks aqui também
+        # 5. Inserir dados em lotes, pulando as linhas já confirmadas
+        tamanho_lote = LINHAS_POR_CARGA if carga["load_data"] else linhas_por_lote
+        print(f"\nInserindo linhas na tabela '{nome_tabela}' ({modo}, lotes de {tamanho_lote})...")
+        linhas = itertools.islice(linhas, ja_importadas, None)
+        tempos = {"leitura": 0.0, "conversao": 0.0, "carga": 0.0, "indices": 0.0}
+        if carga["load_data"]:
+            carga["tsv"] = _novo_tsv(nome_tabela)
+        inicio = time.perf_counter()
+        total = total_rejeitadas = total_avisos = 0
+        while True:
+            marco = time.perf_counter()
+            lote = list(itertools.islice(linhas, tamanho_lote))
+            tempos["leitura"] += time.perf_counter() - marco
+            if not lote:
+                break
 
-        # 5. Inserir dados
-        dados_para_inserir = [tuple(row) for row in df.values]
+            rejeitadas, avisos = _inserir_lote(conexao, cursor, nome_tabela, colunas, insert_sql, lote, carga, tempos)
+            total_rejeitadas += rejeitadas
+            total_avisos += avisos
+            total += len(lote)
+            taxa = total / max(time.perf_counter() - inicio, 1e-9)
+            print(f"{ja_importadas + total} linhas confirmadas ({taxa:.0f} linhas/s)")
 
-        print(f"\nInserindo {len(dados_para_inserir)} linhas na tabela '{nome_tabela}'...")
-        cursor.executemany(insert_sql, dados_para_inserir)
-        conexao.commit()
-        print(f"Dados inseridos com sucesso! {cursor.rowcount} linhas afetadas.")
+        # 6. Índices secundários, construídos uma única vez sobre os dados carregados
+        if chave:
+            removidas = _concluir_incremental(conexao, cursor, nome_tabela, caminho_excel,
+                                              existentes - vistos, remover_ausentes, len(vistos))
+            print(f"Importação incremental: {total - total_rejeitadas} linhas novas ou alteradas, "
+                  f"{len(vistos) - total} inalteradas, {removidas} removidas.")
+        _concluir_tabela(conexao, cursor, nome_tabela, indices, tipos, tempos)
+        print(f"Dados inseridos com sucesso! {total - total_rejeitadas} linhas inseridas nesta execução.")
+        if total_rejeitadas:
+            print(f"{total_rejeitadas} linhas recusadas pelo MySQL: {carga['rejeitadas']}")
+        if total_avisos:
+            print(f"{total_avisos} avisos do MySQL na carga (SHOW WARNINGS após cada LOAD DATA)")
+
+        decorrido = time.perf_counter() - inicio
+        print(f"Tempos ({'load_data' if carga['load_data'] else 'lotes'}): leitura {tempos['leitura']:.1f} s, "
+              f"conversão TSV {tempos['conversao']:.1f} s, carga {tempos['carga']:.1f} s, "
+              f"índices {tempos['indices']:.1f} s; total {decorrido:.1f} s "
+              f"({total / max(decorrido, 1e-9):.0f} linhas/s)")
 
     except Error as e:
         print(f"Erro no MySQL: {e}")
+        print("As linhas dos lotes já confirmados ficam na tabela; execute de novo para continuar.")
     except FileNotFoundError:
         print(f"Erro: O arquivo Excel '{caminho_excel}' não foi encontrado.")
     except Exception as e:
         print(f"Ocorreu um erro inesperado: {e}")
     finally:
+        if carga["tsv"] and os.path.exists(carga["tsv"]):
+            os.remove(carga["tsv"])
         if conexao and conexao.is_connected():
             cursor.close()
             conexao.close()
             print("Conexão ao MySQL fechada.")
 
+# --- Importação de um diretório em paralelo ---
+# Escritores: conexões MySQL gravando ao mesmo tempo (cada tabela sempre no mesmo)
+ESCRITORES_PADRAO = 3
+# Processos que leem as planilhas (None = um por núcleo); o openpyxl usa CPU, não disco
+PROCESSOS_LEITURA = None
+# Lotes lidos à espera de cada escritor; limita a memória quando o banco é o gargalo
+FILA_LOTES_POR_ESCRITOR = 4
+EXTENSOES_EXCEL = (".xlsx", ".xlsm")
+
+# Filas dos escritores, recebidas por cada processo leitor ao iniciar
+_FILAS_ESCRITORES = None
+
+def listar_planilhas(caminho_excel):
+    """Nomes das planilhas de um arquivo Excel, na ordem do arquivo."""
+    from openpyxl import load_workbook
+
+    livro = load_workbook(caminho_excel, read_only=True)
+    try:
+        return list(livro.sheetnames)
+    finally:
+        livro.close()
+
+def _arquivos_excel(padrao):
+    """Arquivos .xlsx/.xlsm de um diretório, ou os que casam com um padrão glob."""
+    if os.path.isdir(padrao):
+        padrao = os.path.join(padrao, "*")
+    return sorted(caminho for caminho in glob.glob(padrao)
+                  if caminho.lower().endswith(EXTENSOES_EXCEL)
+                  and not os.path.basename(caminho).startswith("~$")) # Arquivos de bloqueio do Excel
+
+def _escritor_da_tabela(nome_tabela, escritores):
+    return zlib.crc32(nome_tabela.encode("utf-8")) % escritores
+
+def _iniciar_leitor(filas):
+    global _FILAS_ESCRITORES
+    _FILAS_ESCRITORES = filas
+
+def _ler_planilha(caminho_excel, planilha, nome_tabela, linhas_amostra, tipos_forcados, tamanho_lote,
+                  com_hash=False):
+    """
+    Leitor (processo do pool): lê uma planilha e envia os lotes ao escritor da tabela.
+
+    Com com_hash (importação incremental), cada linha leva o seu hash no final,
+    calculado aqui, nos processos, e não nos escritores.
+
+    Mensagens: ("inicio", tabela, colunas, tipos), ("lote", tabela, linhas) e
+    ("fim", tabela, status), com status None se a leitura terminou sem erro.
+    Todas as mensagens de uma tabela vão para a mesma fila, em ordem.
+    """
+    fila = _FILAS_ESCRITORES[_escritor_da_tabela(nome_tabela, len(_FILAS_ESCRITORES))]
+    try:
+        lido = _cabecalho_e_amostra(ler_linhas_excel(caminho_excel, planilha), linhas_amostra, tipos_forcados)
+        if lido is None:
+            fila.put(("fim", nome_tabela, "vazia"))
+            return
+        colunas, tipos, linhas = lido
+        if com_hash:
+            linhas = _com_hash(linhas)
+        fila.put(("inicio", nome_tabela, colunas, tipos))
+        while True:
+            lote = list(itertools.islice(linhas, tamanho_lote))
+            if not lote:
+                break
+            fila.put(("lote", nome_tabela, lote))
+        fila.put(("fim", nome_tabela, None))
+    except Exception as e:
+        fila.put(("fim", nome_tabela, f"erro na leitura: {e}"))
+
+def _escrever_tabelas(fila, db_config, modo, recomecar, indices, chaves, remover_ausentes, resumos):
+    """
+    Escritor (thread): grava, com a sua própria conexão, as tabelas que chegam à sua fila.
+
+    Cada tabela é tratada como em importar_excel_para_mysql: CREATE TABLE,
+    retomada pela tabela de controle (ou comparação pelo hash das linhas, se a
+    tabela tem chave em chaves), lotes confirmados um a um e índices ao final. Um erro encerra só a tabela em que ocorreu (fica em resumos); a
+    fila é sempre esvaziada até o None final, para nunca travar os leitores.
+    """
+    load_data = modo == MODO_LOAD_DATA
+    conexao = None
+    erro_conexao = None
+    caminho_tsv = _novo_tsv("escritor") if load_data else None
+    try:
+        conexao = _conectar(db_config, load_data)
+        cursor = conexao.cursor()
+    except Error as e:
+        erro_conexao = f"erro na conexão: {e}"
+
+    tabelas = {} # tabela -> estado da gravação (None = lotes descartados)
+    try:
+        while True:
+            mensagem = fila.get()
+            if mensagem is None:
+                break
+            tipo, nome_tabela = mensagem[0], mensagem[1]
+            resumo = resumos[nome_tabela]
+            estado = tabelas.get(nome_tabela)
+            try:
+                if tipo == "inicio":
+                    resumo["status"] = "importando"
+                    tabelas[nome_tabela] = None
+                    if erro_conexao:
+                        resumo["status"] = erro_conexao
+                        continue
+                    colunas, tipos = mensagem[2], mensagem[3]
+                    chave = (chaves or {}).get(nome_tabela)
+                    existentes = None
+                    if chave:
+                        existentes = _preparar_incremental(conexao, cursor, nome_tabela, resumo["caminho"],
+                                                           tipos, chave, recomecar)
+                        if existentes is None:
+                            resumo["status"] = "chave inválida"
+                            continue
+                        ja_importadas = 0
+                        colunas = colunas + [COLUNA_HASH]
+                        insert_sql = _montar_upsert(nome_tabela, colunas)
+                    else:
+                        ja_importadas = _preparar_tabela(conexao, cursor, nome_tabela, resumo["caminho"],
+                                                         tipos, recomecar)
+                        if ja_importadas is None:
+                            resumo["status"] = "nada a importar"
+                            continue
+                        insert_sql = _montar_insert(nome_tabela, colunas)
+                    tabelas[nome_tabela] = {
+                        "colunas": colunas, "tipos": tipos, "pular": ja_importadas, "insert_sql": insert_sql,
+                        "existentes": existentes, "vistos": set(),
+                        "carga": {"load_data": load_data, "tsv": caminho_tsv, "substituir": bool(chave),
+                                  "rejeitadas": _caminho_rejeitadas(resumo["caminho"], nome_tabela)},
+                        "tempos": {"leitura": 0.0, "conversao": 0.0, "carga": 0.0, "indices": 0.0},
+                    }
+
+                elif tipo == "lote":
+                    if estado is None:
+                        continue
+                    lote = mensagem[2]
+                    if estado["existentes"] is not None:
+                        # Incremental: só as linhas novas ou alteradas
+                        lote = list(_filtrar_alteradas(lote, estado["existentes"], estado["vistos"]))
+                    # Linhas já confirmadas em uma execução anterior
+                    pular = min(estado["pular"], len(lote))
+                    estado["pular"] -= pular
+                    lote = lote[pular:]
+                    if not lote:
+                        continue
+                    rejeitadas, avisos = _inserir_lote(conexao, cursor, nome_tabela, estado["colunas"],
+                                                       estado["insert_sql"], lote, estado["carga"], estado["tempos"])
+                    resumo["linhas"] += len(lote) - rejeitadas
+                    resumo["rejeitadas"] += rejeitadas
+                    resumo["avisos"] += avisos
+
+                elif tipo == "fim":
+                    tabelas.pop(nome_tabela, None)
+                    if mensagem[2] is not None:
+                        resumo["status"] = mensagem[2]
+                    elif estado is not None:
+                        if estado["existentes"] is not None:
+                            resumo["removidas"] = _concluir_incremental(
+                                conexao, cursor, nome_tabela, resumo["caminho"],
+                                estado["existentes"] - estado["vistos"], remover_ausentes, len(estado["vistos"]))
+                        _concluir_tabela(conexao, cursor, nome_tabela, (indices or {}).get(nome_tabela),
+                                         estado["tipos"], estado["tempos"])
+                        resumo["status"] = "concluida"
+                    resumo["segundos"] = time.perf_counter() - resumo["inicio"]
+                    print(f"[{nome_tabela}] {resumo['status']}: {resumo['linhas']} linhas "
+                          f"em {resumo['segundos']:.1f} s")
+
+            except Exception as e:
+                # As linhas dos lotes já confirmados ficam; a próxima execução continua daí
+                if conexao is not None and conexao.is_connected():
+                    conexao.rollback()
+                tabelas[nome_tabela] = None
+                resumo["status"] = f"erro: {e}"
+    finally:
+        if caminho_tsv and os.path.exists(caminho_tsv):
+            os.remove(caminho_tsv)
+        if conexao is not None and conexao.is_connected():
+            cursor.close()
+            conexao.close()
+
+def _tabelas_sem_alteracoes(db_config, tarefas, chaves):
+    """Tabelas das tarefas cujo arquivo já foi importado por completo e não mudou."""
+    conexao = mysql.connector.connect(**db_config)
+    try:
+        cursor = conexao.cursor()
+        _criar_controle(cursor)
+        iguais = {nome_tabela for caminho, planilha, nome_tabela in tarefas
+                  if _arquivo_sem_alteracoes(cursor, nome_tabela, caminho, nome_tabela in (chaves or {}))}
+        conexao.commit()
+        cursor.close()
+        return iguais
+    finally:
+        conexao.close()
+
+def importar_diretorio(padrao, db_config, processos=PROCESSOS_LEITURA, escritores=ESCRITORES_PADRAO,
+                       modo=MODO_LOTES, tipos_forcados=None, linhas_amostra=AMOSTRA_INFERENCIA,
+                       linhas_por_lote=LINHAS_POR_LOTE, recomecar=False, indices=None, chaves=None,
+                       remover_ausentes=False):
+    """
+    Importa todos os arquivos Excel de um diretório (ou de um padrão glob), cada planilha em uma tabela.
+
+    A leitura com o openpyxl usa CPU e é o gargalo com muitos arquivos: as
+    planilhas são lidas em um pool de processos, que envia os lotes por filas
+    limitadas (FILA_LOTES_POR_ESCRITOR) a alguns escritores, cada um com a sua
+    conexão MySQL. Cada tabela vai sempre para o mesmo escritor, na ordem da
+    planilha, então a retomada e as regras de importar_excel_para_mysql valem
+    para cada tabela: reexecutar continua as interrompidas e pula as concluídas
+    (sem ler o arquivo de novo). As tabelas com chave em chaves são importadas
+    de forma incremental (veja importar_excel_para_mysql), com o hash das linhas
+    calculado nos processos leitores.
+
+    Um arquivo com uma só planilha vira a tabela com o nome do arquivo; com
+    várias, uma tabela por planilha (<arquivo>_<planilha>). Ao final, é
+    exibido um resumo por tabela.
+
+    Args:
+        padrao (str): Diretório (todos os .xlsx/.xlsm) ou padrão glob; ex.: r"C:\\Dados\\*_2024.xlsx".
+        db_config (dict): Configurações de conexão do MySQL.
+        processos (int): Processos leitores (None = um por núcleo).
+        escritores (int): Conexões gravando em paralelo.
+        modo (str): MODO_LOTES ou MODO_LOAD_DATA, como em importar_excel_para_mysql.
+        tipos_forcados (dict): Tipos SQL fixos por coluna, em todas as tabelas.
+        linhas_amostra (int): Linhas usadas para inferir os tipos das colunas.
+        linhas_por_lote (int): Linhas por INSERT/COMMIT (no MODO_LOTES).
+        recomecar (bool): Apaga as linhas já importadas e importa tudo do zero.
+        indices (dict): Índices secundários por tabela; ex.: {"Municipio": ["UF"]}.
+        chaves (dict): Chave natural por tabela (importação incremental);
+                       ex.: {"Municipio": ["Codigo_IBGE"]}.
+        remover_ausentes (bool): Nas tabelas incrementais, apaga as linhas que
+                                 não estão mais no arquivo.
+
+    Returns:
+        list: Resumo por tabela (tabela, arquivo, planilha, linhas, rejeitadas,
+              removidas, avisos, segundos, status)
+    """
+    if modo not in (MODO_LOTES, MODO_LOAD_DATA):
+        print(f"Erro: modo de carga inválido: {modo!r}")
+        return []
+
+    arquivos = _arquivos_excel(padrao)
+    if not arquivos:
+        print(f"Nenhum arquivo Excel encontrado em '{padrao}'.")
+        return []
+
+    inicio = time.perf_counter()
+    resumos = {}
+    filas = [multiprocessing.Queue(FILA_LOTES_POR_ESCRITOR) for _ in range(escritores)]
+    tamanho_lote = LINHAS_POR_CARGA if modo == MODO_LOAD_DATA else linhas_por_lote
+
+    with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_leitor, initargs=(filas,)) as executor:
+        # 1. Planilhas de cada arquivo (lidas em paralelo) e a tabela de cada uma
+        futuros = {executor.submit(listar_planilhas, caminho): caminho for caminho in arquivos}
+        tarefas = []
+        for futuro in as_completed(futuros):
+            caminho = futuros[futuro]
+            try:
+                planilhas = futuro.result()
+            except Exception as e:
+                print(f"Erro ao abrir '{caminho}': {e}")
+                continue
+            for planilha in planilhas:
+                nome_tabela = nome_tabela_para(caminho, planilha if len(planilhas) > 1 else None)
+                if not nome_tabela or nome_tabela in resumos:
+                    print(f"Ignorando a planilha '{planilha}' de '{caminho}': "
+                          f"nome de tabela vazio ou repetido ('{nome_tabela}').")
+                    continue
+                resumos[nome_tabela] = {"tabela": nome_tabela, "arquivo": os.path.basename(caminho),
+                                        "planilha": planilha, "caminho": caminho, "linhas": 0,
+                                        "rejeitadas": 0, "removidas": 0, "avisos": 0, "segundos": 0.0,
+                                        "status": "na fila", "inicio": None}
+                tarefas.append((caminho, planilha, nome_tabela))
+
+        # Arquivos já importados e sem alterações não são lidos de novo
+        try:
+            iguais = set() if recomecar else _tabelas_sem_alteracoes(db_config, tarefas, chaves)
+        except Error as e:
+            print(f"Erro no MySQL: {e}")
+            return []
+        for nome_tabela in iguais:
+            resumos[nome_tabela]["status"] = "já importada"
+        tarefas = [tarefa for tarefa in tarefas if tarefa[2] not in iguais]
+
+        print(f"{len(arquivos)} arquivos, {len(resumos)} planilhas, {len(tarefas)} a importar "
+              f"({processos or os.cpu_count()} leitores, {escritores} escritores, {modo}).")
+
+        # 2. Escritores, cada um com a sua fila e a sua conexão
+        threads = [threading.Thread(target=_escrever_tabelas, name=f"escritor-{i}",
+                                    args=(fila, db_config, modo, recomecar, indices, chaves,
+                                          remover_ausentes, resumos))
+                   for i, fila in enumerate(filas)]
+        for thread in threads:
+            thread.start()
+
+        # 3. Leitura das planilhas, enviando os lotes aos escritores
+        futuros = {}
+        for caminho, planilha, nome_tabela in tarefas:
+            resumos[nome_tabela]["inicio"] = time.perf_counter()
+            futuro = executor.submit(_ler_planilha, caminho, planilha, nome_tabela,
+                                     linhas_amostra, tipos_forcados, tamanho_lote, nome_tabela in (chaves or {}))
+            futuros[futuro] = nome_tabela
+        for futuro in as_completed(futuros):
+            erro = futuro.exception()
+            if erro is not None: # Processo leitor encerrado sem enviar o fim da tabela
+                resumos[futuros[futuro]]["status"] = f"erro na leitura: {erro}"
+
+    # Os leitores terminaram (e esvaziaram as suas filas): encerra os escritores
+    for fila in filas:
+        fila.put(None)
+    for thread in threads:
+        thread.join()
+
+    # 4. Resumo por tabela
+    colunas_resumo = ["tabela", "arquivo", "planilha", "linhas", "rejeitadas", "removidas", "avisos", "segundos",
+                      "status"]
+    resultado = [{chave: resumo[chave] for chave in colunas_resumo} for resumo in resumos.values()]
+    for linha in resultado:
+        if linha["status"] in ("na fila", "importando"):
+            linha["status"] = "incompleta"
+    if resultado:
+        print("\n" + pd.DataFrame(resultado, columns=colunas_resumo).round({"segundos": 1}).to_string(index=False))
+    decorrido = time.perf_counter() - inicio
+    total = sum(linha["linhas"] for linha in resultado)
+    print(f"\n{total} linhas em {decorrido:.1f} s ({total / max(decorrido, 1e-9):.0f} linhas/s).")
+    return resultado
+
 # --- Exemplo de Uso ---
 if __name__ == "__main__":
     # --- Configurações do seu banco de dados MySQL ---
@@ -126,4 +1118,10 @@ if __name__ == "__main__":
     # Ele criará uma tabela chamada 'produtos_junho' no seu MySQL
     caminho_do_seu_excel = r"C:\Users\franc\OneDrive - Xscient\Arquivos Xscient\Power BI\Dados População\Municipio.xlsx" # Altere para o caminho do seu arquivo Excel
 
+    # Para planilhas grandes: carga em massa (LOAD DATA LOCAL INFILE) e índices criados ao final
+    # importar_excel_para_mysql(caminho_do_seu_excel, db_config, modo=MODO_LOAD_DATA, indices=["UF"])
+    # Reimportação incremental: só as linhas novas ou alteradas (e apaga as que saíram do arquivo)
+    # importar_excel_para_mysql(caminho_do_seu_excel, db_config, chave=["Codigo"], remover_ausentes=True)
+    # Vários arquivos (e planilhas) de uma vez: leitura em processos paralelos, gravação em 3 conexões
+    # importar_diretorio(r"C:\Users\franc\OneDrive - Xscient\Arquivos Xscient\Power BI\Dados População", db_config)
     importar_excel_para_mysql(caminho_do_seu_excel, db_config)
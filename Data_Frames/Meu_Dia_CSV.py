@@ -5,126 +5,104 @@ Sistema de Monitoramento de Atividade do Computador (CSV)
 
 Monitora continuamente as atividades do usuário no computador,
 rastreando qual aplicativo ou janela está ativa e por quanto tempo.
-Os dados são salvos em arquivo CSV para análise posterior.
+Os dados são salvos em arquivos Parquet particionados por dia para
+análise posterior e, como diário durável, em segmentos CSV rotativos e
+compactados: o Parquet só recebe as sessões em lotes, e o que ainda
+estava em memória numa queda continua no CSV.
 
 Funcionalidades:
 - Monitoramento em tempo real de janelas ativas
 - Registro de tempo de uso por aplicativo/URL
-- Salvamento automático em arquivo CSV
+- Gravação em lotes em Parquet comprimido, um diretório por dia
+- Leitura por intervalo de datas sem abrir os demais dias:
+      from Parquet_Atividade import ler_parquet
+      df = ler_parquet(OUTPUT_DIR, inicio=datetime.date(2025, 7, 1))
 
 Dependências necessárias:
 - psutil
 - pygetwindow
-- pandas
+- pyarrow
+- Rastreador_Atividade.py e Destinos_Atividade.py (Sistemas/Meu_Projeto)
 
 Criado em: 28/06/2025
 Autor: Francisco H. Lomas
 Versão: 1.0
 """
 
-import psutil
-import time
-import datetime
-import pygetwindow as gw
-import pandas as pd
-import os
+import sys
+from pathlib import Path
 
-# =============================================================================
-# CONFIGURAÇÕES DO SISTEMA
-# =============================================================================
+# O motor de rastreamento fica junto do Meu_Dia.py (Sistemas/Meu_Projeto)
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Sistemas" / "Meu_Projeto"))
 
-RECORD_INTERVAL_SECONDS = 5
-OUTPUT_FILE = "activity_log.csv"
+from Rastreador_Atividade import RastreadorAtividade
+from Processos_Janela import obter_janela_ativa
+from Arquivo_Rotativo import ArquivoRotativo
+from Parquet_Atividade import DestinoParquet, PARQUET_BATCH_ROWS
 
 # =============================================================================
-# VARIÁVEIS DE RASTREAMENTO
+# CONFIGURAÇÕES DO SISTEMA
 # =============================================================================
 
-activity_log = []
-current_active_window = None
-session_start_time = None
+RECORD_INTERVAL_SECONDS = 5
+OUTPUT_DIR = "activity_log_parquet"   # Um subdiretório data=AAAA-MM-DD por dia
+OUTPUT_FILE = "activity_log_csv"      # Segmentos CSV rotativos, gravados só se SALVAR_CSV
+SALVAR_CSV = True                     # False: só Parquet (perde o lote em memória numa queda)
 
 # =============================================================================
 # FUNÇÕES AUXILIARES
 # =============================================================================
 
 def get_active_application_info():
-    try:
-        active_window = gw.getActiveWindow()
-        if active_window:
-            return active_window.title
-    except Exception:
-        return None
-    return None
-
-def save_log_to_csv():
-    try:
-        df = pd.DataFrame(activity_log)
-        # Se o arquivo já existe, faz append sem cabeçalho
-        if os.path.exists(OUTPUT_FILE):
-            df.to_csv(OUTPUT_FILE, mode='a', header=False, index=False, encoding='utf-8')
-        else:
-            df.to_csv(OUTPUT_FILE, mode='w', header=True, index=False, encoding='utf-8')
-        print(f"Log salvo em {OUTPUT_FILE}")
-    except Exception as e:
-        print(f"Erro ao salvar log em CSV: {e}")
+    # Título, executável (process_name) e PID da janela ativa
+    return obter_janela_ativa()
 
 # =============================================================================
 # LÓGICA PRINCIPAL DE MONITORAMENTO
 # =============================================================================
 
 def main():
-    global current_active_window, session_start_time, activity_log
-
     print("Sistema de Monitoramento de Atividade do Computador (CSV)")
     print("=" * 60)
     print(f"Intervalo de verificação: {RECORD_INTERVAL_SECONDS} segundos")
-    print(f"Arquivo de backup: {OUTPUT_FILE}")
+    print(f"Diretório Parquet: {OUTPUT_DIR} (lotes de {PARQUET_BATCH_ROWS} sessões)")
+    if SALVAR_CSV:
+        print(f"Arquivo de backup: {OUTPUT_FILE}")
     print("=" * 60)
     print("Iniciando rastreamento de atividade. Pressione Ctrl+C para parar.")
     print("-" * 60)
 
+    # Sessões acumuladas em memória e gravadas em lote no Parquet do dia
+    destinos = [DestinoParquet(OUTPUT_DIR)]
+    if SALVAR_CSV:
+        destinos.append(ArquivoRotativo(OUTPUT_FILE, formato="csv"))
+
+    rastreador = RastreadorAtividade(
+        fonte=get_active_application_info,
+        destinos=destinos,
+        intervalo=RECORD_INTERVAL_SECONDS,
+        ao_registrar=lambda r: print(f"Log: {r['application_or_url']} por {r['duration_seconds']} segundos"),
+        ao_mudar=lambda janela, instante: print(f"Ativo agora: {janela} em {instante.isoformat()}"),
+    )
+
     try:
-        while True:
-            timestamp_now = datetime.datetime.now()
-            current_app_info = get_active_application_info()
-
-            if current_app_info != current_active_window:
-                if current_active_window is not None and session_start_time is not None:
-                    duration_seconds = (timestamp_now - session_start_time).total_seconds()
-                    activity_log.append({
-                        "timestamp_end": timestamp_now.isoformat(),
-                        "application_or_url": current_active_window,
-                        "duration_seconds": round(duration_seconds, 2)
-                    })
-                    print(f"Log: {current_active_window} por {round(duration_seconds, 2)} segundos")
-                    save_log_to_csv()
-                    activity_log = []  # Limpa após salvar
-
-                current_active_window = current_app_info
-                session_start_time = timestamp_now
-                print(f"Ativo agora: {current_active_window} em {timestamp_now.isoformat()}")
-
-            time.sleep(RECORD_INTERVAL_SECONDS)
+        rastreador.executar()
 
     except KeyboardInterrupt:
         print("\n" + "-" * 60)
         print("Interrupção detectada. Finalizando monitoramento...")
 
-        if current_active_window is not None and session_start_time is not None:
-            duration_seconds = (datetime.datetime.now() - session_start_time).total_seconds()
-            activity_log.append({
-                "timestamp_end": datetime.datetime.now().isoformat(),
-                "application_or_url": current_active_window,
-                "duration_seconds": round(duration_seconds, 2)
-            })
-            print(f"Log da sessão final: {current_active_window} por {round(duration_seconds, 2)} segundos")
-            save_log_to_csv()
+        registro = rastreador.finalizar()
+        if registro is not None:
+            print(f"Log da sessão final: {registro['application_or_url']} por {registro['duration_seconds']} segundos")
+        rastreador.fechar()
 
         print("\n" + "=" * 60)
         print("MONITORAMENTO FINALIZADO")
         print("=" * 60)
-        print(f"Arquivo de backup: {OUTPUT_FILE}")
+        print(f"Diretório Parquet: {OUTPUT_DIR}")
+        if SALVAR_CSV:
+            print(f"Arquivo de backup: {OUTPUT_FILE}")
         print("=" * 60)
 
 # =============================================================================
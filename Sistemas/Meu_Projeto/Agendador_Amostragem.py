@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Agendador Adaptativo de Amostragem da Janela Ativa
+==================================================
+
+Define quando o rastreador deve consultar a janela ativa novamente.
+Substitui o ``time.sleep(RECORD_INTERVAL_SECONDS)`` ao final de cada
+iteração, que acumulava atraso (o tempo da própria verificação somava-se
+ao intervalo) e fazia a interface esperar até 5 s para perceber o pedido
+de parada.
+
+Características:
+- Relógio monotônico: imune a ajustes do relógio do sistema
+- Sem deriva: o próximo prazo é calculado a partir do prazo anterior,
+  e não do momento em que a verificação terminou
+- Adaptativo: amostra rápido logo após uma mudança de janela (quando
+  novas trocas são mais prováveis) e recua progressivamente durante
+  períodos estáveis, até o intervalo máximo
+- Parada imediata: a espera é feita em um threading.Event, que acorda
+  assim que a parada é solicitada
+
+Exemplo de uso:
+    agendador = AgendadorAdaptativo(0.5, 5.0, parar_evento=evento)
+    while True:
+        mudou = verificar_janela()
+        agendador.ajustar(mudou)
+        if not agendador.aguardar():
+            break
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import threading
+import time
+
+# =============================================================================
+# CONFIGURAÇÕES DO AGENDADOR
+# =============================================================================
+
+MIN_INTERVAL_SECONDS = 0.5     # Intervalo logo após uma mudança de janela
+MAX_INTERVAL_SECONDS = 5.0     # Intervalo máximo em períodos estáveis
+BACKOFF_FACTOR = 1.5           # Multiplicador do intervalo a cada amostra estável
+
+
+class AgendadorAdaptativo:
+    """
+    Agenda as amostras em prazos monotônicos com intervalo adaptativo.
+
+    Args:
+        intervalo_minimo (float): Intervalo após uma mudança (segundos)
+        intervalo_maximo (float): Intervalo máximo em períodos estáveis
+        fator_recuo (float): Multiplicador aplicado a cada amostra sem mudança
+        parar_evento (threading.Event): Evento que interrompe a espera
+        relogio (callable): Relógio monotônico (padrão: time.monotonic)
+    """
+
+    def __init__(self, intervalo_minimo=MIN_INTERVAL_SECONDS,
+                 intervalo_maximo=MAX_INTERVAL_SECONDS, fator_recuo=BACKOFF_FACTOR,
+                 parar_evento=None, relogio=time.monotonic):
+        if intervalo_minimo <= 0 or intervalo_maximo < intervalo_minimo:
+            raise ValueError("Intervalos inválidos: exige 0 < mínimo <= máximo")
+
+        self.intervalo_minimo = intervalo_minimo
+        self.intervalo_maximo = intervalo_maximo
+        self.fator_recuo = fator_recuo
+        self.parar_evento = parar_evento if parar_evento is not None else threading.Event()
+        self.relogio = relogio
+
+        self.intervalo = intervalo_minimo
+        self._proximo_prazo = relogio()
+
+        # Estatísticas: quantas esperas e quantos prazos perdidos
+        self.total_esperas = 0
+        self.total_atrasos = 0
+
+    def ajustar(self, mudou):
+        """
+        Ajusta o próximo intervalo conforme o resultado da última amostra.
+
+        Args:
+            mudou (bool): True se a janela ativa mudou nesta amostra
+        """
+        if mudou:
+            self.intervalo = self.intervalo_minimo
+        else:
+            self.intervalo = min(self.intervalo_maximo, self.intervalo * self.fator_recuo)
+
+    def aguardar(self):
+        """
+        Espera até o próximo prazo ou até a parada ser solicitada.
+
+        Returns:
+            bool: False se a parada foi solicitada, True caso contrário
+        """
+        self._proximo_prazo += self.intervalo
+        agora = self.relogio()
+
+        if self._proximo_prazo <= agora:
+            # Verificação demorou mais que o intervalo (ou o sistema
+            # suspendeu): realinha em vez de disparar amostras em rajada
+            self.total_atrasos += 1
+            self._proximo_prazo = agora
+            return not self.parar_evento.is_set()
+
+        self.total_esperas += 1
+        return not self.parar_evento.wait(self._proximo_prazo - agora)
+
+    def parar(self):
+        """Solicita a parada; qualquer espera em andamento termina na hora."""
+        self.parar_evento.set()
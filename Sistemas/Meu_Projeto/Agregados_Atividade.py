@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+Agregados de Uso Mantidos Incrementalmente
+==========================================
+
+Responde "quanto tempo passei em X hoje?" sem reler o activity_log.json,
+o activity_log.csv ou a tabela uso_aplicativos. O rastreador entrega cada
+sessão encerrada a este objeto (ele segue o contrato de destino), que
+atualiza os totais em tempo constante:
+
+- por aplicativo (desde o início do rastreamento); o aplicativo é o
+  executável (process_name) e, quando ele não é conhecido, o título
+- por dia e aplicativo
+- por hora e aplicativo (sessões que atravessam a virada da hora são
+  divididas entre as horas correspondentes)
+
+Os totais por hora são persistidos na tabela de resumo
+``uso_aplicativos_resumo`` a cada SUMMARY_FLUSH_SECONDS (e ao fechar);
+totais diários e por aplicativo derivam dela com uma soma sobre poucas
+linhas, sem tocar nas linhas brutas. Em memória ficam só os últimos
+AGGREGATES_KEEP_DAYS dias de totais por dia e por hora.
+
+Estrutura do resumo:
+CREATE TABLE uso_aplicativos_resumo (
+    data DATE NOT NULL,
+    hora TINYINT UNSIGNED NOT NULL,
+    app_name VARCHAR(255) NOT NULL DEFAULT '',     -- executável (ou o campo `chave`)
+    app_title_id INT UNSIGNED NOT NULL DEFAULT 0,  -- título, se o executável é desconhecido
+    total_seconds DECIMAL(12,2) NOT NULL,
+    sessions INT UNSIGNED NOT NULL,
+    PRIMARY KEY (data, hora, app_name, app_title_id)
+);
+
+Os nomes de executável ficam em app_name, e não na dimensão de títulos
+(app_titles); só o título, usado na falta do executável, vai para ela.
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import datetime
+import heapq
+import threading
+
+# =============================================================================
+# CONFIGURAÇÕES
+# =============================================================================
+
+SUMMARY_TABLE = "uso_aplicativos_resumo"
+SUMMARY_FLUSH_SECONDS = 300.0     # Intervalo entre gravações do resumo
+AGGREGATES_KEEP_DAYS = 31         # Dias mantidos em memória em por_dia/por_hora
+APP_NAME_LENGTH = 255             # Tamanho de app_name no resumo
+
+CREATE_SUMMARY_SQL = """
+CREATE TABLE IF NOT EXISTS `{tabela}` (
+    data DATE NOT NULL,
+    hora TINYINT UNSIGNED NOT NULL,
+    app_name VARCHAR(255) NOT NULL DEFAULT '',
+    app_title_id INT UNSIGNED NOT NULL DEFAULT 0,
+    total_seconds DECIMAL(12,2) NOT NULL,
+    sessions INT UNSIGNED NOT NULL,
+    PRIMARY KEY (data, hora, app_name, app_title_id)
+)
+"""
+
+_UMA_HORA = datetime.timedelta(hours=1)
+
+
+class AgregadosAtividade:
+    """
+    Totais de uso por aplicativo, por dia e por hora.
+
+    Pode ser usado diretamente como destino do RastreadorAtividade.
+    Leituras (top, total_de) podem vir de outra thread, como a da
+    interface gráfica. Com engine, uma thread grava o resumo a cada
+    ``intervalo_gravacao`` segundos enquanto houver sessões chegando
+    (iniciada na primeira sessão e encerrada em fechar()).
+
+    Args:
+        engine: Engine SQLAlchemy para persistir o resumo (opcional)
+        tabela (str): Tabela de resumo
+        chave (str): Campo do registro que identifica o aplicativo
+                     (na falta dele, usa-se o título)
+        intervalo_gravacao (float): Segundos entre gravações do resumo
+                                    (None = só ao fechar)
+        dias_mantidos (int): Dias mantidos em por_dia e por_hora
+    """
+
+    def __init__(self, engine=None, tabela=SUMMARY_TABLE, chave="process_name",
+                 intervalo_gravacao=SUMMARY_FLUSH_SECONDS, dias_mantidos=AGGREGATES_KEEP_DAYS):
+        self.engine = engine
+        self.tabela = tabela
+        self.chave = chave
+        self.intervalo_gravacao = intervalo_gravacao
+        self.dias_mantidos = dias_mantidos
+
+        self.por_app = {}     # app -> segundos
+        self.por_dia = {}     # data -> {app: segundos}
+        self.por_hora = {}    # (data, hora) -> {app: segundos}
+        self.sessoes = 0
+
+        # Incrementos ainda não persistidos:
+        # (data, hora, app, app é título) -> [segundos, sessões]
+        self._pendentes = {}
+        self._lock = threading.Lock()
+        self._dicionario = None
+        self._tabela_pronta = False
+        self._ultimo_dia = None
+
+        # Gravação periódica do resumo
+        self._temporizador = None
+        self._parar = None
+
+    # -------------------------------------------------------------------------
+    # Contrato de destino
+    # -------------------------------------------------------------------------
+
+    def registrar(self, registro):
+        """
+        Acrescenta uma sessão encerrada aos totais.
+
+        Args:
+            registro (dict): Sessão no formato do rastreador
+        """
+        app = registro.get(self.chave)
+        do_titulo = not app
+        if do_titulo:
+            app = registro.get("application_or_url")
+        duracao = registro["duration_seconds"]
+        fim = datetime.datetime.fromisoformat(registro["timestamp_end"])
+
+        with self._lock:
+            if self.engine is not None and self.intervalo_gravacao and self._temporizador is None:
+                self._iniciar_temporizador()
+            if self._ultimo_dia is None or fim.date() > self._ultimo_dia:
+                self._ultimo_dia = fim.date()
+                self._podar()
+
+            self.sessoes += 1
+            self.por_app[app] = self.por_app.get(app, 0.0) + duracao
+
+            # A sessão é contada na hora em que terminou; a duração é
+            # distribuída entre as horas que ela atravessou
+            primeira = True
+            for data, hora, segundos in _fatias_por_hora(fim, duracao):
+                dia = self.por_dia.setdefault(data, {})
+                dia[app] = dia.get(app, 0.0) + segundos
+                hora_apps = self.por_hora.setdefault((data, hora), {})
+                hora_apps[app] = hora_apps.get(app, 0.0) + segundos
+
+                pendente = self._pendentes.setdefault((data, hora, app, do_titulo), [0.0, 0])
+                pendente[0] += segundos
+                if primeira:
+                    pendente[1] += 1
+                    primeira = False
+
+    def fechar(self):
+        """Encerra a gravação periódica e persiste os totais pendentes, se houver engine."""
+        with self._lock:
+            temporizador, self._temporizador = self._temporizador, None
+        if temporizador is not None:
+            self._parar.set()
+            temporizador.join()
+        if self.engine is not None:
+            self.salvar()
+
+    # -------------------------------------------------------------------------
+    # Consultas
+    # -------------------------------------------------------------------------
+
+    def top(self, n=5, data=None, hora=None):
+        """
+        Aplicativos com mais tempo de uso.
+
+        Args:
+            n (int): Quantidade de aplicativos
+            data (datetime.date): Restringe a um dia (None = todo o período)
+            hora (int): Restringe a uma hora do dia (exige data)
+
+        Returns:
+            list: [(app, segundos), ...] em ordem decrescente
+        """
+        with self._lock:
+            if data is None:
+                totais = self.por_app
+            elif hora is None:
+                totais = self.por_dia.get(data, {})
+            else:
+                totais = self.por_hora.get((data, hora), {})
+            return heapq.nlargest(n, totais.items(), key=lambda item: item[1])
+
+    def total_de(self, app, data=None):
+        """Segundos de uso de um aplicativo, no total ou em um dia."""
+        with self._lock:
+            if data is None:
+                return self.por_app.get(app, 0.0)
+            return self.por_dia.get(data, {}).get(app, 0.0)
+
+    # -------------------------------------------------------------------------
+    # Persistência
+    # -------------------------------------------------------------------------
+
+    def salvar(self):
+        """
+        Grava os incrementos pendentes na tabela de resumo.
+
+        Cada chamada soma apenas o que mudou desde a anterior, então pode
+        ser chamada periodicamente sem contar nada em dobro.
+
+        Returns:
+            int: Quantidade de linhas (data, hora, app) atualizadas
+        """
+        from sqlalchemy import text
+        from Dicionario_Titulos import DicionarioTitulos, CREATE_TITLES_SQL
+
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, {}
+        if not pendentes:
+            return 0
+
+        try:
+            if not self._tabela_pronta:
+                self._garantir_tabela()
+            titulos = {app for _, _, app, do_titulo in pendentes if do_titulo and app}
+            ids = {}
+            if titulos:
+                if self._dicionario is None:
+                    with self.engine.begin() as conexao:
+                        conexao.execute(text(CREATE_TITLES_SQL.format(tabela="app_titles")))
+                    self._dicionario = DicionarioTitulos(self.engine)
+                ids = self._dicionario.ids_de(titulos)
+
+            # Linhas agregadas pela chave da tabela (nomes truncados podem coincidir)
+            agregadas = {}
+            for (data, hora, app, do_titulo), (segundos, sessoes) in pendentes.items():
+                if do_titulo:
+                    chave = (data, hora, "", ids.get(app, 0))   # 0 = título desconhecido
+                else:
+                    chave = (data, hora, app[:APP_NAME_LENGTH], 0)
+                total = agregadas.setdefault(chave, [0.0, 0])
+                total[0] += segundos
+                total[1] += sessoes
+
+            linhas = [
+                {"data": data, "hora": hora, "app_name": app_name, "app_title_id": app_title_id,
+                 "total_seconds": round(segundos, 2), "sessions": sessoes}
+                for (data, hora, app_name, app_title_id), (segundos, sessoes) in agregadas.items()
+            ]
+            with self.engine.begin() as conexao:
+                conexao.execute(text(
+                    f"INSERT INTO `{self.tabela}` "
+                    f"(data, hora, app_name, app_title_id, total_seconds, sessions) "
+                    f"VALUES (:data, :hora, :app_name, :app_title_id, :total_seconds, :sessions) "
+                    f"ON DUPLICATE KEY UPDATE "
+                    f"total_seconds = total_seconds + VALUES(total_seconds), "
+                    f"sessions = sessions + VALUES(sessions)"), linhas)
+            return len(linhas)
+
+        except Exception:
+            # Devolve os incrementos para a próxima tentativa
+            with self._lock:
+                for chave, (segundos, sessoes) in pendentes.items():
+                    pendente = self._pendentes.setdefault(chave, [0.0, 0])
+                    pendente[0] += segundos
+                    pendente[1] += sessoes
+            raise
+
+    def _garantir_tabela(self):
+        """
+        Cria a tabela de resumo ou migra a anterior a app_name.
+
+        Na tabela antiga os executáveis estavam cadastrados como títulos
+        em app_titles; essas linhas continuam como estão, e as novas usam
+        app_name.
+        """
+        from sqlalchemy import text
+
+        with self.engine.begin() as conexao:
+            conexao.execute(text(CREATE_SUMMARY_SQL.format(tabela=self.tabela)))
+            existe = conexao.execute(text(
+                "SELECT COUNT(*) FROM information_schema.COLUMNS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabela "
+                "AND COLUMN_NAME = 'app_name'"), {"tabela": self.tabela}).scalar()
+            if not existe:
+                conexao.execute(text(
+                    f"ALTER TABLE `{self.tabela}` "
+                    f"ADD COLUMN app_name VARCHAR({APP_NAME_LENGTH}) NOT NULL DEFAULT '' AFTER hora, "
+                    f"MODIFY app_title_id INT UNSIGNED NOT NULL DEFAULT 0, "
+                    f"DROP PRIMARY KEY, ADD PRIMARY KEY (data, hora, app_name, app_title_id)"))
+        self._tabela_pronta = True
+
+    def _podar(self):
+        """Descarta de por_dia/por_hora os dias fora da janela mantida (com o lock)."""
+        corte = self._ultimo_dia - datetime.timedelta(days=self.dias_mantidos - 1)
+        for data in [d for d in self.por_dia if d < corte]:
+            del self.por_dia[data]
+        for chave in [c for c in self.por_hora if c[0] < corte]:
+            del self.por_hora[chave]
+
+    def _iniciar_temporizador(self):
+        """Inicia a thread de gravação periódica (com o lock)."""
+        self._parar = threading.Event()
+        self._temporizador = threading.Thread(target=self._salvar_periodicamente,
+                                              args=(self._parar,), name="ResumoAgregados",
+                                              daemon=True)
+        self._temporizador.start()
+
+    def _salvar_periodicamente(self, parar):
+        """Thread de gravação: salva o resumo a cada intervalo_gravacao."""
+        while not parar.wait(self.intervalo_gravacao):
+            try:
+                self.salvar()
+            except Exception as e:
+                # Os incrementos voltaram para os pendentes; tenta de novo no próximo ciclo
+                print(f"Falha ao gravar o resumo de uso: {e}")
+
+
+def _fatias_por_hora(fim, duracao):
+    """
+    Divide uma sessão entre as horas que ela atravessa.
+
+    A primeira fatia devolvida é sempre a da hora em que a sessão terminou,
+    e é nela que a sessão é contada.
+
+    Yields:
+        tuple: (data, hora, segundos)
+    """
+    restante = duracao
+    limite = fim
+    inicio_hora = fim.replace(minute=0, second=0, microsecond=0)
+    while True:
+        fatia = min(restante, (limite - inicio_hora).total_seconds())
+        yield inicio_hora.date(), inicio_hora.hour, fatia
+        restante -= fatia
+        if restante <= 0:
+            return
+        limite = inicio_hora
+        inicio_hora -= _UMA_HORA
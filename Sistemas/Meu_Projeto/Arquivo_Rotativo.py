@@ -0,0 +1,511 @@
+# -*- coding: utf-8 -*-
+"""
+Arquivos Rotativos e Compactados das Sessões de Atividade
+=========================================================
+
+O activity_log.jsonl, o activity_log.json e o activity_log.csv ficavam
+para sempre no diretório de trabalho, crescendo sem limite. O
+ArquivoRotativo grava as sessões em segmentos dentro de um diretório:
+
+    activity_log_arquivo/
+    ├── manifesto.jsonl                      # índice dos segmentos fechados
+    ├── activity_log-20250627-001.jsonl.zst  # segmentos fechados, compactados
+    ├── activity_log-20250628-001.jsonl.zst
+    └── activity_log-20250628-002.jsonl      # segmento aberto
+
+- Rotação por dia (data do timestamp_end) e por tamanho (ROTATE_MAX_BYTES)
+- Segmentos fechados são compactados em segundo plano (zstd com o pacote
+  zstandard instalado; gzip caso contrário)
+- O manifesto registra, para cada segmento, o intervalo de tempo
+  (primeiro e último timestamp_end), linhas e bytes
+- ler_periodo() consulta o manifesto e só abre (e descompacta) os
+  segmentos que se sobrepõem ao período pedido
+
+O segmento aberto continua na execução seguinte, se ainda for do mesmo
+dia e couber no limite. Segmentos deixados por uma execução interrompida
+são fechados e compactados na partida.
+
+Formatos: "jsonl" (uma sessão JSON por linha, com a política de fsync do
+DiarioAtividade) ou "csv" (cabeçalho em cada segmento).
+
+Uso pela linha de comando:
+    python Arquivo_Rotativo.py listar
+    python Arquivo_Rotativo.py ler --inicio 2025-06-28 --fim 2025-06-29
+    python Arquivo_Rotativo.py importar activity_log.json   # arquiva um log legado
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import argparse
+import csv
+import datetime
+import glob
+import gzip
+import io
+import json
+import os
+import queue
+import re
+import shutil
+import threading
+
+from Diario_Atividade import (DiarioAtividade, ler_diario, compactar_para_json,
+                              FSYNC_POLICY, FSYNC_SEMPRE)
+from Destinos_Atividade import COLUNAS_REGISTRO
+
+# =============================================================================
+# CONFIGURAÇÕES
+# =============================================================================
+
+ARCHIVE_DIR = "activity_log_arquivo"       # Diretório dos segmentos
+ARCHIVE_PREFIX = "activity_log"            # Prefixo dos nomes dos segmentos
+ROTATE_MAX_BYTES = 8 * 1024 * 1024         # Tamanho máximo de um segmento aberto
+ROTATE_COMPRESSION = "zstd"                # "zstd" (se instalado) ou "gzip"
+MANIFEST_FILE = "manifesto.jsonl"
+
+FORMATOS = ("jsonl", "csv")
+_EXTENSOES_COMPRESSAO = {"zstd": ".zst", "gzip": ".gz"}
+
+# Sinal para a thread de compactação encerrar
+_FIM = object()
+
+
+# =============================================================================
+# COMPACTAÇÃO
+# =============================================================================
+
+def _resolver_compressao(compressao):
+    """Codec efetivo: zstd só com o pacote zstandard instalado."""
+    if compressao == "zstd":
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            return "gzip"
+    if compressao not in _EXTENSOES_COMPRESSAO:
+        raise ValueError(f"Compressão inválida: {compressao!r} (use zstd ou gzip)")
+    return compressao
+
+
+def _compactar_arquivo(origem, destino, compressao):
+    """Compacta origem em destino (via temporário + replace)."""
+    temporario = destino + ".tmp"
+    with open(origem, 'rb') as entrada, open(temporario, 'wb') as saida:
+        if compressao == "zstd":
+            import zstandard
+            zstandard.ZstdCompressor(level=10).copy_stream(entrada, saida)
+        else:
+            with gzip.GzipFile(fileobj=saida, mode='wb', mtime=0) as compactado:
+                shutil.copyfileobj(entrada, compactado)
+        saida.flush()
+        os.fsync(saida.fileno())
+    os.replace(temporario, destino)
+
+
+def _abrir_texto(caminho):
+    """Abre um segmento (compactado ou não) para leitura em texto."""
+    if caminho.endswith(".zst"):
+        import zstandard
+        bruto = zstandard.ZstdDecompressor().stream_reader(open(caminho, 'rb'), closefd=True)
+        return io.TextIOWrapper(bruto, encoding='utf-8', newline='')
+    if caminho.endswith(".gz"):
+        return gzip.open(caminho, 'rt', encoding='utf-8', newline='')
+    return open(caminho, 'r', encoding='utf-8', newline='')
+
+
+# =============================================================================
+# MANIFESTO E SEGMENTOS
+# =============================================================================
+
+def _ler_manifesto(diretorio):
+    """Última entrada de cada segmento do manifesto (segmento -> entrada)."""
+    entradas = {}
+    caminho = os.path.join(diretorio, MANIFEST_FILE)
+    for entrada in ler_diario(caminho):
+        entradas[entrada["segmento"]] = entrada
+    return entradas
+
+
+def _registros_do_segmento(caminho, formato):
+    """Registros de um segmento, em ordem de gravação."""
+    with _abrir_texto(caminho) as f:
+        if formato == "csv":
+            for linha in csv.DictReader(f):
+                if linha.get("duration_seconds") not in (None, ""):
+                    linha["duration_seconds"] = float(linha["duration_seconds"])
+                yield linha
+        else:
+            for linha in f:
+                linha = linha.strip()
+                if not linha:
+                    continue
+                try:
+                    yield json.loads(linha)
+                except json.JSONDecodeError:
+                    # Última linha truncada por uma queda
+                    continue
+
+
+def _descrever_segmento(diretorio, nome, formato):
+    """Entrada de manifesto de um segmento bruto, lendo seus registros."""
+    caminho = os.path.join(diretorio, nome)
+    inicio = fim = None
+    linhas = 0
+    for registro in _registros_do_segmento(caminho, formato):
+        instante = registro.get("timestamp_end")
+        if instante:
+            inicio = instante if inicio is None else min(inicio, instante)
+            fim = instante if fim is None else max(fim, instante)
+        linhas += 1
+    return {"segmento": nome, "arquivo": nome, "formato": formato, "inicio": inicio,
+            "fim": fim, "linhas": linhas, "bytes": os.path.getsize(caminho)}
+
+
+def _texto_instante(valor):
+    """datetime/date/str -> texto ISO comparável com timestamp_end."""
+    if valor is None or isinstance(valor, str):
+        return valor
+    return valor.isoformat()
+
+
+def segmentos(diretorio=ARCHIVE_DIR, inicio=None, fim=None, prefixo=ARCHIVE_PREFIX):
+    """
+    Segmentos que podem conter sessões do período [inicio, fim).
+
+    Os segmentos fechados são filtrados pelo intervalo do manifesto; os
+    abertos (ainda fora do manifesto) entram sempre.
+
+    Args:
+        diretorio (str): Diretório do arquivo rotativo
+        inicio, fim (datetime.date, datetime.datetime ou str ISO): Período
+        prefixo (str): Prefixo dos segmentos
+
+    Returns:
+        list: Entradas de manifesto, em ordem cronológica
+    """
+    inicio, fim = _texto_instante(inicio), _texto_instante(fim)
+    manifesto = {nome: entrada for nome, entrada in _ler_manifesto(diretorio).items()
+                 if nome.startswith(prefixo + "-")}
+
+    escolhidos = []
+    for nome, entrada in manifesto.items():
+        if entrada["fim"] is not None and inicio is not None and entrada["fim"] < inicio:
+            continue
+        if entrada["inicio"] is not None and fim is not None and entrada["inicio"] >= fim:
+            continue
+        escolhidos.append(entrada)
+
+    for formato in FORMATOS:
+        for caminho in glob.glob(os.path.join(diretorio, f"{prefixo}-*.{formato}")):
+            nome = os.path.basename(caminho)
+            if nome not in manifesto:
+                escolhidos.append({"segmento": nome, "arquivo": nome, "formato": formato,
+                                   "inicio": None, "fim": None})
+    return sorted(escolhidos, key=lambda e: e["segmento"])
+
+
+def segmentos_abertos(diretorio=ARCHIVE_DIR, prefixo=ARCHIVE_PREFIX):
+    """Caminhos dos segmentos ainda não compactados (os mais recentes)."""
+    return [os.path.join(diretorio, e["arquivo"]) for e in segmentos(diretorio, prefixo=prefixo)
+            if e["arquivo"] == e["segmento"]]
+
+
+def ler_segmento(caminho):
+    """
+    Registros de um segmento avulso, compactado ou não.
+
+    O formato (jsonl ou csv) vem do nome do arquivo, sem a extensão de
+    compactação.
+
+    Yields:
+        dict: Sessões em ordem de gravação
+    """
+    nome = caminho
+    for extensao in _EXTENSOES_COMPRESSAO.values():
+        if nome.endswith(extensao):
+            nome = nome[:-len(extensao)]
+    formato = "csv" if nome.endswith(".csv") else "jsonl"
+    return _registros_do_segmento(caminho, formato)
+
+
+def ler_periodo(diretorio=ARCHIVE_DIR, inicio=None, fim=None, prefixo=ARCHIVE_PREFIX):
+    """
+    Sessões do período [inicio, fim), abrindo só os segmentos necessários.
+
+    Yields:
+        dict: Sessões em ordem de gravação
+    """
+    inicio_texto, fim_texto = _texto_instante(inicio), _texto_instante(fim)
+    for entrada in segmentos(diretorio, inicio, fim, prefixo):
+        caminho = os.path.join(diretorio, entrada["arquivo"])
+        if not os.path.exists(caminho):
+            # Compactado entre a leitura do manifesto e a abertura
+            entrada = _ler_manifesto(diretorio)[entrada["segmento"]]
+            caminho = os.path.join(diretorio, entrada["arquivo"])
+        for registro in _registros_do_segmento(caminho, entrada["formato"]):
+            instante = registro.get("timestamp_end") or ""
+            if inicio_texto is not None and instante < inicio_texto:
+                continue
+            if fim_texto is not None and instante >= fim_texto:
+                continue
+            yield registro
+
+
+# =============================================================================
+# GRAVAÇÃO ROTATIVA
+# =============================================================================
+
+class ArquivoRotativo:
+    """
+    Destino que grava as sessões em segmentos rotativos e compactados.
+
+    Segue o contrato dos destinos (registrar/fechar) e pode substituir o
+    DestinoJSON ou o DestinoCSV.
+
+    Args:
+        diretorio (str): Diretório dos segmentos e do manifesto
+        prefixo (str): Prefixo dos nomes dos segmentos
+        formato (str): "jsonl" ou "csv"
+        max_bytes (int): Tamanho a partir do qual o segmento é fechado
+        compressao (str): "zstd" (cai para gzip sem o zstandard) ou "gzip"
+        fsync_policy (str): Política de fsync dos segmentos JSON Lines
+        colunas (tuple): Colunas dos segmentos CSV
+        caminho_json (str): Se informado, o segmento aberto é compactado
+                            neste array JSON legado ao fechar
+    """
+
+    def __init__(self, diretorio=ARCHIVE_DIR, prefixo=ARCHIVE_PREFIX, formato="jsonl",
+                 max_bytes=ROTATE_MAX_BYTES, compressao=ROTATE_COMPRESSION,
+                 fsync_policy=FSYNC_POLICY, colunas=COLUNAS_REGISTRO, caminho_json=None):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato inválido: {formato!r} (use um de {FORMATOS})")
+        self.diretorio = diretorio
+        self.prefixo = prefixo
+        self.formato = formato
+        self.max_bytes = max_bytes
+        self.compressao = _resolver_compressao(compressao)
+        self.fsync_policy = fsync_policy
+        self.colunas = colunas
+        self.caminho_json = caminho_json
+        self.total_rotacoes = 0
+        os.makedirs(diretorio, exist_ok=True)
+
+        # Segmento aberto
+        self.caminho_atual = None
+        self._entrada = None
+        self._dia = None
+        self._diario = None
+        self._arquivo_csv = None
+        self._escritor_csv = None
+
+        self._lock_manifesto = threading.Lock()
+        self._fila = queue.Queue()
+        self._compactador = threading.Thread(target=self._compactar_pendentes,
+                                             name="CompactadorSegmentos", daemon=True)
+        self._compactador.start()
+        self._recuperar()
+
+    # -------------------------------------------------------------------------
+    # Contrato dos destinos
+    # -------------------------------------------------------------------------
+
+    def registrar(self, registro):
+        instante = registro["timestamp_end"]
+        dia = instante[:10]
+        if self.caminho_atual is not None and (dia != self._dia or self._tamanho() >= self.max_bytes):
+            self._rotacionar()
+        if self.caminho_atual is None:
+            self._abrir(self._novo_nome(dia), dia)
+
+        if self._diario is not None:
+            self._diario.registrar(registro)
+        else:
+            self._escritor_csv.writerow([registro.get(c) for c in self.colunas])
+            self._arquivo_csv.flush()
+
+        entrada = self._entrada
+        entrada["inicio"] = instante if entrada["inicio"] is None else min(entrada["inicio"], instante)
+        entrada["fim"] = instante if entrada["fim"] is None else max(entrada["fim"], instante)
+        entrada["linhas"] += 1
+
+    def fechar(self):
+        """
+        Fecha o segmento aberto (ele continua na próxima execução) e espera
+        as compactações pendentes.
+        """
+        self._fechar_arquivo()
+        self._fila.put(_FIM)
+        self._compactador.join()
+        if self.caminho_json and self.caminho_atual and self.formato == "jsonl":
+            compactar_para_json(self.caminho_atual, self.caminho_json)
+
+    # -------------------------------------------------------------------------
+    # Segmentos
+    # -------------------------------------------------------------------------
+
+    def _tamanho(self):
+        if self._diario is not None:
+            return self._diario.tamanho
+        return self._arquivo_csv.tell()
+
+    def _novo_nome(self, dia):
+        """Próximo nome livre do dia: <prefixo>-AAAAMMDD-NNN.<formato>."""
+        compacto = dia.replace("-", "")
+        padrao = re.compile(rf"{re.escape(self.prefixo)}-{compacto}-(\d+)\.")
+        usados = [int(m.group(1)) for m in map(padrao.match, os.listdir(self.diretorio)) if m]
+        return f"{self.prefixo}-{compacto}-{max(usados, default=0) + 1:03d}.{self.formato}"
+
+    def _abrir(self, nome, dia, entrada=None):
+        self.caminho_atual = os.path.join(self.diretorio, nome)
+        self._dia = dia
+        self._entrada = entrada or {"segmento": nome, "arquivo": nome, "formato": self.formato,
+                                    "inicio": None, "fim": None, "linhas": 0}
+        if self.formato == "jsonl":
+            self._diario = DiarioAtividade(self.caminho_atual, fsync_policy=self.fsync_policy)
+        else:
+            novo = not os.path.exists(self.caminho_atual) or os.path.getsize(self.caminho_atual) == 0
+            self._arquivo_csv = open(self.caminho_atual, 'a', encoding='utf-8', newline='')
+            self._escritor_csv = csv.writer(self._arquivo_csv)
+            if novo:
+                self._escritor_csv.writerow(self.colunas)
+                self._arquivo_csv.flush()
+
+    def _fechar_arquivo(self):
+        if self._diario is not None:
+            self._diario.fechar()
+            self._diario = None
+        if self._arquivo_csv is not None:
+            self._arquivo_csv.close()
+            self._arquivo_csv = None
+            self._escritor_csv = None
+
+    def _rotacionar(self):
+        """Fecha o segmento aberto, registra-o no manifesto e agenda a compactação."""
+        self._fechar_arquivo()
+        entrada = dict(self._entrada, bytes=os.path.getsize(self.caminho_atual))
+        self._registrar_manifesto(entrada)
+        self._fila.put(entrada)
+        self.caminho_atual = None
+        self._entrada = None
+        self.total_rotacoes += 1
+
+    def _registrar_manifesto(self, entrada):
+        with self._lock_manifesto:
+            with DiarioAtividade(os.path.join(self.diretorio, MANIFEST_FILE),
+                                 fsync_policy=FSYNC_SEMPRE) as manifesto:
+                manifesto.registrar(entrada)
+
+    def _recuperar(self):
+        """
+        Retoma o estado deixado por execuções anteriores.
+
+        - Segmentos no manifesto ainda sem compactar: compactação agendada
+        - Segmentos fora do manifesto (abertos): o mais recente continua
+          aberto; os demais (queda no meio de uma rotação) são fechados
+        """
+        manifesto = _ler_manifesto(self.diretorio)
+        abertos = []
+        for caminho in sorted(glob.glob(os.path.join(self.diretorio, f"{self.prefixo}-*.{self.formato}"))):
+            nome = os.path.basename(caminho)
+            entrada = manifesto.get(nome)
+            if entrada is None:
+                abertos.append(nome)
+            elif entrada["arquivo"] == nome:
+                self._fila.put(entrada)
+            else:
+                # Já compactado; o bruto sobrou de uma queda antes da remoção
+                os.remove(caminho)
+
+        for nome in abertos[:-1]:
+            entrada = _descrever_segmento(self.diretorio, nome, self.formato)
+            self._registrar_manifesto(entrada)
+            self._fila.put(entrada)
+        if abertos:
+            nome = abertos[-1]
+            entrada = _descrever_segmento(self.diretorio, nome, self.formato)
+            entrada.pop("bytes")
+            dia = datetime.datetime.strptime(nome.rsplit("-", 2)[1], "%Y%m%d").date().isoformat()
+            self._abrir(nome, dia, entrada)
+
+    def _compactar_pendentes(self):
+        """Thread de compactação: um segmento fechado por vez."""
+        while True:
+            entrada = self._fila.get()
+            if entrada is _FIM:
+                return
+            try:
+                self._compactar(entrada)
+            except OSError as e:
+                # O segmento bruto continua listado e é retomado na próxima partida
+                print(f"Falha ao compactar {entrada['segmento']}: {e}")
+
+    def _compactar(self, entrada):
+        origem = os.path.join(self.diretorio, entrada["segmento"])
+        nome = entrada["segmento"] + _EXTENSOES_COMPRESSAO[self.compressao]
+        destino = os.path.join(self.diretorio, nome)
+        _compactar_arquivo(origem, destino, self.compressao)
+        self._registrar_manifesto(dict(entrada, arquivo=nome, bytes=os.path.getsize(destino),
+                                       bytes_originais=entrada.get("bytes")))
+        os.remove(origem)
+
+
+# =============================================================================
+# LINHA DE COMANDO
+# =============================================================================
+
+def importar_legado(caminho, diretorio=ARCHIVE_DIR, **opcoes):
+    """
+    Distribui um log legado (.json, .jsonl ou .csv) em segmentos rotativos.
+
+    Returns:
+        int: Sessões importadas
+    """
+    if caminho.endswith(".jsonl"):
+        registros = ler_diario(caminho)
+    elif caminho.endswith(".csv"):
+        registros = _registros_do_segmento(caminho, "csv")
+    else:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            registros = json.load(f)
+
+    arquivo = ArquivoRotativo(diretorio, **opcoes)
+    total = 0
+    for registro in registros:
+        arquivo.registrar(registro)
+        total += 1
+    # O último segmento também é fechado: o log legado está completo
+    if arquivo.caminho_atual is not None:
+        arquivo._rotacionar()
+    arquivo.fechar()
+    return total
+
+
+def main():
+    """Lista, lê ou importa segmentos pela linha de comando."""
+    parser = argparse.ArgumentParser(description="Arquivo rotativo das sessões de atividade.")
+    parser.add_argument("--diretorio", default=ARCHIVE_DIR)
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+    subcomandos.add_parser("listar", help="Segmentos e seus intervalos de tempo")
+    ler = subcomandos.add_parser("ler", help="Sessões de um período (JSON Lines na saída)")
+    ler.add_argument("--inicio")
+    ler.add_argument("--fim")
+    importar = subcomandos.add_parser("importar", help="Arquiva um log legado")
+    importar.add_argument("arquivo")
+    importar.add_argument("--formato", choices=FORMATOS, default="jsonl")
+    args = parser.parse_args()
+
+    if args.comando == "listar":
+        for entrada in segmentos(args.diretorio):
+            print(f"{entrada['arquivo']:<45} {entrada['inicio'] or '(aberto)'} -> "
+                  f"{entrada['fim'] or ''}  {entrada.get('linhas', '')}")
+    elif args.comando == "ler":
+        for registro in ler_periodo(args.diretorio, args.inicio, args.fim):
+            print(json.dumps(registro, ensure_ascii=False))
+    else:
+        total = importar_legado(args.arquivo, args.diretorio, formato=args.formato)
+        print(f"{total} sessões de {args.arquivo} arquivadas em {args.diretorio}")
+
+
+if __name__ == "__main__":
+    main()
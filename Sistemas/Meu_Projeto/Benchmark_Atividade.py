@@ -0,0 +1,544 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark do Rastreador e dos Destinos de Atividade
+===================================================
+
+Reproduz fluxos de sessões gravados ou sintéticos pelo RastreadorAtividade
+em velocidade acelerada, com uma fonte de janelas falsa e um relógio
+virtual, e mede o custo de cada destino:
+
+- CPU por amostra (tempo de CPU da thread do rastreador, em µs)
+- Alocações por amostra (bytes, via tracemalloc, em uma passada separada
+  para não distorcer os tempos) e pico de memória
+- Latência de registrar() em cada destino (p50/p95/p99) e tempo de fechar()
+- Sessões por segundo, do início da reprodução ao fechamento dos destinos
+- Com --recursos, o custo do AmostradorRecursos (CPU% e RSS do processo
+  ativo): leituras feitas e latência de cada leitura
+
+Fluxos:
+- O activity_log.json (ou .jsonl) gravado pelo Meu_Dia.py
+- Geradores sintéticos com taxa de trocas de janela configurável
+
+Destinos e perfis: nenhum, memoria, agregados, json, rotativo (arquivo
+rotativo compactado), csv, parquet, sqlite (GravadorMySQL sobre SQLite,
+com o dicionário de títulos, no lugar do MySQL), mysql (com --mysql URL)
+e os perfis meu_dia e meu_dia_csv, que combinam os destinos usados por
+Meu_Dia.py e Data_Frames/Meu_Dia_CSV.py. O perfil meu_dia também liga,
+como o Meu_Dia.py, o classificador de categorias (se existir o arquivo de
+regras) com os totais por categoria e o amostrador de recursos (medidor
+"falso" quando --recursos não é informado).
+
+Uso pela linha de comando:
+    python Benchmark_Atividade.py
+    python Benchmark_Atividade.py --trocas 2 6 30 --sessoes 20000 --destinos meu_dia sqlite
+    python Benchmark_Atividade.py --json resultado.json
+    python Benchmark_Atividade.py --recursos psutil --destinos nenhum meu_dia
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from Rastreador_Atividade import RastreadorAtividade
+from Processos_Janela import JanelaAtiva
+from Diario_Atividade import ler_diario, FSYNC_POLICY
+from Destinos_Atividade import DestinoMemoria, DestinoJSON, DestinoCSV
+from Arquivo_Rotativo import ArquivoRotativo
+from Agregados_Atividade import AgregadosAtividade
+from Categorias_Atividade import carregar_classificador, RULES_FILE
+from Dicionario_Titulos import DicionarioTitulos
+from Recursos_Processo import AmostradorRecursos, MedidorPsutil, RESOURCE_SAMPLE_SECONDS
+
+# =============================================================================
+# CONFIGURAÇÕES DO BENCHMARK
+# =============================================================================
+
+BENCH_SAMPLE_SECONDS = 1.0           # Intervalo simulado entre amostras
+BENCH_SESSIONS = 5000                # Sessões por fluxo sintético
+BENCH_CHANGES_PER_MINUTE = (6.0,)    # Trocas de janela por minuto (uma rodada por taxa)
+BENCH_DISTINCT_TITLES = 300          # Títulos distintos no fluxo sintético
+BENCH_SEED = 28062025
+BENCH_LOG_FILE = "activity_log.json"
+
+# Medidores de recursos: "falso" mede só o custo do amostrador; "psutil" lê
+# o próprio processo do benchmark (os PIDs do roteiro são fictícios)
+MEDIDORES_RECURSOS = ("falso", "psutil")
+_MEDIDA_FALSA = (12.5, 150 * 1024 * 1024)
+
+# Destinos que compõem cada perfil
+PERFIS_BENCHMARK = {
+    "nenhum": (),
+    "memoria": ("memoria",),
+    "agregados": ("agregados",),
+    "json": ("json",),
+    "rotativo": ("rotativo",),
+    "csv": ("csv",),
+    "parquet": ("parquet",),
+    "sqlite": ("sqlite",),
+    "mysql": ("mysql",),
+    "meu_dia": ("memoria", "rotativo", "sqlite", "agregados", "categorias"),
+    "meu_dia_csv": ("parquet", "rotativo_csv"),
+}
+PERFIS_PADRAO = ("nenhum", "memoria", "agregados", "json", "rotativo", "csv", "parquet",
+                 "sqlite", "meu_dia", "meu_dia_csv")
+
+# Perfis que classificam as sessões e amostram recursos, como o Meu_Dia.py
+PERFIS_COMPLETOS = ("meu_dia",)
+
+# Início do relógio virtual dos fluxos sintéticos
+_INICIO_SINTETICO = datetime.datetime(2025, 6, 28, 8, 0, 0)
+
+
+# =============================================================================
+# FLUXOS DE SESSÕES
+# =============================================================================
+# Um roteiro é uma sequência de (título, processo, duração em segundos).
+
+def roteiro_do_log(caminho=BENCH_LOG_FILE):
+    """
+    Roteiro a partir de um log gravado (.json legado ou diário .jsonl).
+
+    Returns:
+        tuple: (início do relógio virtual, lista de (título, processo, duração))
+    """
+    if caminho.endswith(".jsonl"):
+        registros = list(ler_diario(caminho))
+    else:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            registros = json.load(f)
+
+    roteiro = [(r.get("application_or_url"), r.get("process_name"),
+                float(r.get("duration_seconds") or 0.0)) for r in registros]
+    inicio = _INICIO_SINTETICO
+    if registros:
+        primeiro = registros[0]
+        inicio = (datetime.datetime.fromisoformat(primeiro["timestamp_end"])
+                  - datetime.timedelta(seconds=roteiro[0][2]))
+    return inicio, roteiro
+
+
+def roteiro_sintetico(sessoes=BENCH_SESSIONS, trocas_por_minuto=6.0,
+                      titulos_distintos=BENCH_DISTINCT_TITLES, semente=BENCH_SEED):
+    """
+    Roteiro sintético com durações exponenciais e títulos em cauda longa.
+
+    Poucos títulos concentram a maior parte das sessões (como editor e
+    navegador no uso real), e os demais aparecem raramente.
+
+    Args:
+        sessoes (int): Quantidade de sessões
+        trocas_por_minuto (float): Média de trocas de janela por minuto
+        titulos_distintos (int): Títulos diferentes no fluxo
+        semente (int): Semente do gerador, para rodadas reprodutíveis
+
+    Returns:
+        tuple: (início do relógio virtual, lista de (título, processo, duração))
+    """
+    aleatorio = random.Random(semente)
+    media = 60.0 / trocas_por_minuto
+    titulos = [(f"Documento {i} - Aplicativo {i % 17}", f"app{i % 17}.exe")
+               for i in range(titulos_distintos)]
+
+    roteiro = []
+    anterior = None
+    while len(roteiro) < sessoes:
+        indice = min(int(aleatorio.paretovariate(1.2)) - 1, titulos_distintos - 1)
+        if indice == anterior:
+            continue
+        anterior = indice
+        titulo, processo = titulos[indice]
+        roteiro.append((titulo, processo, aleatorio.expovariate(1.0 / media)))
+    return _INICIO_SINTETICO, roteiro
+
+
+def _observacoes(roteiro, intervalo):
+    """Sequência de observações da fonte falsa: cada sessão dura N amostras."""
+    observacoes = []
+    for pid, (titulo, processo, duracao) in enumerate(roteiro, start=1000):
+        janela = JanelaAtiva(titulo, processo, pid)
+        observacoes.extend([janela] * max(1, round(duracao / intervalo)))
+    return observacoes
+
+
+class RelogioVirtual:
+    """Relógio de parede e monotônico avançados manualmente pela reprodução."""
+
+    def __init__(self, inicio=_INICIO_SINTETICO):
+        self._agora = inicio
+        self._monotonico = 0.0
+
+    def agora(self):
+        return self._agora
+
+    def monotonico(self):
+        return self._monotonico
+
+    def avancar(self, segundos):
+        self._agora += datetime.timedelta(seconds=segundos)
+        self._monotonico += segundos
+
+
+# =============================================================================
+# DESTINOS MEDIDOS
+# =============================================================================
+
+class DestinoCronometrado:
+    """Repassa as sessões a um destino medindo a latência de cada chamada."""
+
+    def __init__(self, nome, destino):
+        self.nome = nome
+        self.destino = destino
+        self.latencias_ns = []
+        self.fechar_ns = 0
+
+    def registrar(self, registro):
+        inicio = time.perf_counter_ns()
+        self.destino.registrar(registro)
+        self.latencias_ns.append(time.perf_counter_ns() - inicio)
+
+    def fechar(self):
+        inicio = time.perf_counter_ns()
+        self.destino.fechar()
+        self.fechar_ns = time.perf_counter_ns() - inicio
+
+
+def _gravador_sqlite(caminho, arquivo_pendentes):
+    """
+    GravadorMySQL apontado para um arquivo SQLite.
+
+    Mantém a fila, os lotes, a session_key, o dicionário de títulos
+    (app_titles, com um INSERT e um SELECT por lote para os títulos novos)
+    e o executemany do gravador real; só o esquema (DDL MySQL), o INSERT
+    IGNORE e o INSERT ... ON DUPLICATE KEY são trocados.
+    """
+    from sqlalchemy import create_engine, bindparam, text
+    from Gravador_MySQL import GravadorMySQL, COLUNAS
+    from Dicionario_Titulos import hash_titulo
+
+    class DicionarioSQLite(DicionarioTitulos):
+        def _cadastrar_mysql(self, titulos):
+            por_hash = {hash_titulo(t): t for t in set(titulos)}
+            with self.engine.begin() as conexao:
+                conexao.execute(
+                    text(f"INSERT OR IGNORE INTO `{self.tabela}` (title_hash, title) "
+                         f"VALUES (:title_hash, :title)"),
+                    [{"title_hash": h, "title": t} for h, t in por_hash.items()])
+                linhas = conexao.execute(
+                    text(f"SELECT id, title_hash FROM `{self.tabela}` "
+                         f"WHERE title_hash IN :hashes").bindparams(
+                             bindparam("hashes", expanding=True)),
+                    {"hashes": list(por_hash)})
+                return {por_hash[bytes(h)]: id_titulo for id_titulo, h in linhas}
+
+    class GravadorSQLite(GravadorMySQL):
+        def _preparar_destino(self):
+            if not self._tabela_verificada:
+                with self.engine.begin() as conexao:
+                    conexao.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS `{self.dicionario.tabela}` ("
+                        f"id INTEGER PRIMARY KEY AUTOINCREMENT, title_hash BLOB NOT NULL UNIQUE, "
+                        f"title TEXT NOT NULL)"))
+                    conexao.execute(text(
+                        f"CREATE TABLE IF NOT EXISTS `{self.tabela}` ("
+                        f"id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp_end TEXT NOT NULL, "
+                        f"app_title_id INTEGER, duration_seconds REAL NOT NULL, "
+                        f"process_name TEXT, session_key BLOB UNIQUE, resource_samples INTEGER, "
+                        f"cpu_percent_min REAL, cpu_percent_avg REAL, cpu_percent_max REAL, "
+                        f"rss_mb_min REAL, rss_mb_avg REAL, rss_mb_max REAL)"))
+                self._tabela_verificada = True
+
+    engine = create_engine(f"sqlite:///{caminho}")
+    gravador = GravadorSQLite(engine=engine, arquivo_pendentes=arquivo_pendentes)
+    gravador.dicionario = DicionarioSQLite(engine)
+    colunas = ", ".join(COLUNAS)
+    valores = ", ".join(f":{c}" for c in COLUNAS)
+    gravador._insert_sql = text(
+        f"INSERT OR IGNORE INTO `{gravador.tabela}` ({colunas}) VALUES ({valores})")
+    return gravador
+
+
+class _DestinoGravador:
+    """Destino sobre um gravador em lotes já configurado."""
+
+    def __init__(self, gravador):
+        self.gravador = gravador
+        self.gravador.start()
+
+    def registrar(self, registro):
+        self.gravador.registrar(registro)
+
+    def fechar(self):
+        self.gravador.parar()
+
+
+def _criar_destino(nome, diretorio, url_mysql=None):
+    """Instancia um destino do benchmark dentro do diretório temporário."""
+    if nome == "memoria":
+        return DestinoMemoria()
+    if nome == "agregados":
+        return AgregadosAtividade()
+    if nome == "categorias":
+        return AgregadosAtividade(chave="category")
+    if nome == "json":
+        return DestinoJSON(os.path.join(diretorio, "activity_log.jsonl"),
+                           os.path.join(diretorio, "activity_log.json"))
+    if nome == "rotativo":
+        return ArquivoRotativo(os.path.join(diretorio, "activity_log_arquivo"),
+                               fsync_policy=FSYNC_POLICY)
+    if nome == "rotativo_csv":
+        return ArquivoRotativo(os.path.join(diretorio, "activity_log_csv"), formato="csv")
+    if nome == "csv":
+        return DestinoCSV(os.path.join(diretorio, "activity_log.csv"))
+    if nome == "parquet":
+        from Parquet_Atividade import DestinoParquet
+        return DestinoParquet(os.path.join(diretorio, "parquet"))
+    if nome == "sqlite":
+        return _DestinoGravador(_gravador_sqlite(
+            os.path.join(diretorio, "uso_aplicativos.db"),
+            os.path.join(diretorio, "sqlite_pendentes.jsonl")))
+    if nome == "mysql":
+        if not url_mysql:
+            raise ValueError("o destino mysql exige --mysql URL")
+        from Destinos_Atividade import DestinoMySQL
+        return DestinoMySQL(url_mysql, tabela="uso_aplicativos_benchmark",
+                            arquivo_pendentes=os.path.join(diretorio, "mysql_pendentes.jsonl"))
+    raise ValueError(f"Destino desconhecido: {nome!r}")
+
+
+# =============================================================================
+# REPRODUÇÃO E MEDIÇÃO
+# =============================================================================
+
+def _percentis(valores, escala=1.0):
+    """p50/p95/p99/máximo de uma lista de medições."""
+    if not valores:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordenados = sorted(valores)
+    ponto = lambda p: ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))] / escala
+    return {"p50": round(ponto(0.50), 2), "p95": round(ponto(0.95), 2),
+            "p99": round(ponto(0.99), 2), "max": round(ordenados[-1] / escala, 2)}
+
+
+class _MedidorCronometrado:
+    """Medidor de recursos que registra a latência de cada leitura."""
+
+    def __init__(self, tipo):
+        if tipo not in MEDIDORES_RECURSOS:
+            raise ValueError(f"Medidor de recursos desconhecido: {tipo!r}")
+        self.tipo = tipo
+        self.psutil = MedidorPsutil() if tipo == "psutil" else None
+        self.pid = os.getpid()
+        self.latencias_ns = []
+
+    def __call__(self, pid):
+        inicio = time.perf_counter_ns()
+        medida = self.psutil(self.pid) if self.psutil is not None else _MEDIDA_FALSA
+        self.latencias_ns.append(time.perf_counter_ns() - inicio)
+        return medida
+
+
+def _reproduzir(inicio, observacoes, destinos, intervalo, aceleracao, medir_alocacoes,
+                recursos=None, classificador=None):
+    """Uma passada do fluxo pelo rastreador; devolve as medições brutas."""
+    relogio = RelogioVirtual(inicio)
+    # Como no Meu_Dia.py, o rastreador interna os títulos no dicionário
+    # do buffer em memória, se houver um
+    titulos = None
+    for destino in destinos:
+        destino = getattr(destino, "destino", destino)
+        if isinstance(destino, DestinoMemoria):
+            titulos = destino.registros.dicionario
+    rastreador = RastreadorAtividade(
+        fonte=iter(observacoes).__next__, destinos=destinos, intervalo=intervalo,
+        relogio=relogio.agora, relogio_monotonico=relogio.monotonico, recursos=recursos,
+        classificador=classificador, titulos=titulos)
+
+    cpu_ns = []
+    alocado = []
+    pausa = intervalo / aceleracao if aceleracao else 0.0
+    if medir_alocacoes:
+        tracemalloc.start()
+
+    inicio_parede = time.perf_counter()
+    inicio_cpu = time.process_time()
+    for _ in range(len(observacoes)):
+        if medir_alocacoes:
+            antes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            rastreador.amostrar()
+            alocado.append(tracemalloc.get_traced_memory()[1] - antes)
+        else:
+            t0 = time.thread_time_ns()
+            rastreador.amostrar()
+            cpu_ns.append(time.thread_time_ns() - t0)
+        relogio.avancar(intervalo)
+        if pausa:
+            time.sleep(pausa)
+    rastreador.finalizar()
+    rastreador.fechar()
+    segundos = time.perf_counter() - inicio_parede
+    cpu_processo = time.process_time() - inicio_cpu
+
+    pico = 0
+    if medir_alocacoes:
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return rastreador, cpu_ns, alocado, pico, segundos, cpu_processo
+
+
+def executar_benchmark(perfil, inicio, roteiro, intervalo=BENCH_SAMPLE_SECONDS,
+                       aceleracao=None, medir_alocacoes=True, url_mysql=None,
+                       recursos=None, intervalo_recursos=RESOURCE_SAMPLE_SECONDS):
+    """
+    Mede um perfil de destinos sobre um roteiro de sessões.
+
+    Args:
+        perfil (str): Nome em PERFIS_BENCHMARK
+        inicio (datetime.datetime): Início do relógio virtual
+        roteiro (list): (título, processo, duração) de cada sessão
+        intervalo (float): Intervalo simulado entre amostras
+        aceleracao (float): Fator de aceleração sobre o tempo real (None =
+                            sem pausas, o mais rápido possível)
+        medir_alocacoes (bool): Faz a passada extra com tracemalloc
+        url_mysql (str): URL do MySQL para o destino "mysql"
+        recursos (str): Medidor de recursos ("falso" ou "psutil"; None = sem
+                        amostragem de recursos, exceto nos PERFIS_COMPLETOS,
+                        que usam o "falso")
+        intervalo_recursos (float): Intervalo simulado entre leituras de recursos
+
+    Returns:
+        dict: Medições do perfil
+    """
+    observacoes = _observacoes(roteiro, intervalo)
+    nomes = PERFIS_BENCHMARK[perfil]
+    classificador = None
+    if perfil in PERFIS_COMPLETOS:
+        recursos = recursos or "falso"
+        # Sem arquivo de regras, o Meu_Dia.py também não totaliza categorias
+        classificador = carregar_classificador(RULES_FILE)
+        if classificador is None:
+            nomes = tuple(n for n in nomes if n != "categorias")
+
+    def amostrador():
+        if recursos is None:
+            return None, None
+        medidor = _MedidorCronometrado(recursos)
+        return AmostradorRecursos(intervalo_recursos, medidor=medidor), medidor
+
+    with tempfile.TemporaryDirectory(prefix="bench_atividade_") as diretorio:
+        destinos = [DestinoCronometrado(nome, _criar_destino(nome, diretorio, url_mysql))
+                    for nome in nomes]
+        amostrador_recursos, medidor = amostrador()
+        rastreador, cpu_ns, _, _, segundos, cpu_processo = _reproduzir(
+            inicio, observacoes, destinos, intervalo, aceleracao, False, amostrador_recursos,
+            classificador)
+
+    resultado = {
+        "perfil": perfil,
+        "amostras": len(observacoes),
+        "sessoes": rastreador.total_sessoes,
+        "segundos": round(segundos, 3),
+        "sessoes_por_segundo": round(rastreador.total_sessoes / segundos, 1) if segundos else 0.0,
+        "cpu_processo_s": round(cpu_processo, 3),
+        "cpu_amostra_us": _percentis(cpu_ns, 1000.0),
+        "destinos": {d.nome: {"registrar_us": _percentis(d.latencias_ns, 1000.0),
+                              "fechar_ms": round(d.fechar_ns / 1e6, 2)} for d in destinos},
+    }
+
+    if medidor is not None:
+        resultado["recursos"] = {"medidor": recursos, "leituras": len(medidor.latencias_ns),
+                                 "leitura_us": _percentis(medidor.latencias_ns, 1000.0)}
+
+    if medir_alocacoes:
+        with tempfile.TemporaryDirectory(prefix="bench_atividade_") as diretorio:
+            destinos = [_criar_destino(nome, diretorio, url_mysql) for nome in nomes]
+            if classificador is not None:
+                classificador.classificar.cache_clear()
+            _, _, alocado, pico, _, _ = _reproduzir(
+                inicio, observacoes, destinos, intervalo, aceleracao, True, amostrador()[0],
+                classificador)
+        resultado["alocacao_amostra_bytes"] = _percentis(alocado)
+        resultado["pico_memoria_kb"] = round(pico / 1024, 1)
+    return resultado
+
+
+def _imprimir(fluxo, resultados):
+    print(f"\n=== {fluxo} ===")
+    print(f"{'perfil':<13}{'sessões':>9}{'sessões/s':>12}{'cpu p50':>9}{'cpu p99':>9}"
+          f"{'aloc p99':>10}{'pico kB':>9}  destinos (registrar p99 µs / fechar ms)")
+    for r in resultados:
+        destinos = ", ".join(f"{nome} {d['registrar_us']['p99']:.1f}/{d['fechar_ms']:.1f}"
+                             for nome, d in r["destinos"].items())
+        aloc = r.get("alocacao_amostra_bytes", {}).get("p99", "-")
+        print(f"{r['perfil']:<13}{r['sessoes']:>9}{r['sessoes_por_segundo']:>12}"
+              f"{r['cpu_amostra_us']['p50']:>9}{r['cpu_amostra_us']['p99']:>9}"
+              f"{aloc:>10}{r.get('pico_memoria_kb', '-'):>9}  {destinos}")
+        if "recursos" in r:
+            leitura = r["recursos"]["leitura_us"]
+            print(f"{'':<13}recursos ({r['recursos']['medidor']}): {r['recursos']['leituras']} leituras, "
+                  f"p50 {leitura['p50']} µs, p99 {leitura['p99']} µs")
+
+
+def main():
+    """Executa o benchmark pela linha de comando."""
+    parser = argparse.ArgumentParser(description="Benchmark do rastreador e dos destinos.")
+    parser.add_argument("--log", default=BENCH_LOG_FILE,
+                        help="Log gravado a reproduzir (.json ou .jsonl; padrão: %(default)s)")
+    parser.add_argument("--sessoes", type=int, default=BENCH_SESSIONS)
+    parser.add_argument("--trocas", type=float, nargs="+", default=list(BENCH_CHANGES_PER_MINUTE),
+                        help="Trocas de janela por minuto dos fluxos sintéticos")
+    parser.add_argument("--titulos", type=int, default=BENCH_DISTINCT_TITLES)
+    parser.add_argument("--destinos", nargs="+", choices=sorted(PERFIS_BENCHMARK),
+                        default=list(PERFIS_PADRAO))
+    parser.add_argument("--intervalo", type=float, default=BENCH_SAMPLE_SECONDS)
+    parser.add_argument("--aceleracao", type=float,
+                        help="Fator sobre o tempo real (padrão: sem pausas)")
+    parser.add_argument("--sem-alocacoes", action="store_true",
+                        help="Pula a passada com tracemalloc")
+    parser.add_argument("--recursos", choices=MEDIDORES_RECURSOS,
+                        help="Amostra CPU%%/RSS do processo ativo com este medidor")
+    parser.add_argument("--intervalo-recursos", type=float, default=RESOURCE_SAMPLE_SECONDS)
+    parser.add_argument("--mysql", help="URL SQLAlchemy de um MySQL local para o destino mysql")
+    parser.add_argument("--json", help="Salva os resultados neste arquivo")
+    args = parser.parse_args()
+
+    fluxos = []
+    if os.path.exists(args.log):
+        fluxos.append((f"log {args.log}", *roteiro_do_log(args.log)))
+    else:
+        print(f"{args.log} não encontrado; apenas fluxos sintéticos.")
+    for trocas in args.trocas:
+        fluxos.append((f"sintético {args.sessoes} sessões, {trocas:g} trocas/min",
+                       *roteiro_sintetico(args.sessoes, trocas, args.titulos)))
+
+    todos = {}
+    for fluxo, inicio, roteiro in fluxos:
+        resultados = []
+        for perfil in args.destinos:
+            try:
+                resultados.append(executar_benchmark(
+                    perfil, inicio, roteiro, args.intervalo, args.aceleracao,
+                    not args.sem_alocacoes, args.mysql, args.recursos,
+                    args.intervalo_recursos))
+            except (ImportError, ValueError) as e:
+                print(f"Perfil {perfil} ignorado: {e}")
+        _imprimir(fluxo, resultados)
+        todos[fluxo] = resultados
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(todos, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados salvos em {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+Buffer Colunar Compacto de Sessões
+==================================
+
+Armazena as sessões do rastreador em arrays tipados paralelos em vez de
+uma lista de dicionários com timestamps em texto ISO. Cada sessão ocupa
+24 bytes (fim em epoch-ms, id do título, id do processo e duração),
+contra algumas centenas de bytes de um dict com quatro strings.
+
+Layout (um conjunto de colunas por bloco de CHUNK_ROWS linhas):
+- fim_ms:     array('q')  timestamp_end em milissegundos desde 1970-01-01,
+                          no horário local e sem fuso (como no ISO gravado)
+- titulo_id:  array('I')  id no DicionarioTitulos
+- processo_id: array('I') id do executável (0 = processo desconhecido)
+- duracao:    array('d')  duração em segundos
+
+Os blocos são pré-alocados com capacidade fixa e nunca redimensionados.
+Por isso é seguro expô-los sem cópia (protocolo de buffer) para o
+pandas/NumPy e para o Arrow enquanto o rastreador continua gravando:
+as visões cobrem apenas as linhas já preenchidas.
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import datetime
+from array import array
+
+from Dicionario_Titulos import DicionarioTitulos
+
+# Linhas por bloco pré-alocado (8192 linhas ~ 192 KB)
+CHUNK_ROWS = 8192
+
+# Referência das conversões datetime <-> milissegundos (sem fuso horário)
+_EPOCA = datetime.datetime(1970, 1, 1)
+_UM_MS = datetime.timedelta(milliseconds=1)
+
+
+class _Bloco:
+    """Bloco de capacidade fixa com as quatro colunas."""
+
+    __slots__ = ("fim_ms", "titulo_id", "processo_id", "duracao", "linhas")
+
+    def __init__(self, capacidade):
+        self.fim_ms = array('q', bytes(8 * capacidade))
+        self.titulo_id = array('I', bytes(4 * capacidade))
+        self.processo_id = array('I', bytes(4 * capacidade))
+        self.duracao = array('d', bytes(8 * capacidade))
+        self.linhas = 0
+
+
+class BufferSessoes:
+    """
+    Buffer colunar de sessões, compatível com o uso de ``activity_log``.
+
+    Aceita ``append(registro)`` e ``len()``, e iterar sobre ele devolve
+    os registros no formato de dicionário de sempre. Para análise e para
+    o destino MySQL, use ``para_pandas()`` ou ``para_arrow()``.
+
+    Args:
+        dicionario (DicionarioTitulos): Dicionário de títulos (compartilhe
+                                        com o rastreador para internar)
+        processos (DicionarioTitulos): Dicionário dos nomes de executável
+        linhas_por_bloco (int): Capacidade de cada bloco pré-alocado
+    """
+
+    __slots__ = ("dicionario", "processos", "linhas_por_bloco", "_blocos", "_total")
+
+    def __init__(self, dicionario=None, linhas_por_bloco=CHUNK_ROWS, processos=None):
+        self.dicionario = dicionario if dicionario is not None else DicionarioTitulos()
+        self.processos = processos if processos is not None else DicionarioTitulos()
+        self.linhas_por_bloco = linhas_por_bloco
+        self._blocos = []
+        self._total = 0
+
+    def __len__(self):
+        return self._total
+
+    def adicionar(self, registro):
+        """
+        Acrescenta uma sessão no formato do rastreador.
+
+        Args:
+            registro (dict): timestamp_end (ISO), application_or_url,
+                             duration_seconds e process_name (opcional)
+        """
+        if not self._blocos or self._blocos[-1].linhas == self.linhas_por_bloco:
+            self._blocos.append(_Bloco(self.linhas_por_bloco))
+
+        bloco = self._blocos[-1]
+        i = bloco.linhas
+        fim = datetime.datetime.fromisoformat(registro["timestamp_end"])
+        bloco.fim_ms[i] = (fim - _EPOCA) // _UM_MS
+        bloco.titulo_id[i] = self.dicionario.id_de(registro["application_or_url"])
+        processo = registro.get("process_name")
+        bloco.processo_id[i] = self.processos.id_de(processo) if processo else 0
+        bloco.duracao[i] = registro["duration_seconds"]
+        bloco.linhas = i + 1
+        self._total += 1
+
+    # Compatível com list.append, para quem usava activity_log como lista
+    append = adicionar
+
+    def __iter__(self):
+        titulo_de = self.dicionario.titulo_de
+        processo_de = self.processos.titulo_de
+        for bloco in self._blocos:
+            for i in range(bloco.linhas):
+                fim = _EPOCA + bloco.fim_ms[i] * _UM_MS
+                processo_id = bloco.processo_id[i]
+                yield {
+                    "timestamp_end": fim.isoformat(),
+                    "application_or_url": titulo_de(bloco.titulo_id[i]),
+                    "duration_seconds": bloco.duracao[i],
+                    "process_name": processo_de(processo_id) if processo_id else None
+                }
+
+    def limpar(self):
+        """Descarta todas as sessões (os dicionários são mantidos)."""
+        self._blocos = []
+        self._total = 0
+
+    def _colunas_numpy(self):
+        """Visões NumPy sem cópia de cada bloco, limitadas às linhas preenchidas."""
+        import numpy as np
+
+        partes = []
+        for bloco in self._blocos:
+            n = bloco.linhas
+            partes.append((
+                np.frombuffer(bloco.fim_ms, dtype=np.int64, count=n),
+                np.frombuffer(bloco.titulo_id, dtype=np.uint32, count=n),
+                np.frombuffer(bloco.processo_id, dtype=np.uint32, count=n),
+                np.frombuffer(bloco.duracao, dtype=np.float64, count=n),
+            ))
+        return partes
+
+    def _categorias(self, dicionario=None):
+        """Títulos ordenados por id (id 1 -> posição 0)."""
+        dicionario = dicionario if dicionario is not None else self.dicionario
+        return [dicionario.titulo_de(i) for i in range(1, len(dicionario) + 1)]
+
+    def para_pandas(self):
+        """
+        Converte para um DataFrame do pandas.
+
+        Com um único bloco as colunas numéricas são visões sem cópia dos
+        arrays; com vários blocos elas são concatenadas. Título e processo
+        viram colunas categóricas (códigos inteiros + valores distintos).
+
+        Returns:
+            pandas.DataFrame: timestamp_end, application_or_url,
+                              duration_seconds, process_name
+        """
+        import numpy as np
+        import pandas as pd
+
+        partes = self._colunas_numpy()
+        if len(partes) == 1:
+            fim_ms, titulo_id, processo_id, duracao = partes[0]
+        elif partes:
+            fim_ms, titulo_id, processo_id, duracao = (np.concatenate(c) for c in zip(*partes))
+        else:
+            fim_ms = np.empty(0, np.int64)
+            titulo_id = np.empty(0, np.uint32)
+            processo_id = np.empty(0, np.uint32)
+            duracao = np.empty(0, np.float64)
+
+        titulos = pd.Categorical.from_codes(
+            titulo_id.astype(np.int32) - 1, categories=pd.Index(self._categorias()))
+        return pd.DataFrame({
+            "timestamp_end": pd.to_datetime(fim_ms, unit="ms"),
+            "application_or_url": titulos,
+            "duration_seconds": duracao,
+            # Código -1 (id 0) = processo desconhecido
+            "process_name": pd.Categorical.from_codes(
+                processo_id.astype(np.int32) - 1,
+                categories=pd.Index(self._categorias(self.processos))),
+        }, copy=False)
+
+    def para_arrow(self, apenas_usados=False):
+        """
+        Converte para uma tabela Arrow sem copiar as colunas.
+
+        Cada bloco vira um pedaço (chunk) das colunas; título e processo são
+        colunas dictionary-encoded cujos índices são os próprios ids.
+
+        Args:
+            apenas_usados (bool): Se True, os dicionários da tabela trazem só
+                                  os títulos e processos presentes no buffer
+                                  (os índices são renumerados, com cópia).
+                                  Use ao gravar lotes pequenos em arquivos
+                                  separados, que senão repetiriam o
+                                  dicionário inteiro em cada arquivo
+
+        Returns:
+            pyarrow.Table: timestamp_end (timestamp[ms]), application_or_url
+                           (dictionary<int32, string>), duration_seconds,
+                           process_name (dictionary<int32, string>)
+        """
+        import numpy as np
+        import pyarrow as pa
+
+        partes = self._colunas_numpy()
+        if apenas_usados and partes:
+            titulos_usados = np.unique(np.concatenate([p[1] for p in partes]))
+            processos_usados = np.unique(np.concatenate([p[2] for p in partes]))
+            processos_usados = processos_usados[processos_usados != 0]
+            dicionario = pa.array([self.dicionario.titulo_de(int(i)) for i in titulos_usados],
+                                  type=pa.string())
+            nomes = pa.array([self.processos.titulo_de(int(i)) for i in processos_usados],
+                             type=pa.string())
+            # ids -> posição no dicionário reduzido (processo 0 fica mascarado)
+            partes = [(fim_ms,
+                       np.searchsorted(titulos_usados, titulo_id).astype(np.uint32),
+                       processo_id,
+                       np.searchsorted(processos_usados, processo_id).astype(np.uint32),
+                       duracao)
+                      for fim_ms, titulo_id, processo_id, duracao in partes]
+        else:
+            # Posição 0 é só um marcador (ids começam em 1); não pode ser nula
+            # porque o Parquet não aceita nulos dentro do dicionário
+            dicionario = pa.array([""] + self._categorias(), type=pa.string())
+            nomes = pa.array([""] + self._categorias(self.processos), type=pa.string())
+            partes = [(fim_ms, titulo_id, processo_id, processo_id, duracao)
+                      for fim_ms, titulo_id, processo_id, duracao in partes]
+
+        fins, titulos, processos, duracoes = [], [], [], []
+        for fim_ms, titulo_indice, processo_id, processo_indice, duracao in partes:
+            fins.append(pa.array(fim_ms).view(pa.timestamp("ms")))
+            titulos.append(pa.DictionaryArray.from_arrays(
+                pa.array(titulo_indice.view("int32")), dicionario))
+            # Processo desconhecido (id 0) vira índice nulo
+            processos.append(pa.DictionaryArray.from_arrays(
+                pa.array(processo_indice.view("int32"), mask=processo_id == 0), nomes))
+            duracoes.append(pa.array(duracao))
+
+        return pa.table({
+            "timestamp_end": pa.chunked_array(fins, type=pa.timestamp("ms")),
+            "application_or_url": pa.chunked_array(
+                titulos, type=pa.dictionary(pa.int32(), pa.string())),
+            "duration_seconds": pa.chunked_array(duracoes, type=pa.float64()),
+            "process_name": pa.chunked_array(
+                processos, type=pa.dictionary(pa.int32(), pa.string())),
+        })
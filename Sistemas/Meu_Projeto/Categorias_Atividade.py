@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+Classificação de Títulos em Categorias de Atividade
+===================================================
+
+Agrupa títulos de janela e executáveis ("... - Cursor", "... –
+Explorador de Arquivos", abas do Edge, caminhos do python.exe) em
+categorias como Desenvolvimento, Arquivos ou Navegação, a partir de um
+arquivo de regras (categorias_atividade.json):
+
+    {
+        "padrao": "Outros",
+        "ignorar_maiusculas": true,
+        "regras": [
+            {"categoria": "Desenvolvimento", "titulo": " - Cursor$"},
+            {"categoria": "Desenvolvimento", "processo": "^python[\\d.]*\\.exe$"},
+            {"categoria": "Arquivos", "contem": "Explorador de Arquivos"}
+        ]
+    }
+
+Cada regra testa o título ("titulo", expressão regular; "contem", texto
+literal) ou o executável ("processo"). Vale a primeira regra do arquivo
+que casar.
+
+Em vez de testar as regras uma a uma, todas as de título são compiladas
+em uma única expressão com alternativas (e as de processo em outra):
+
+    ^(?:(?P<r0>(?=.*?regra0))|(?P<r1>(?=.*?regra1))|...)
+
+Uma única chamada ao motor de regex tenta as alternativas na ordem do
+arquivo e o grupo que casou identifica a regra. Regras com referências
+a grupos ("\\1", "(?P=nome)"), grupos nomeados ou flags globais "(?i)" não
+podem entrar na expressão única: elas são testadas uma a uma, respeitando
+a mesma ordem. O resultado é memorizado por (título,
+processo) distinto, que se repetem centenas de vezes por dia.
+
+Integração:
+- RastreadorAtividade(classificador=...) acrescenta "category" a cada
+  sessão encerrada (AgregadosAtividade(chave="category") totaliza por ela)
+- classificar_dataframe() classifica um DataFrame pelos valores distintos
+- reclassificar_historico() preenche a tabela app_categories a partir dos
+  pares (app_title_id, process_name) distintos de uso_aplicativos
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+
+from Dicionario_Titulos import TITLES_TABLE
+from Esquema_Atividade import TABLE_NAME
+
+# =============================================================================
+# CONFIGURAÇÕES
+# =============================================================================
+
+RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "categorias_atividade.json")
+DEFAULT_CATEGORY = "Outros"               # Categoria dos títulos sem regra
+CLASSIFIER_CACHE_SIZE = 4096              # Pares (título, processo) memorizados
+CATEGORIES_TABLE = "app_categories"       # Categoria de cada (título, processo)
+BACKFILL_BATCH_SIZE = 1000                # Linhas por upsert em app_categories
+
+CREATE_CATEGORIES_SQL = """
+CREATE TABLE IF NOT EXISTS `{tabela}` (
+    app_title_id INT UNSIGNED NOT NULL,
+    process_name VARCHAR(255) NOT NULL DEFAULT '',
+    category VARCHAR(64) NOT NULL,
+    rules_hash BINARY(20) NOT NULL,
+    PRIMARY KEY (app_title_id, process_name),
+    KEY ix_{tabela}_categoria (category)
+)
+"""
+
+_CAMPOS_REGRA = ("titulo", "contem", "processo")
+
+# Construções que não sobrevivem à combinação: referências a grupos
+# (\1, (?P=nome), (?(1)...)), cujos números mudam, e flags globais ("(?i)"),
+# que só valem no início da expressão
+_NAO_COMBINAVEIS = re.compile(r"\\[1-9]|\(\?P=|\(\?\(|\(\?[aiLmsux]+\)")
+
+
+def _combinar(padroes, flags):
+    """
+    Compila (índice da regra, padrão) em uma única expressão.
+
+    Cada alternativa é um lookahead ancorado no início, então a primeira
+    regra (na ordem do arquivo) que casa em qualquer ponto do texto vence.
+    Regras com referências a grupos (os números mudariam), grupos nomeados
+    (confundiriam o lastgroup) ou flags globais ficam de fora e são
+    compiladas isoladamente.
+
+    Returns:
+        tuple: (expressão combinada ou None, [(índice, expressão isolada)])
+    """
+    flags |= re.DOTALL
+    combinaveis, isoladas = [], []
+    for indice, padrao in padroes:
+        compilada = re.compile(padrao, flags)
+        if compilada.groupindex or _NAO_COMBINAVEIS.search(padrao):
+            isoladas.append((indice, compilada))
+        else:
+            combinaveis.append((indice, padrao))
+    if not combinaveis:
+        return None, isoladas
+
+    alternativas = "|".join(f"(?P<r{indice}>(?=.*?(?:{padrao})))" for indice, padrao in combinaveis)
+    try:
+        return re.compile(f"^(?:{alternativas})", flags), isoladas
+    except re.error:
+        # Alguma construção que não sobrevive à combinação: todas uma a uma
+        isoladas += [(indice, re.compile(padrao, flags)) for indice, padrao in combinaveis]
+        return None, sorted(isoladas, key=lambda par: par[0])
+
+
+class ClassificadorCategorias:
+    """
+    Classificador compilado a partir de uma lista de regras.
+
+    Args:
+        regras (list): Dicionários com "categoria" e um de "titulo",
+                       "contem" ou "processo"
+        padrao (str): Categoria dos títulos sem regra
+        ignorar_maiusculas (bool): Compara sem distinguir maiúsculas
+        tamanho_cache (int): Pares (título, processo) memorizados
+
+    Raises:
+        ValueError: Regra sem categoria, sem campo ou com regex inválida
+    """
+
+    def __init__(self, regras, padrao=DEFAULT_CATEGORY, ignorar_maiusculas=True,
+                 tamanho_cache=CLASSIFIER_CACHE_SIZE):
+        self.regras = list(regras)
+        self.padrao = padrao
+        flags = re.IGNORECASE if ignorar_maiusculas else 0
+
+        self.categorias = []
+        padroes_titulo, padroes_processo = [], []
+        for indice, regra in enumerate(self.regras):
+            campos = [c for c in _CAMPOS_REGRA if c in regra]
+            if "categoria" not in regra or len(campos) != 1:
+                raise ValueError(f"Regra {indice}: informe 'categoria' e um de {_CAMPOS_REGRA}: {regra}")
+            campo = campos[0]
+            padrao_regra = re.escape(regra[campo]) if campo == "contem" else regra[campo]
+            try:
+                # Compilada sozinha para apontar a regra com erro
+                re.compile(padrao_regra, flags)
+            except re.error as e:
+                raise ValueError(f"Regra {indice}: expressão inválida {padrao_regra!r}: {e}") from e
+            destino = padroes_processo if campo == "processo" else padroes_titulo
+            destino.append((indice, padrao_regra))
+            self.categorias.append(regra["categoria"])
+
+        self._regex_titulo, self._isoladas_titulo = _combinar(padroes_titulo, flags)
+        self._regex_processo, self._isoladas_processo = _combinar(padroes_processo, flags)
+
+        # Identifica o conjunto de regras (reclassificação após mudanças)
+        canonico = json.dumps([self.regras, padrao, ignorar_maiusculas],
+                              ensure_ascii=False, sort_keys=True)
+        self.versao = hashlib.sha1(canonico.encode("utf-8")).digest()
+
+        self.classificar = lru_cache(maxsize=tamanho_cache)(self._classificar)
+
+    @classmethod
+    def de_arquivo(cls, caminho=RULES_FILE, **opcoes):
+        """Carrega as regras de um arquivo JSON."""
+        with open(caminho, 'r', encoding='utf-8') as f:
+            configuracao = json.load(f)
+        return cls(configuracao.get("regras", []),
+                   padrao=configuracao.get("padrao", DEFAULT_CATEGORY),
+                   ignorar_maiusculas=configuracao.get("ignorar_maiusculas", True),
+                   **opcoes)
+
+    def _regra(self, regex, isoladas, texto):
+        """Índice da primeira regra que casa com o texto (ou None)."""
+        if not texto:
+            return None
+        casamento = regex.match(texto) if regex is not None else None
+        indice = int(casamento.lastgroup[1:]) if casamento else None
+        # As isoladas só importam se vierem antes da que casou na combinada
+        for indice_isolada, isolada in isoladas:
+            if indice is not None and indice_isolada > indice:
+                break
+            if isolada.search(texto):
+                return indice_isolada
+        return indice
+
+    def _classificar(self, titulo, processo=None):
+        """
+        Categoria de um título (e do executável, se conhecido).
+
+        Args:
+            titulo (str): Título da janela
+            processo (str): Nome do executável (opcional)
+
+        Returns:
+            str: Categoria da primeira regra que casar, ou o padrão
+        """
+        indices = [i for i in (self._regra(self._regex_titulo, self._isoladas_titulo, titulo),
+                               self._regra(self._regex_processo, self._isoladas_processo, processo))
+                   if i is not None]
+        return self.categorias[min(indices)] if indices else self.padrao
+
+    def classificar_registro(self, registro):
+        """Categoria de uma sessão no formato do rastreador."""
+        return self.classificar(registro.get("application_or_url"), registro.get("process_name"))
+
+    def classificar_dataframe(self, df, coluna_titulo="application_or_url",
+                              coluna_processo="process_name"):
+        """
+        Categorias das linhas de um DataFrame.
+
+        Só os pares (título, processo) distintos passam pelo classificador;
+        o resultado é espalhado de volta pelos códigos do factorize.
+
+        Returns:
+            pandas.Series: Categoria de cada linha (dtype category)
+        """
+        import pandas as pd
+
+        titulos = df[coluna_titulo].astype("string").fillna("")
+        if coluna_processo in df:
+            processos = df[coluna_processo].astype("string").fillna("")
+        else:
+            processos = pd.Series("", index=df.index, dtype="string")
+
+        codigos, pares = pd.factorize(pd.MultiIndex.from_arrays([titulos, processos]))
+        categorias_pares = pd.Series([self.classificar(t, p or None) for t, p in pares],
+                                     dtype="object")
+        return pd.Series(pd.Categorical(categorias_pares.to_numpy()[codigos]),
+                         index=df.index, name="category")
+
+
+def carregar_classificador(caminho=RULES_FILE):
+    """Classificador do arquivo de regras, ou None se ele não existir."""
+    if not os.path.exists(caminho):
+        return None
+    return ClassificadorCategorias.de_arquivo(caminho)
+
+
+# =============================================================================
+# RECLASSIFICAÇÃO DO HISTÓRICO
+# =============================================================================
+
+def reclassificar_historico(engine, classificador, tabela=TABLE_NAME,
+                            tabela_titulos=TITLES_TABLE, tabela_categorias=CATEGORIES_TABLE,
+                            tamanho_lote=BACKFILL_BATCH_SIZE):
+    """
+    Preenche app_categories para os pares distintos do histórico.
+
+    A categoria fica na dimensão (app_title_id, process_name), e não em
+    cada linha de ``uso_aplicativos``: um JOIN dá a categoria das sessões.
+    Só os pares novos, ou classificados por outra versão das regras, são
+    lidos e gravados.
+
+    Args:
+        engine: Engine SQLAlchemy conectada ao MySQL
+        classificador (ClassificadorCategorias): Regras compiladas
+        tabela (str): Tabela de sessões
+        tabela_titulos (str): Dimensão dos títulos
+        tabela_categorias (str): Tabela de categorias
+        tamanho_lote (int): Linhas por upsert
+
+    Returns:
+        dict: pares classificados e contagem por categoria
+    """
+    import pandas as pd
+    from sqlalchemy import text
+
+    with engine.begin() as conexao:
+        conexao.execute(text(CREATE_CATEGORIES_SQL.format(tabela=tabela_categorias)))
+
+    with engine.connect() as conexao:
+        pares = pd.read_sql(text(
+            f"SELECT p.app_title_id, p.process_name, t.title AS application_or_url "
+            f"FROM (SELECT DISTINCT app_title_id, COALESCE(process_name, '') AS process_name "
+            f"      FROM `{tabela}` WHERE app_title_id IS NOT NULL) p "
+            f"JOIN `{tabela_titulos}` t ON t.id = p.app_title_id "
+            f"LEFT JOIN `{tabela_categorias}` c "
+            f"  ON c.app_title_id = p.app_title_id AND c.process_name = p.process_name "
+            f"WHERE c.app_title_id IS NULL OR c.rules_hash <> :versao"),
+            conexao, params={"versao": classificador.versao})
+
+    resumo = {"pares": len(pares), "por_categoria": {}}
+    if pares.empty:
+        return resumo
+
+    pares["category"] = classificador.classificar_dataframe(pares).astype(str)
+    pares["rules_hash"] = classificador.versao
+    linhas = pares[["app_title_id", "process_name", "category", "rules_hash"]].to_dict("records")
+
+    upsert = text(
+        f"INSERT INTO `{tabela_categorias}` (app_title_id, process_name, category, rules_hash) "
+        f"VALUES (:app_title_id, :process_name, :category, :rules_hash) "
+        f"ON DUPLICATE KEY UPDATE category = VALUES(category), rules_hash = VALUES(rules_hash)")
+    for inicio in range(0, len(linhas), tamanho_lote):
+        with engine.begin() as conexao:
+            conexao.execute(upsert, linhas[inicio:inicio + tamanho_lote])
+
+    resumo["por_categoria"] = pares["category"].value_counts().to_dict()
+    return resumo
+
+
+def main():
+    """Reclassifica o histórico do MySQL com as regras do arquivo."""
+    parser = argparse.ArgumentParser(
+        description="Classifica os títulos do histórico em categorias (tabela app_categories).")
+    parser.add_argument("--regras", default=RULES_FILE)
+    parser.add_argument("--tabela", default=TABLE_NAME)
+    args = parser.parse_args()
+
+    from sqlalchemy import create_engine
+    from Meu_Dia import get_database_url
+
+    classificador = ClassificadorCategorias.de_arquivo(args.regras)
+    resumo = reclassificar_historico(create_engine(get_database_url()), classificador, args.tabela)
+    print(f"{resumo['pares']} pares (título, processo) classificados em {CATEGORIES_TABLE}")
+    for categoria, quantidade in sorted(resumo["por_categoria"].items()):
+        print(f"  {categoria}: {quantidade}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,484 @@
+# -*- coding: utf-8 -*-
+"""
+Coletor Central de Sessões de Atividade
+=======================================
+
+Com muitas estações rodando o Meu_Dia.py, cada uma abria sua própria
+engine contra o MySQL central, e as conexões se acumulavam no fim do
+expediente. O coletor é um serviço HTTP pequeno que recebe as sessões
+de todas as estações e as grava no MySQL em lotes grandes, por uma única
+conexão:
+
+    estações (EnviadorColetor) --POST /sessoes--> ColetorAtividade
+                                                    |  diário + fsync (confirmação)
+                                                    v
+                                             GravadorMySQL (1 conexão, lotes grandes)
+
+Confirmação durável: a resposta 200 só é enviada depois que o lote foi
+acrescentado ao diário do coletor e sincronizado com o disco. Se o
+coletor cair antes de gravar no MySQL, o diário que sobrou é reenviado
+na partida seguinte (Recuperacao_Backup, sem duplicar sessões).
+
+O diário é dividido em segmentos de COLLECTOR_JOURNAL_ROTATE_RECORDS
+sessões; um segmento fechado é apagado assim que o gravador confirma
+(MySQL ou arquivo de pendentes) todas as sessões dele. Após uma queda, o
+reenvio cobre só o que ainda não estava confirmado (mais, no máximo, um
+segmento), e não o diário de todo o tempo em execução.
+
+Do lado das estações, o EnviadorColetor usa a mesma fila, lotes e
+derramamento em disco do GravadorMySQL, trocando o INSERT por um POST.
+Um lote recusado pelo coletor (4xx) não é tentado de novo: as sessões
+inválidas vão para SENDER_REJECT_FILE e as demais seguem.
+
+Uso pela linha de comando:
+    python Coletor_Atividade.py                        # serve em 127.0.0.1:8765
+    python Coletor_Atividade.py --endereco 0.0.0.0
+    python Coletor_Atividade.py --carga 20             # 20 remetentes sintéticos
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Diario_Atividade import DiarioAtividade, FSYNC_SEMPRE
+from Gravador_MySQL import GravadorEmLotes, GravadorMySQL, TABLE_NAME, HOST_NAME
+from Recursos_Processo import CAMPOS_RECURSOS
+
+# =============================================================================
+# CONFIGURAÇÕES DO COLETOR
+# =============================================================================
+
+COLLECTOR_ADDRESS = "127.0.0.1"
+COLLECTOR_PORT = 8765
+COLLECTOR_URL = f"http://{COLLECTOR_ADDRESS}:{COLLECTOR_PORT}/sessoes"
+
+COLLECTOR_JOURNAL = "coletor_sessoes.jsonl"      # Diário de confirmação
+COLLECTOR_JOURNAL_ROTATE_RECORDS = 10000         # Sessões por segmento do diário
+COLLECTOR_SPILL_FILE = "coletor_mysql_pendentes.jsonl"
+COLLECTOR_BATCH_SIZE = 2000                      # Linhas por INSERT no MySQL
+COLLECTOR_FLUSH_SECONDS = 5.0                    # Tempo máximo até gravar um lote parcial
+COLLECTOR_MAX_QUEUE = 100000                     # Sessões aguardando o MySQL
+COLLECTOR_MAX_BODY = 4 * 1024 * 1024             # Tamanho máximo de um POST
+
+# Lado das estações
+SENDER_BATCH_SIZE = 50                           # Sessões por POST
+SENDER_FLUSH_SECONDS = 10.0                      # Tempo máximo até enviar um lote parcial
+SENDER_TIMEOUT_SECONDS = 5.0
+SENDER_SPILL_FILE = "coletor_pendentes.jsonl"
+SENDER_REJECT_FILE = "coletor_rejeitados.jsonl"  # Sessões recusadas (4xx), com o erro
+
+
+def _validar(registro):
+    """Sessão recebida no formato do rastreador, ou ValueError."""
+    if not isinstance(registro, dict):
+        raise ValueError("cada sessão deve ser um objeto JSON")
+    try:
+        datetime.datetime.fromisoformat(registro["timestamp_end"])
+        valido = {
+            "timestamp_end": registro["timestamp_end"],
+            "application_or_url": registro.get("application_or_url"),
+            "duration_seconds": float(registro["duration_seconds"]),
+            "process_name": registro.get("process_name"),
+            "host": str(registro.get("host") or "desconhecido"),
+        }
+        for campo in CAMPOS_RECURSOS:
+            if registro.get(campo) is not None:
+                valido[campo] = float(registro[campo])
+        return valido
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"sessão inválida: {e}") from e
+
+
+def postar_sessoes(url, registros, timeout=SENDER_TIMEOUT_SECONDS):
+    """
+    Envia um lote de sessões ao coletor.
+
+    Args:
+        url (str): Endereço do coletor (…/sessoes)
+        registros (list): Sessões no formato do rastreador, com "host"
+        timeout (float): Tempo máximo de espera pela confirmação
+
+    Returns:
+        int: Sessões confirmadas pelo coletor
+
+    Raises:
+        urllib.error.HTTPError: Lote recusado (4xx) ou coletor sem diário (503)
+        OSError: Coletor inacessível ou confirmação incompleta
+    """
+    corpo = json.dumps(registros, ensure_ascii=False).encode("utf-8")
+    pedido = urllib.request.Request(
+        url, data=corpo, method="POST", headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(pedido, timeout=timeout) as resposta:
+        aceitos = json.loads(resposta.read())["aceitos"]
+    if aceitos != len(registros):
+        raise OSError(f"coletor confirmou {aceitos} de {len(registros)} sessões")
+    return aceitos
+
+
+# =============================================================================
+# LADO DAS ESTAÇÕES
+# =============================================================================
+
+class EnviadorColetor(GravadorEmLotes):
+    """
+    Thread que envia as sessões desta estação ao coletor central.
+
+    Com o coletor fora do ar, as sessões ficam em SENDER_SPILL_FILE e são
+    reenviadas quando ele volta, como no GravadorMySQL. Um lote recusado
+    (4xx) seria recusado de novo e travaria os seguintes: ele é reenviado
+    sessão a sessão e só as recusadas vão para arquivo_rejeitados.
+
+    Args:
+        url (str): Endereço do coletor
+        host (str): Nome desta estação (entra na session_key)
+        batch_size (int): Sessões por POST
+        flush_interval_seconds (float): Tempo máximo até enviar um lote parcial
+        arquivo_pendentes (str): Arquivo JSON Lines de derramamento
+        timeout (float): Tempo máximo de espera por confirmação
+        arquivo_rejeitados (str): Sessões recusadas pelo coletor, com o erro
+        **opcoes: Demais parâmetros do GravadorEmLotes
+    """
+
+    def __init__(self, url=COLLECTOR_URL, host=HOST_NAME, batch_size=SENDER_BATCH_SIZE,
+                 flush_interval_seconds=SENDER_FLUSH_SECONDS, arquivo_pendentes=SENDER_SPILL_FILE,
+                 timeout=SENDER_TIMEOUT_SECONDS, arquivo_rejeitados=SENDER_REJECT_FILE, **opcoes):
+        super().__init__(batch_size=batch_size, flush_interval_seconds=flush_interval_seconds,
+                         arquivo_pendentes=arquivo_pendentes, descricao="coletor", **opcoes)
+        self.url = url
+        self.host = host
+        self.timeout = timeout
+        self.arquivo_rejeitados = arquivo_rejeitados
+        self.total_rejeitados = 0
+
+    def _inserir(self, registros):
+        lote = [dict(r, host=r.get("host") or self.host) for r in registros]
+        try:
+            self.total_gravados += postar_sessoes(self.url, lote, self.timeout)
+        except urllib.error.HTTPError as e:
+            # 408/429 e 5xx são transitórios: derramados e tentados de novo
+            if not 400 <= e.code < 500 or e.code in (408, 429):
+                raise
+            if len(lote) > 1:
+                # Isola as sessões recusadas; as demais são confirmadas
+                for registro in lote:
+                    self._inserir([registro])
+                return
+            self._rejeitar(lote[0], f"HTTP {e.code}: {e.read().decode('utf-8', 'replace')}")
+
+    def _rejeitar(self, registro, erro):
+        """Guarda uma sessão que o coletor recusa, em vez de reenviá-la para sempre."""
+        if self.total_rejeitados == 0:
+            print(f"Sessões recusadas pelo coletor vão para {self.arquivo_rejeitados}: {erro}")
+        with DiarioAtividade(self.arquivo_rejeitados, fsync_policy=FSYNC_SEMPRE) as diario:
+            diario.registrar(dict(registro, erro_coletor=erro))
+        self.total_rejeitados += 1
+
+
+# =============================================================================
+# SERVIÇO COLETOR
+# =============================================================================
+
+class _ManipuladorColetor(BaseHTTPRequestHandler):
+    """POST /sessoes recebe um lote (array JSON); GET /saude devolve contadores."""
+
+    # Mantém a conexão aberta entre lotes do mesmo remetente
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if self.path != "/sessoes":
+            return self._responder(404, {"erro": "caminho desconhecido"})
+
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        if tamanho > COLLECTOR_MAX_BODY:
+            return self._responder(413, {"erro": "lote grande demais"})
+        try:
+            corpo = json.loads(self.rfile.read(tamanho))
+            registros = [_validar(r) for r in (corpo if isinstance(corpo, list) else [corpo])]
+        except ValueError as e:
+            return self._responder(400, {"erro": str(e)})
+
+        try:
+            aceitos = self.server.coletor.receber(registros)
+        except OSError as e:
+            # Sem o diário não há confirmação durável: o remetente tenta de novo
+            return self._responder(503, {"erro": str(e)})
+        self._responder(200, {"aceitos": aceitos})
+
+    def do_GET(self):
+        if self.path != "/saude":
+            return self._responder(404, {"erro": "caminho desconhecido"})
+        self._responder(200, self.server.coletor.estatisticas())
+
+    def _responder(self, status, conteudo):
+        corpo = json.dumps(conteudo).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        # Uma linha por POST poluiria o console; erros vão como resposta
+        pass
+
+
+class ColetorAtividade:
+    """
+    Serviço que recebe sessões das estações e as grava no MySQL em lotes.
+
+    Args:
+        url_conexao (str): URL SQLAlchemy do MySQL central
+        endereco (str): Endereço de escuta (127.0.0.1 para testes locais)
+        porta (int): Porta HTTP
+        tabela (str): Tabela de destino
+        arquivo_diario (str): Diário de confirmação das sessões recebidas
+        batch_size (int): Linhas por INSERT
+        flush_interval_seconds (float): Tempo máximo até gravar um lote parcial
+        engine: Engine SQLAlchemy já criada (opcional; substitui url_conexao)
+    """
+
+    def __init__(self, url_conexao=None, endereco=COLLECTOR_ADDRESS, porta=COLLECTOR_PORT,
+                 tabela=TABLE_NAME, arquivo_diario=COLLECTOR_JOURNAL,
+                 batch_size=COLLECTOR_BATCH_SIZE, flush_interval_seconds=COLLECTOR_FLUSH_SECONDS,
+                 engine=None):
+        if engine is None:
+            from sqlalchemy import create_engine
+
+            # Uma única conexão para todas as estações
+            engine = create_engine(url_conexao, pool_size=1, max_overflow=0,
+                                   pool_pre_ping=True, pool_recycle=3600)
+
+        self.arquivo_diario = arquivo_diario
+        self.gravador = GravadorMySQL(engine=engine, tabela=tabela, batch_size=batch_size,
+                                      flush_interval_seconds=flush_interval_seconds,
+                                      max_fila=COLLECTOR_MAX_QUEUE,
+                                      arquivo_pendentes=COLLECTOR_SPILL_FILE)
+        self.total_recebidos = 0
+        self._lock = threading.Lock()
+        self._diario = None
+        self._sessoes_segmento = 0
+        # Segmentos fechados do diário: (caminho, total_enfileirados do gravador no fechamento)
+        self._segmentos = []
+
+        self.servidor = ThreadingHTTPServer((endereco, porta), _ManipuladorColetor)
+        self.servidor.daemon_threads = True
+        self.servidor.coletor = self
+
+    @property
+    def endereco(self):
+        """(host, porta) em que o serviço está escutando."""
+        return self.servidor.server_address
+
+    def iniciar(self):
+        """Reenvia o diário de uma execução interrompida e começa a aceitar sessões."""
+        self._recuperar_diario_anterior()
+        self._diario = DiarioAtividade(self.arquivo_diario, fsync_policy=FSYNC_SEMPRE)
+        self.gravador.start()
+        threading.Thread(target=self.servidor.serve_forever, name="ColetorHTTP",
+                         daemon=True).start()
+
+    def parar(self):
+        """Para de aceitar sessões, grava o que falta e descarta o diário confirmado."""
+        self.servidor.shutdown()
+        self.servidor.server_close()
+        self.gravador.parar()
+        with self._lock:
+            self._diario.fechar()
+            # Tudo o que foi confirmado está no MySQL ou no arquivo de pendentes
+            for caminho, _ in self._segmentos:
+                os.remove(caminho)
+            self._segmentos = []
+            os.remove(self.arquivo_diario)
+
+    def receber(self, registros):
+        """
+        Confirma um lote: diário + fsync, depois fila do gravador.
+
+        O enfileiramento fica sob o mesmo lock do diário: a ordem da fila
+        do gravador é a do diário, o que permite apagar os segmentos já
+        confirmados (_podar_segmentos).
+
+        Returns:
+            int: Sessões aceitas
+        """
+        with self._lock:
+            self._diario.registrar_varios(registros)
+            self.total_recebidos += len(registros)
+            for registro in registros:
+                self.gravador.registrar(registro)
+            self._sessoes_segmento += len(registros)
+            if self._sessoes_segmento >= COLLECTOR_JOURNAL_ROTATE_RECORDS:
+                self._rotacionar_diario()
+            self._podar_segmentos()
+        return len(registros)
+
+    def _rotacionar_diario(self):
+        """Fecha o segmento atual do diário e abre outro (com o lock)."""
+        self._diario.fechar()
+        numero = self._segmentos[-1][0].rsplit(".", 1)[1] if self._segmentos else "0"
+        caminho = f"{self.arquivo_diario}.{int(numero) + 1}"
+        os.replace(self.arquivo_diario, caminho)
+        self._segmentos.append((caminho, self.gravador.total_enfileirados))
+        self._diario = DiarioAtividade(self.arquivo_diario, fsync_policy=FSYNC_SEMPRE)
+        self._sessoes_segmento = 0
+
+    def _podar_segmentos(self):
+        """Apaga os segmentos fechados cujas sessões o gravador já confirmou (com o lock)."""
+        while self._segmentos and self.gravador.total_processados >= self._segmentos[0][1]:
+            os.remove(self._segmentos.pop(0)[0])
+
+    def _segmentos_no_disco(self):
+        """Segmentos fechados deixados por uma execução anterior, em ordem."""
+        caminhos = glob.glob(glob.escape(self.arquivo_diario) + ".*")
+        numerados = [c for c in caminhos if c.rsplit(".", 1)[1].isdigit()]
+        return sorted(numerados, key=lambda c: int(c.rsplit(".", 1)[1]))
+
+    def estatisticas(self):
+        return {
+            "recebidos": self.total_recebidos,
+            "gravados": self.gravador.total_gravados,
+            "derramados": self.gravador.total_derramados,
+        }
+
+    def _recuperar_diario_anterior(self):
+        """
+        Sessões confirmadas por uma execução que caiu antes de gravá-las.
+
+        O diário antigo é renomeado e reenviado com checkpoint; se o MySQL
+        estiver fora do ar, ele fica para a próxima partida.
+        """
+        from Recuperacao_Backup import recuperar_backup, CHECKPOINT_SUFFIX
+
+        anterior = self.arquivo_diario + ".recuperar"
+        # Segmentos fechados e ainda não confirmados, depois o segmento aberto;
+        # em duas quedas seguidas, juntam-se ao diário ainda não reenviado
+        restantes = self._segmentos_no_disco()
+        if os.path.exists(self.arquivo_diario):
+            restantes.append(self.arquivo_diario)
+        for caminho in restantes:
+            if os.path.exists(anterior):
+                with open(anterior, 'ab') as destino, open(caminho, 'rb') as origem:
+                    destino.write(origem.read())
+                    destino.flush()
+                    os.fsync(destino.fileno())
+                os.remove(caminho)
+            else:
+                os.replace(caminho, anterior)
+        if not os.path.exists(anterior):
+            return
+
+        try:
+            resumo = recuperar_backup(anterior, self.gravador)
+        except Exception as e:
+            motivo = str(e).splitlines()[0] if str(e) else type(e).__name__
+            print(f"Diário anterior mantido em {anterior} (MySQL indisponível: {motivo})")
+            return
+        print(f"Diário anterior reenviado: {resumo['inseridos']} sessões inseridas, "
+              f"{resumo['existentes']} já no banco")
+        os.remove(anterior)
+        if os.path.exists(anterior + CHECKPOINT_SUFFIX):
+            os.remove(anterior + CHECKPOINT_SUFFIX)
+
+
+# =============================================================================
+# CARGA SINTÉTICA
+# =============================================================================
+
+def carga_sintetica(url=COLLECTOR_URL, remetentes=10, sessoes_por_remetente=1000,
+                    lote=SENDER_BATCH_SIZE):
+    """
+    Envia sessões sintéticas de vários remetentes simultâneos ao coletor.
+
+    Args:
+        url (str): Endereço do coletor
+        remetentes (int): Estações simuladas (uma thread cada)
+        sessoes_por_remetente (int): Sessões enviadas por estação
+        lote (int): Sessões por POST
+
+    Returns:
+        dict: sessões enviadas, segundos, sessões/s e latências (ms) p50/p95/p99
+    """
+    latencias = []
+    lock = threading.Lock()
+    inicio_carga = datetime.datetime.now()
+
+    def remetente(numero):
+        host = f"sintetico-{numero:03d}"
+        for inicio in range(0, sessoes_por_remetente, lote):
+            registros = [{
+                "timestamp_end": (inicio_carga + datetime.timedelta(seconds=i)).isoformat(),
+                "application_or_url": f"Janela {i % 50} - Aplicativo {i % 7}",
+                "duration_seconds": 5.0,
+                "process_name": f"app{i % 7}.exe",
+                "host": host,
+            } for i in range(inicio, min(inicio + lote, sessoes_por_remetente))]
+            t0 = time.perf_counter()
+            postar_sessoes(url, registros)
+            with lock:
+                latencias.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=remetente, args=(n,)) for n in range(remetentes)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    segundos = time.perf_counter() - t0
+
+    latencias.sort()
+    percentil = lambda p: latencias[min(len(latencias) - 1, int(p * len(latencias)))] * 1000
+    total = remetentes * sessoes_por_remetente
+    return {
+        "sessoes": total,
+        "segundos": round(segundos, 3),
+        "sessoes_por_segundo": round(total / segundos, 1) if segundos else 0.0,
+        "p50_ms": round(percentil(0.50), 2),
+        "p95_ms": round(percentil(0.95), 2),
+        "p99_ms": round(percentil(0.99), 2),
+    }
+
+
+def main():
+    """Executa o coletor (ou a carga sintética contra um coletor)."""
+    parser = argparse.ArgumentParser(description="Coletor central de sessões de atividade.")
+    parser.add_argument("--endereco", default=COLLECTOR_ADDRESS)
+    parser.add_argument("--porta", type=int, default=COLLECTOR_PORT)
+    parser.add_argument("--tabela", default=TABLE_NAME)
+    parser.add_argument("--carga", type=int, metavar="REMETENTES",
+                        help="Em vez de servir, envia carga sintética ao coletor")
+    parser.add_argument("--sessoes", type=int, default=1000,
+                        help="Sessões por remetente na carga sintética")
+    args = parser.parse_args()
+
+    if args.carga:
+        url = f"http://{args.endereco}:{args.porta}/sessoes"
+        print(carga_sintetica(url, args.carga, args.sessoes))
+        return
+
+    from Meu_Dia import get_database_url
+
+    coletor = ColetorAtividade(get_database_url(), args.endereco, args.porta, args.tabela)
+    coletor.iniciar()
+    print(f"Coletor escutando em http://{args.endereco}:{args.porta}/sessoes (Ctrl+C para parar)")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        print("Encerrando coletor, gravando últimos lotes...")
+        coletor.parar()
+        print(coletor.estatisticas())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Destinos (Sinks) para as Sessões de Atividade
+=============================================
+
+Cada destino recebe as sessões encerradas pelo RastreadorAtividade e
+decide como armazená-las. Todos seguem o mesmo contrato mínimo:
+
+    destino.registrar(registro)   # uma sessão encerrada (dict)
+    destino.fechar()              # libera recursos e envia pendências
+
+Destinos disponíveis:
+- DestinoMemoria: mantém os registros em um buffer colunar compacto
+- DestinoJSON: diário JSON Lines + compactação no JSON legado ao fechar
+- DestinoCSV: acrescenta uma linha por sessão a um arquivo CSV
+- DestinoMySQL: envia ao MySQL em lotes por uma thread (GravadorMySQL)
+- DestinoColetor: envia em lotes ao coletor central (Coletor_Atividade)
+
+Para segmentos rotativos e compactados (JSON Lines ou CSV), veja o
+ArquivoRotativo em Arquivo_Rotativo.py, que segue o mesmo contrato.
+
+Os destinos não compartilham estado global: vários podem ser usados ao
+mesmo tempo pelo mesmo rastreador, ou por rastreadores diferentes.
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import csv
+import os
+
+from Diario_Atividade import (DiarioAtividade, compactar_para_json,
+                              JOURNAL_FILE, FSYNC_POLICY)
+from Buffer_Sessoes import BufferSessoes
+
+# Colunas dos arquivos tabulares, na ordem do registro
+COLUNAS_REGISTRO = ("timestamp_end", "application_or_url", "duration_seconds", "process_name")
+
+
+class DestinoMemoria:
+    """
+    Mantém as sessões em memória.
+
+    Args:
+        registros: Coleção a ser preenchida (qualquer objeto com append).
+                   Padrão: um BufferSessoes novo. Permite que código
+                   existente continue lendo a mesma coleção.
+    """
+
+    def __init__(self, registros=None):
+        self.registros = registros if registros is not None else BufferSessoes()
+
+    def registrar(self, registro):
+        self.registros.append(registro)
+
+    def fechar(self):
+        pass
+
+    def __len__(self):
+        return len(self.registros)
+
+
+class DestinoJSON:
+    """
+    Grava as sessões no diário JSON Lines e, ao fechar, compacta o diário
+    no arquivo JSON legado (array indentado).
+
+    Args:
+        caminho_diario (str): Arquivo JSON Lines do diário
+        caminho_json (str): Arquivo JSON legado gerado ao fechar
+                            (None para não compactar)
+        fsync_policy (str): Política de fsync do diário
+    """
+
+    def __init__(self, caminho_diario=JOURNAL_FILE, caminho_json="activity_log.json",
+                 fsync_policy=FSYNC_POLICY):
+        self.caminho_diario = caminho_diario
+        self.caminho_json = caminho_json
+        self.diario = DiarioAtividade(caminho_diario, fsync_policy=fsync_policy)
+
+    def registrar(self, registro):
+        self.diario.registrar(registro)
+
+    def fechar(self):
+        self.diario.fechar()
+        if self.caminho_json:
+            compactar_para_json(self.caminho_diario, self.caminho_json)
+
+
+class DestinoCSV:
+    """
+    Acrescenta uma linha por sessão a um arquivo CSV.
+
+    O arquivo é aberto uma única vez; o cabeçalho só é escrito quando o
+    arquivo é novo ou está vazio. Se o arquivo já existe, as colunas do
+    cabeçalho existente são mantidas (arquivos antigos não têm
+    process_name, por exemplo).
+
+    Args:
+        caminho (str): Arquivo CSV de saída
+        colunas (tuple): Colunas gravadas, na ordem
+    """
+
+    def __init__(self, caminho="activity_log.csv", colunas=COLUNAS_REGISTRO):
+        self.caminho = caminho
+        self.colunas = colunas
+
+        novo = not os.path.exists(caminho) or os.path.getsize(caminho) == 0
+        if not novo:
+            with open(caminho, 'r', encoding='utf-8', newline='') as f:
+                self.colunas = tuple(next(csv.reader(f), colunas))
+
+        self._arquivo = open(caminho, 'a', encoding='utf-8', newline='')
+        self._escritor = csv.writer(self._arquivo)
+        if novo:
+            self._escritor.writerow(colunas)
+            self._arquivo.flush()
+
+    def registrar(self, registro):
+        self._escritor.writerow([registro.get(c) for c in self.colunas])
+        self._arquivo.flush()
+
+    def fechar(self):
+        if not self._arquivo.closed:
+            self._arquivo.close()
+
+
+class DestinoMySQL:
+    """
+    Envia as sessões ao MySQL em lotes, por meio de um GravadorMySQL
+    próprio (thread, fila limitada e derramamento em disco).
+
+    Args:
+        url_conexao (str): URL SQLAlchemy do banco de dados
+        tabela (str): Tabela de destino
+        **opcoes: Demais parâmetros repassados ao GravadorMySQL
+    """
+
+    def __init__(self, url_conexao=None, tabela="uso_aplicativos", **opcoes):
+        # Importado aqui para que os demais destinos não exijam SQLAlchemy
+        from Gravador_MySQL import GravadorMySQL
+
+        self.gravador = GravadorMySQL(url_conexao, tabela=tabela, **opcoes)
+        self.gravador.start()
+
+    def registrar(self, registro):
+        self.gravador.registrar(registro)
+
+    def fechar(self):
+        self.gravador.parar()
+
+    @property
+    def total_gravados(self):
+        return self.gravador.total_gravados
+
+
+class DestinoColetor:
+    """
+    Envia as sessões ao coletor central (Coletor_Atividade.py) em lotes,
+    em vez de abrir uma conexão própria com o MySQL.
+
+    Args:
+        url (str): Endereço do coletor (…/sessoes)
+        **opcoes: Demais parâmetros repassados ao EnviadorColetor
+    """
+
+    def __init__(self, url=None, **opcoes):
+        from Coletor_Atividade import EnviadorColetor, COLLECTOR_URL
+
+        self.gravador = EnviadorColetor(url or COLLECTOR_URL, **opcoes)
+        self.gravador.start()
+
+    def registrar(self, registro):
+        self.gravador.registrar(registro)
+
+    def fechar(self):
+        self.gravador.parar()
+
+    @property
+    def total_gravados(self):
+        return self.gravador.total_gravados
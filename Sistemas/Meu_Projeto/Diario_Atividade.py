@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+Diário (Journal) de Atividades em JSON Lines
+============================================
+
+Substitui a regravação completa do arquivo ``activity_log.json`` a cada
+mudança de janela por um diário append-only: cada sessão encerrada vira
+uma única linha JSON compacta acrescentada ao final do arquivo. O custo
+de cada gravação passa a ser proporcional ao tamanho do registro, e não
+ao tamanho de todo o histórico do dia.
+
+Funcionalidades:
+- Gravação append-only de um registro por linha (JSON Lines)
+- Política de fsync configurável ("sempre", "intervalo" ou "nunca")
+- Leitura em streaming do diário, tolerante a última linha truncada
+- Reabertura segura: uma linha incompleta deixada por uma queda é
+  descartada antes de novos registros serem acrescentados
+- Compactação única para o formato legado (array JSON indentado)
+
+Formato de cada linha do diário:
+    {"timestamp_end":"2025-06-28T14:30:15.123456","application_or_url":"...","duration_seconds":45.67}
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import json
+import os
+import time
+
+# =============================================================================
+# CONFIGURAÇÕES DO DIÁRIO
+# =============================================================================
+
+# Arquivo padrão do diário (uma sessão por linha)
+JOURNAL_FILE = "activity_log.jsonl"
+
+# Políticas de sincronização com o disco:
+# - "sempre": fsync após cada registro (mais seguro, mais lento)
+# - "intervalo": fsync no máximo a cada FSYNC_INTERVAL_SECONDS
+# - "nunca": deixa o sistema operacional decidir (apenas flush)
+FSYNC_SEMPRE = "sempre"
+FSYNC_INTERVALO = "intervalo"
+FSYNC_NUNCA = "nunca"
+POLITICAS_FSYNC = (FSYNC_SEMPRE, FSYNC_INTERVALO, FSYNC_NUNCA)
+
+FSYNC_POLICY = FSYNC_INTERVALO
+FSYNC_INTERVAL_SECONDS = 1.0
+
+# Bytes lidos por vez ao procurar o início de uma linha incompleta
+_BLOCO_REPARO = 64 * 1024
+
+
+def reparar_final(caminho):
+    """
+    Garante que o arquivo termine em uma linha completa.
+
+    Se o último trecho não termina em "\n" (escrita interrompida por uma
+    queda), ele é removido; se for um JSON válido, só recebe o "\n" que
+    faltava. Sem isso, o próximo registro seria colado na linha quebrada
+    e os dois se perderiam.
+
+    Args:
+        caminho (str): Arquivo JSON Lines
+
+    Returns:
+        int: Bytes descartados do final do arquivo
+    """
+    try:
+        f = open(caminho, 'rb+')
+    except FileNotFoundError:
+        return 0
+    with f:
+        tamanho = f.seek(0, os.SEEK_END)
+        if tamanho == 0:
+            return 0
+        f.seek(tamanho - 1)
+        if f.read(1) == b"\n":
+            return 0
+
+        # Início da última linha: o byte logo após o último "\n"
+        corte = 0
+        fim = tamanho
+        while fim > 0:
+            inicio = max(0, fim - _BLOCO_REPARO)
+            f.seek(inicio)
+            posicao = f.read(fim - inicio).rfind(b"\n")
+            if posicao >= 0:
+                corte = inicio + posicao + 1
+                break
+            fim = inicio
+
+        f.seek(corte)
+        try:
+            json.loads(f.read(tamanho - corte))
+            f.write(b"\n")
+            descartados = 0
+        except ValueError:
+            f.truncate(corte)
+            descartados = tamanho - corte
+        f.flush()
+        os.fsync(f.fileno())
+    return descartados
+
+
+class DiarioAtividade:
+    """
+    Diário append-only de sessões de atividade.
+
+    O arquivo é aberto uma única vez em modo de acréscimo e mantido aberto
+    enquanto o diário estiver em uso. Cada chamada a ``registrar`` escreve
+    uma linha JSON compacta e aplica a política de fsync configurada.
+    Antes de abrir, uma linha incompleta no final é descartada
+    (``bytes_descartados``; veja reparar_final).
+
+    Args:
+        caminho (str): Caminho do arquivo de diário
+        fsync_policy (str): "sempre", "intervalo" ou "nunca"
+        fsync_interval_seconds (float): Intervalo mínimo entre fsyncs
+                                        quando a política é "intervalo"
+
+    Exemplo de uso:
+        with DiarioAtividade("activity_log.jsonl") as diario:
+            diario.registrar({"timestamp_end": "...", ...})
+    """
+
+    def __init__(self, caminho=JOURNAL_FILE, fsync_policy=FSYNC_POLICY,
+                 fsync_interval_seconds=FSYNC_INTERVAL_SECONDS):
+        if fsync_policy not in POLITICAS_FSYNC:
+            raise ValueError(f"Política de fsync inválida: {fsync_policy!r} "
+                             f"(use uma de {POLITICAS_FSYNC})")
+
+        self.caminho = caminho
+        self.fsync_policy = fsync_policy
+        self.fsync_interval_seconds = fsync_interval_seconds
+        self._ultimo_fsync = time.monotonic()
+        self.bytes_descartados = reparar_final(caminho)
+        self._arquivo = open(caminho, 'a', encoding='utf-8')
+
+    def registrar(self, registro):
+        """
+        Acrescenta um registro ao final do diário.
+
+        Args:
+            registro (dict): Sessão de atividade serializável em JSON
+        """
+        linha = json.dumps(registro, ensure_ascii=False, separators=(',', ':'))
+        self._arquivo.write(linha + "\n")
+        self._arquivo.flush()
+        self._sincronizar()
+
+    def registrar_varios(self, registros):
+        """
+        Acrescenta vários registros com uma única escrita.
+
+        A política de fsync é aplicada uma vez para o grupo inteiro
+        (com "sempre", um único fsync confirma todos os registros).
+
+        Args:
+            registros (iterable): Sessões de atividade serializáveis em JSON
+        """
+        linhas = [json.dumps(r, ensure_ascii=False, separators=(',', ':')) for r in registros]
+        if not linhas:
+            return
+        self._arquivo.write("\n".join(linhas) + "\n")
+        self._arquivo.flush()
+        self._sincronizar()
+
+    def _sincronizar(self, forcar=False):
+        """Aplica a política de fsync após uma escrita."""
+        if self.fsync_policy == FSYNC_NUNCA and not forcar:
+            return
+
+        agora = time.monotonic()
+        if (forcar or self.fsync_policy == FSYNC_SEMPRE
+                or agora - self._ultimo_fsync >= self.fsync_interval_seconds):
+            os.fsync(self._arquivo.fileno())
+            self._ultimo_fsync = agora
+
+    @property
+    def tamanho(self):
+        """Bytes já escritos no arquivo (usado pela rotação por tamanho)."""
+        return self._arquivo.tell()
+
+    def fechar(self):
+        """Sincroniza pendências com o disco e fecha o arquivo."""
+        if self._arquivo.closed:
+            return
+        self._arquivo.flush()
+        self._sincronizar(forcar=True)
+        self._arquivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.fechar()
+
+
+def ler_diario(caminho=JOURNAL_FILE):
+    """
+    Lê o diário em streaming, um registro por vez.
+
+    Linhas vazias são ignoradas. Uma última linha incompleta (sem "\n";
+    por exemplo, quando o processo foi encerrado no meio de uma escrita)
+    é descartada em silêncio. Uma linha completa que não é JSON válido
+    indica corrupção: ela é pulada com um aviso que aponta o número da
+    linha, e a leitura continua.
+
+    Args:
+        caminho (str): Caminho do arquivo de diário
+
+    Yields:
+        dict: Registros de atividade na ordem em que foram gravados
+    """
+    if not os.path.exists(caminho):
+        return
+
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for numero, linha in enumerate(f, start=1):
+            completa = linha.endswith("\n")
+            linha = linha.strip()
+            if not linha:
+                continue
+            try:
+                yield json.loads(linha)
+            except json.JSONDecodeError as e:
+                if completa:
+                    print(f"Aviso: {caminho}, linha {numero} inválida ignorada ({e})")
+                # Sem "\n": última linha truncada por queda do processo
+
+
+def compactar_para_json(caminho_diario=JOURNAL_FILE, caminho_json="activity_log.json"):
+    """
+    Converte o diário para o formato legado de array JSON.
+
+    O array é escrito em streaming para um arquivo temporário e depois
+    substitui o destino de forma atômica, de modo que consumidores do
+    ``activity_log.json`` nunca leiam um arquivo pela metade.
+
+    Args:
+        caminho_diario (str): Caminho do diário JSON Lines
+        caminho_json (str): Caminho do arquivo JSON legado
+
+    Returns:
+        int: Quantidade de registros escritos
+    """
+    temporario = caminho_json + ".tmp"
+    total = 0
+
+    with open(temporario, 'w', encoding='utf-8') as f:
+        f.write("[")
+        for registro in ler_diario(caminho_diario):
+            f.write(",\n" if total else "\n")
+            bloco = json.dumps(registro, indent=4, ensure_ascii=False)
+            # Indenta o objeto em um nível, como faria json.dump(lista, indent=4)
+            f.write("\n".join("    " + linha for linha in bloco.splitlines()))
+            total += 1
+        f.write("\n]" if total else "]")
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(temporario, caminho_json)
+    return total
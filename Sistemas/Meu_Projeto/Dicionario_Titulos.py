@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Dicionário de Títulos de Aplicativos (app_titles)
+=================================================
+
+Codifica os títulos de janela em inteiros. Títulos como
+"Interface_Monitoramento.py - Xscient (Workspace) - Cursor" ou caminhos
+completos do python.exe se repetem centenas de vezes por dia; guardar
+cada ocorrência por extenso infla a memória do rastreador, as linhas de
+``uso_aplicativos`` e seus índices.
+
+Com o dicionário, cada título distinto é armazenado uma única vez na
+tabela de dimensão ``app_titles`` e as linhas de fatos guardam apenas
+o ``app_title_id`` (INT UNSIGNED, 4 bytes).
+
+Modos de operação:
+- Local (sem engine): ids sequenciais em memória, usados pelo rastreador
+  para internar títulos e pelos buffers de sessão
+- MySQL (com engine): ids vindos de ``app_titles``; um cache em processo
+  (título -> id) evita idas ao banco para títulos já vistos, e os títulos
+  novos de um lote são resolvidos em uma única ida e volta
+
+Estrutura da dimensão:
+CREATE TABLE app_titles (
+    id INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    title_hash BINARY(20) NOT NULL,          -- SHA-1 do título
+    title VARCHAR(1000) NOT NULL,
+    UNIQUE KEY uq_app_titles_hash (title_hash)
+);
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import hashlib
+import threading
+
+# =============================================================================
+# CONFIGURAÇÕES
+# =============================================================================
+
+TITLES_TABLE = "app_titles"               # Tabela de dimensão dos títulos
+DETAIL_VIEW = "uso_aplicativos_detalhado"  # View com o título por extenso
+
+CREATE_TITLES_SQL = """
+CREATE TABLE IF NOT EXISTS `{tabela}` (
+    id INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+    title_hash BINARY(20) NOT NULL,
+    title VARCHAR(1000) NOT NULL,
+    UNIQUE KEY uq_{tabela}_hash (title_hash)
+)
+"""
+
+
+def hash_titulo(titulo):
+    """Hash de largura fixa (SHA-1, 20 bytes) usado na chave única."""
+    return hashlib.sha1(titulo.encode('utf-8')).digest()
+
+
+class DicionarioTitulos:
+    """
+    Mapeamento título <-> id com cache em processo.
+
+    Args:
+        engine: Engine SQLAlchemy para usar ``app_titles`` (None = modo local)
+        tabela (str): Nome da tabela de dimensão
+    """
+
+    def __init__(self, engine=None, tabela=TITLES_TABLE):
+        self.engine = engine
+        self.tabela = tabela
+        self._ids = {}         # título -> id
+        self._titulos = {}     # id -> título
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, titulo):
+        return titulo in self._ids
+
+    def internar(self, titulo):
+        """
+        Retorna a instância canônica do título.
+
+        Títulos iguais passam a compartilhar o mesmo objeto str na memória,
+        em vez de uma cópia por sessão registrada.
+        """
+        if titulo is None:
+            return None
+        id_titulo = self.id_de(titulo)
+        return self._titulos[id_titulo]
+
+    def id_de(self, titulo):
+        """
+        Retorna o id do título, cadastrando-o se for novo.
+
+        Args:
+            titulo (str): Título da janela
+
+        Returns:
+            int: Id do título
+        """
+        id_titulo = self._ids.get(titulo)
+        if id_titulo is not None:
+            return id_titulo
+        return self.ids_de([titulo])[titulo]
+
+    def ids_de(self, titulos):
+        """
+        Resolve vários títulos de uma vez.
+
+        Os títulos ausentes do cache são cadastrados em lote: no modo
+        MySQL, um INSERT IGNORE e um SELECT para todos eles.
+
+        Args:
+            titulos (iterable): Títulos a resolver
+
+        Returns:
+            dict: título -> id
+        """
+        resultado = {}
+        faltantes = []
+        for titulo in titulos:
+            id_titulo = self._ids.get(titulo)
+            if id_titulo is None:
+                faltantes.append(titulo)
+            else:
+                resultado[titulo] = id_titulo
+
+        if faltantes:
+            with self._lock:
+                if self.engine is None:
+                    novos = self._cadastrar_local(faltantes)
+                else:
+                    novos = self._cadastrar_mysql(faltantes)
+                for titulo, id_titulo in novos.items():
+                    self._ids[titulo] = id_titulo
+                    self._titulos[id_titulo] = titulo
+            resultado.update(novos)
+
+        return resultado
+
+    def titulo_de(self, id_titulo):
+        """Retorna o título de um id já conhecido pelo cache."""
+        return self._titulos.get(id_titulo)
+
+    def _cadastrar_local(self, titulos):
+        novos = {}
+        for titulo in titulos:
+            if titulo in self._ids or titulo in novos:
+                continue
+            novos[titulo] = len(self._ids) + len(novos) + 1
+        return novos
+
+    def _cadastrar_mysql(self, titulos):
+        from sqlalchemy import bindparam, text
+
+        por_hash = {hash_titulo(t): t for t in set(titulos)}
+        with self.engine.begin() as conexao:
+            conexao.execute(
+                text(f"INSERT IGNORE INTO `{self.tabela}` (title_hash, title) "
+                     f"VALUES (:title_hash, :title)"),
+                [{"title_hash": h, "title": t} for h, t in por_hash.items()]
+            )
+            linhas = conexao.execute(
+                text(f"SELECT id, title_hash FROM `{self.tabela}` "
+                     f"WHERE title_hash IN :hashes").bindparams(
+                         bindparam("hashes", expanding=True)),
+                {"hashes": list(por_hash)}
+            )
+            return {por_hash[bytes(h)]: id_titulo for id_titulo, h in linhas}
+
+
+def garantir_tabela_titulos(engine, tabela_fatos="uso_aplicativos",
+                            tabela_titulos=TITLES_TABLE):
+    """
+    Prepara o banco para as linhas de fatos compactas.
+
+    Passos (todos idempotentes):
+    1. Cria ``app_titles`` se não existir
+    2. Acrescenta ``app_title_id`` e ``process_name`` à tabela de fatos,
+       se faltarem
+    3. Cadastra os títulos legados e preenche ``app_title_id`` nas linhas
+       antigas que só têm ``application_or_url``
+    4. Cria a view ``uso_aplicativos_detalhado`` com o título por extenso,
+       para consultas e relatórios existentes
+
+    Args:
+        engine: Engine SQLAlchemy conectada ao MySQL
+        tabela_fatos (str): Tabela de sessões (uso_aplicativos)
+        tabela_titulos (str): Tabela de dimensão (app_titles)
+    """
+    from sqlalchemy import text
+
+    with engine.begin() as conexao:
+        conexao.execute(text(CREATE_TITLES_SQL.format(tabela=tabela_titulos)))
+
+        existentes = set(conexao.execute(text(
+            "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabela "
+            "AND COLUMN_NAME IN ('app_title_id', 'process_name')"),
+            {"tabela": tabela_fatos}).scalars())
+        if "app_title_id" not in existentes:
+            conexao.execute(text(
+                f"ALTER TABLE `{tabela_fatos}` "
+                f"ADD COLUMN app_title_id INT UNSIGNED NULL AFTER timestamp_end, "
+                f"MODIFY application_or_url VARCHAR(500) NULL"))
+        if "process_name" not in existentes:
+            conexao.execute(text(
+                f"ALTER TABLE `{tabela_fatos}` "
+                f"ADD COLUMN process_name VARCHAR(255) NULL AFTER duration_seconds"))
+
+        # Linhas legadas: cadastra os títulos e aponta para a dimensão
+        conexao.execute(text(
+            f"INSERT IGNORE INTO `{tabela_titulos}` (title_hash, title) "
+            f"SELECT DISTINCT UNHEX(SHA1(application_or_url)), application_or_url "
+            f"FROM `{tabela_fatos}` "
+            f"WHERE app_title_id IS NULL AND application_or_url IS NOT NULL"))
+        conexao.execute(text(
+            f"UPDATE `{tabela_fatos}` f JOIN `{tabela_titulos}` t "
+            f"ON t.title_hash = UNHEX(SHA1(f.application_or_url)) "
+            f"SET f.app_title_id = t.id, f.application_or_url = NULL "
+            f"WHERE f.app_title_id IS NULL"))
+
+        conexao.execute(text(
+            f"CREATE OR REPLACE VIEW `{DETAIL_VIEW}` AS "
+            f"SELECT f.id, f.timestamp_end, t.title AS application_or_url, "
+            f"f.duration_seconds, f.process_name, f.app_title_id "
+            f"FROM `{tabela_fatos}` f "
+            f"LEFT JOIN `{tabela_titulos}` t ON t.id = f.app_title_id"))
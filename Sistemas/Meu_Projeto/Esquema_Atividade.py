@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+Esquema Gerenciado da Tabela uso_aplicativos
+============================================
+
+Define a estrutura exata da tabela de sessões e a migra a partir de
+qualquer versão anterior (tabela sem índices criada pelo to_sql, tabela
+sem app_title_id, sem session_key etc.). Tudo é idempotente: verificar
+uma tabela já migrada custa três consultas ao information_schema.
+
+Estrutura:
+- Tipos exatos e NOT NULL nas colunas obrigatórias
+- Índices compostos para relatórios por período e por aplicativo:
+  (timestamp_end, app_title_id) e (app_title_id, timestamp_end)
+- Particionamento por mês em timestamp_end (RANGE sobre TO_DAYS), com
+  partições criadas com PARTITION_MONTHS_AHEAD meses de antecedência;
+  consultas com intervalo de datas só abrem as partições do período
+
+Como o MySQL exige que toda chave única contenha a coluna de
+particionamento, a chave primária é (id, timestamp_end) e a única da
+sessão é (session_key, timestamp_end) — a session_key já é derivada do
+timestamp_end, então a unicidade é a mesma.
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import datetime
+import re
+
+from sqlalchemy import text
+
+from Dicionario_Titulos import garantir_tabela_titulos
+
+# =============================================================================
+# CONFIGURAÇÕES
+# =============================================================================
+
+TABLE_NAME = "uso_aplicativos"
+PARTITION_MONTHS_AHEAD = 3        # Partições mensais criadas além do mês atual
+
+# Colunas: (nome, tipo no information_schema, aceita nulo, definição SQL)
+COLUNAS_ESQUEMA = (
+    ("timestamp_end", "datetime", False, "DATETIME NOT NULL"),
+    ("app_title_id", "int unsigned", True, "INT UNSIGNED NULL"),
+    ("application_or_url", "varchar(500)", True, "VARCHAR(500) NULL"),
+    ("duration_seconds", "decimal(10,2)", False, "DECIMAL(10,2) NOT NULL"),
+    ("process_name", "varchar(255)", True, "VARCHAR(255) NULL"),
+    ("session_key", "binary(20)", True, "BINARY(20) NULL"),
+    # Resumo de recursos do processo durante a sessão (Recursos_Processo)
+    ("resource_samples", "smallint unsigned", True, "SMALLINT UNSIGNED NULL"),
+    ("cpu_percent_min", "decimal(6,1)", True, "DECIMAL(6,1) NULL"),
+    ("cpu_percent_avg", "decimal(6,1)", True, "DECIMAL(6,1) NULL"),
+    ("cpu_percent_max", "decimal(6,1)", True, "DECIMAL(6,1) NULL"),
+    ("rss_mb_min", "decimal(9,1)", True, "DECIMAL(9,1) NULL"),
+    ("rss_mb_avg", "decimal(9,1)", True, "DECIMAL(9,1) NULL"),
+    ("rss_mb_max", "decimal(9,1)", True, "DECIMAL(9,1) NULL"),
+)
+
+# Índices: nome -> (colunas, único)
+INDICES_ESQUEMA = {
+    "PRIMARY": (("id", "timestamp_end"), True),
+    "uq_session_key": (("session_key", "timestamp_end"), True),
+    "ix_fim_app": (("timestamp_end", "app_title_id"), False),
+    "ix_app_fim": (("app_title_id", "timestamp_end"), False),
+}
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS `{tabela}` (
+    id INT AUTO_INCREMENT,
+    timestamp_end DATETIME NOT NULL,
+    app_title_id INT UNSIGNED NULL,
+    application_or_url VARCHAR(500) NULL,
+    duration_seconds DECIMAL(10,2) NOT NULL,
+    process_name VARCHAR(255) NULL,
+    session_key BINARY(20) NULL,
+    resource_samples SMALLINT UNSIGNED NULL,
+    cpu_percent_min DECIMAL(6,1) NULL,
+    cpu_percent_avg DECIMAL(6,1) NULL,
+    cpu_percent_max DECIMAL(6,1) NULL,
+    rss_mb_min DECIMAL(9,1) NULL,
+    rss_mb_avg DECIMAL(9,1) NULL,
+    rss_mb_max DECIMAL(9,1) NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, timestamp_end),
+    UNIQUE KEY uq_session_key (session_key, timestamp_end),
+    KEY ix_fim_app (timestamp_end, app_title_id),
+    KEY ix_app_fim (app_title_id, timestamp_end)
+)
+PARTITION BY RANGE (TO_DAYS(timestamp_end)) (
+{particoes}
+)
+"""
+
+
+# =============================================================================
+# PARTIÇÕES MENSAIS
+# =============================================================================
+
+def proximo_mes(data):
+    """Primeiro dia do mês seguinte."""
+    return (data.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+
+
+def nome_particao(mes):
+    """Nome da partição de um mês: p202507 para julho de 2025."""
+    return f"p{mes:%Y%m}"
+
+
+def _definicoes_particoes(primeiro_mes, ultimo_mes, com_maxvalue=True):
+    """Cláusulas PARTITION ... VALUES LESS THAN para cada mês do intervalo."""
+    definicoes = []
+    mes = primeiro_mes.replace(day=1)
+    while mes <= ultimo_mes:
+        limite = proximo_mes(mes)
+        definicoes.append(f"    PARTITION {nome_particao(mes)} "
+                          f"VALUES LESS THAN (TO_DAYS('{limite:%Y-%m-%d}'))")
+        mes = limite
+    if com_maxvalue:
+        definicoes.append("    PARTITION pmax VALUES LESS THAN MAXVALUE")
+    return ",\n".join(definicoes)
+
+
+def _ultimo_mes_desejado(hoje, meses_futuros):
+    mes = hoje.replace(day=1)
+    for _ in range(meses_futuros):
+        mes = proximo_mes(mes)
+    return mes
+
+
+# =============================================================================
+# INSPEÇÃO
+# =============================================================================
+
+def _tipo_normalizado(tipo):
+    """Remove a largura de exibição dos inteiros (int(10) unsigned -> int unsigned)."""
+    return re.sub(r"^(tinyint|smallint|mediumint|int|bigint)\(\d+\)", r"\1", tipo.lower())
+
+
+def _estado(conexao, tabela):
+    """Colunas, índices e partições atuais da tabela (None se ela não existe)."""
+    filtro = "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabela"
+    parametros = {"tabela": tabela}
+
+    colunas = {
+        nome: (_tipo_normalizado(tipo), nulo == "YES")
+        for nome, tipo, nulo in conexao.execute(text(
+            f"SELECT COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE "
+            f"FROM information_schema.COLUMNS {filtro}"), parametros)
+    }
+    if not colunas:
+        return None
+
+    indices = {}
+    for nome, coluna in conexao.execute(text(
+            f"SELECT INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS {filtro} "
+            f"ORDER BY INDEX_NAME, SEQ_IN_INDEX"), parametros):
+        indices.setdefault(nome, []).append(coluna)
+
+    particoes = [nome for (nome,) in conexao.execute(text(
+        f"SELECT PARTITION_NAME FROM information_schema.PARTITIONS {filtro} "
+        f"AND PARTITION_NAME IS NOT NULL ORDER BY PARTITION_ORDINAL_POSITION"), parametros)]
+
+    return colunas, {nome: tuple(c) for nome, c in indices.items()}, particoes
+
+
+def _pendencias(estado, hoje=None, meses_futuros=PARTITION_MONTHS_AHEAD):
+    """Lista do que falta para a tabela ficar igual ao esquema."""
+    if estado is None:
+        return ["tabela inexistente"]
+    colunas, indices, particoes = estado
+
+    pendencias = []
+    for nome, tipo, nulo, _ in COLUNAS_ESQUEMA:
+        if nome not in colunas:
+            pendencias.append(f"coluna {nome} ausente")
+        elif colunas[nome] != (tipo, nulo):
+            pendencias.append(f"coluna {nome} com tipo {colunas[nome][0]} "
+                              f"({'NULL' if colunas[nome][1] else 'NOT NULL'})")
+    for nome, (colunas_indice, _) in INDICES_ESQUEMA.items():
+        if indices.get(nome) != colunas_indice:
+            pendencias.append(f"índice {nome} ausente ou diferente")
+    if not particoes:
+        pendencias.append("tabela sem particionamento mensal")
+    else:
+        ultimo = nome_particao(_ultimo_mes_desejado(hoje or datetime.date.today(), meses_futuros))
+        if ultimo not in particoes:
+            pendencias.append(f"partições futuras ausentes (até {ultimo})")
+    return pendencias
+
+
+def verificar_esquema(engine, tabela=TABLE_NAME):
+    """
+    Compara a tabela com o esquema esperado, sem alterá-la.
+
+    Args:
+        engine: Engine SQLAlchemy conectada ao MySQL
+        tabela (str): Tabela de sessões
+
+    Returns:
+        list: Descrição das diferenças (vazia se a tabela está em dia)
+    """
+    with engine.connect() as conexao:
+        return _pendencias(_estado(conexao, tabela))
+
+
+# =============================================================================
+# MIGRAÇÃO
+# =============================================================================
+
+def migrar_esquema(engine, tabela=TABLE_NAME, tabela_titulos="app_titles",
+                   meses_futuros=PARTITION_MONTHS_AHEAD, hoje=None):
+    """
+    Cria ou migra a tabela de sessões para o esquema gerenciado.
+
+    Passos (cada um só é executado se necessário):
+    1. Cria a tabela completa, já particionada, se não existir
+    2. Acrescenta colunas ausentes e corrige tipos/nulidade
+    3. Prepara app_titles, preenche app_title_id e recria a view detalhada
+       (se ``tabela_titulos`` for informado)
+    4. Ajusta chave primária, chave única da sessão e índices compostos
+       (um único ALTER TABLE)
+    5. Particiona por mês, desde o mês da sessão mais antiga
+    6. Cria as partições dos próximos ``meses_futuros`` meses
+
+    Os passos 4 e 5 reconstroem a tabela uma única vez; nas execuções
+    seguintes apenas a verificação e o passo 3 são feitos.
+
+    Args:
+        engine: Engine SQLAlchemy conectada ao MySQL
+        tabela (str): Tabela de sessões
+        tabela_titulos (str): Tabela de títulos (None = não usar o dicionário)
+        meses_futuros (int): Meses com partição criada além do atual
+        hoje (datetime.date): Data de referência (padrão: hoje)
+
+    Returns:
+        list: Pendências encontradas antes da migração (vazia se nada mudou)
+
+    Raises:
+        RuntimeError: Se houver linhas com nulos em colunas obrigatórias
+    """
+    hoje = hoje or datetime.date.today()
+    ultimo_mes = _ultimo_mes_desejado(hoje, meses_futuros)
+
+    with engine.connect() as conexao:
+        estado = _estado(conexao, tabela)
+    pendencias = _pendencias(estado, hoje, meses_futuros)
+    if not pendencias:
+        # Estrutura em dia; só títulos de linhas legadas e a view
+        if tabela_titulos:
+            garantir_tabela_titulos(engine, tabela, tabela_titulos)
+        return []
+
+    with engine.begin() as conexao:
+        # 1. Tabela nova: já nasce com tudo
+        if estado is None:
+            conexao.execute(text(CREATE_TABLE_SQL.format(
+                tabela=tabela, particoes=_definicoes_particoes(hoje, ultimo_mes))))
+            estado = _estado(conexao, tabela)
+        colunas, indices, particoes = estado
+
+        # 2. Colunas ausentes ou com tipo diferente (tabelas criadas pelo
+        # to_sql não têm id nem created_at)
+        alteracoes = []
+        if "id" not in colunas:
+            alteracoes.append("ADD COLUMN id INT NOT NULL AUTO_INCREMENT FIRST")
+            alteracoes.append("ADD PRIMARY KEY (id, timestamp_end)")
+        if "created_at" not in colunas:
+            alteracoes.append("ADD COLUMN created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
+        for nome, tipo, nulo, definicao in COLUNAS_ESQUEMA:
+            if nome not in colunas:
+                alteracoes.append(f"ADD COLUMN `{nome}` {definicao}")
+            elif colunas[nome] != (tipo, nulo):
+                if not nulo:
+                    nulos = conexao.execute(text(
+                        f"SELECT COUNT(*) FROM `{tabela}` WHERE `{nome}` IS NULL")).scalar()
+                    if nulos:
+                        raise RuntimeError(
+                            f"{tabela}.{nome} tem {nulos} linhas nulas; corrija-as "
+                            f"antes da migração (a coluna passará a ser NOT NULL)")
+                alteracoes.append(f"MODIFY COLUMN `{nome}` {definicao}")
+        if alteracoes:
+            conexao.execute(text(f"ALTER TABLE `{tabela}` " + ", ".join(alteracoes)))
+            colunas, indices, particoes = _estado(conexao, tabela)
+
+    # 3. Dicionário de títulos e view (transação própria)
+    if tabela_titulos:
+        garantir_tabela_titulos(engine, tabela, tabela_titulos)
+
+    with engine.begin() as conexao:
+        # 4. Chaves e índices
+        alteracoes = []
+        for nome, (colunas_indice, unico) in INDICES_ESQUEMA.items():
+            if indices.get(nome) == colunas_indice:
+                continue
+            lista = ", ".join(f"`{c}`" for c in colunas_indice)
+            if nome == "PRIMARY":
+                if "PRIMARY" in indices:
+                    alteracoes.append("DROP PRIMARY KEY")
+                alteracoes.append(f"ADD PRIMARY KEY ({lista})")
+                continue
+            if nome in indices:
+                alteracoes.append(f"DROP INDEX `{nome}`")
+            alteracoes.append(f"ADD {'UNIQUE ' if unico else ''}KEY `{nome}` ({lista})")
+        if alteracoes:
+            conexao.execute(text(f"ALTER TABLE `{tabela}` " + ", ".join(alteracoes)))
+
+        # 5. Particionamento mensal a partir da sessão mais antiga
+        if not particoes:
+            mais_antiga = conexao.execute(text(
+                f"SELECT MIN(timestamp_end) FROM `{tabela}`")).scalar()
+            primeiro_mes = min(mais_antiga.date(), hoje) if mais_antiga else hoje
+            conexao.execute(text(
+                f"ALTER TABLE `{tabela}` PARTITION BY RANGE (TO_DAYS(timestamp_end)) (\n"
+                f"{_definicoes_particoes(primeiro_mes, ultimo_mes)}\n)"))
+
+        # 6. Partições futuras: divide a pmax (normalmente vazia)
+        else:
+            meses = sorted(p for p in particoes if re.fullmatch(r"p\d{6}", p))
+            desde = (proximo_mes(datetime.datetime.strptime(meses[-1], "p%Y%m").date())
+                     if meses else hoje)
+            if desde <= ultimo_mes:
+                if "pmax" in particoes:
+                    conexao.execute(text(
+                        f"ALTER TABLE `{tabela}` REORGANIZE PARTITION pmax INTO (\n"
+                        f"{_definicoes_particoes(desde, ultimo_mes)}\n)"))
+                else:
+                    conexao.execute(text(
+                        f"ALTER TABLE `{tabela}` ADD PARTITION (\n"
+                        f"{_definicoes_particoes(desde, ultimo_mes, com_maxvalue=False)}\n)"))
+
+    return pendencias
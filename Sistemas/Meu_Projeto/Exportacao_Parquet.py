@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+Exportação Incremental de uso_aplicativos para Parquet
+======================================================
+
+As análises pesadas consultavam o MySQL diretamente e disputavam o banco
+com os gravadores do monitoramento. Este job copia as sessões de
+``uso_aplicativos`` para um conjunto de dados Parquet particionado por
+dia (o mesmo formato de Parquet_Atividade), que pandas e DuckDB leem sem
+tocar no banco:
+
+    uso_aplicativos_parquet/
+    ├── _watermark.json                                  # último id exportado
+    ├── data=2025-06-28/
+    │   └── uso-000000000001-000000050000-0.parquet
+    └── data=2025-06-29/
+        └── uso-000000000001-000000050000-0.parquet
+
+- Paginação por chave (keyset): cada pedaço é ``id > último id ORDER BY
+  id LIMIT n``, lido com cursor do lado do servidor, sem OFFSET
+- Cada execução começa depois do último id exportado (watermark) e só
+  transfere as linhas novas
+- Os nomes dos arquivos trazem o intervalo de ids do pedaço; um pedaço
+  interrompido no meio é apagado e refeito na execução seguinte, então
+  nenhuma linha é exportada duas vezes
+- Só são exportadas linhas criadas há mais de EXPORT_SAFETY_SECONDS:
+  um INSERT com id menor que ainda não foi confirmado não fica para trás
+  do watermark
+
+Linhas alteradas depois de exportadas não são exportadas de novo (as
+sessões não são atualizadas pelo monitoramento).
+
+Leitura:
+    from Parquet_Atividade import ler_parquet
+    df = ler_parquet(EXPORT_DIR, inicio=datetime.date(2025, 7, 1))
+
+    -- DuckDB
+    SELECT * FROM read_parquet('uso_aplicativos_parquet/**/*.parquet', hive_partitioning = true);
+
+Uso pela linha de comando:
+    python Exportacao_Parquet.py
+    python Exportacao_Parquet.py --diretorio /dados/atividade --pedaco 100000
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import os
+
+import pyarrow as pa
+from sqlalchemy import text
+
+from Dicionario_Titulos import TITLES_TABLE
+from Esquema_Atividade import TABLE_NAME
+from Parquet_Atividade import gravar_particionado, PARQUET_COMPRESSION
+from Recursos_Processo import CAMPOS_RECURSOS
+
+# =============================================================================
+# CONFIGURAÇÕES
+# =============================================================================
+
+EXPORT_DIR = "uso_aplicativos_parquet"   # Diretório raiz do conjunto exportado
+EXPORT_CHUNK_ROWS = 50000                # Linhas por pedaço (uma consulta keyset)
+EXPORT_FETCH_ROWS = 5000                 # Linhas por leitura do cursor do servidor
+EXPORT_SAFETY_SECONDS = 60               # Idade mínima (created_at) das linhas exportadas
+WATERMARK_FILE = "_watermark.json"       # Ignorado pelo pyarrow (prefixo "_")
+
+# Colunas exportadas; o título vem de app_titles quando a linha só tem o id
+ESQUEMA_EXPORTACAO = pa.schema(
+    [("id", pa.int64()),
+     ("timestamp_end", pa.timestamp("us")),
+     ("app_title_id", pa.uint32()),
+     ("application_or_url", pa.string()),
+     ("duration_seconds", pa.float64()),
+     ("process_name", pa.string()),
+     ("resource_samples", pa.uint16())]
+    + [(campo, pa.float64()) for campo in CAMPOS_RECURSOS[1:]]
+)
+
+# Colunas DECIMAL no MySQL: convertidas de uma vez (decimal128 -> float64)
+_DECIMAIS = {"duration_seconds": pa.decimal128(10, 2),
+             **{campo: pa.decimal128(9, 1) for campo in CAMPOS_RECURSOS[1:]}}
+
+
+# =============================================================================
+# WATERMARK
+# =============================================================================
+
+def ler_watermark(diretorio=EXPORT_DIR):
+    """
+    Estado da exportação.
+
+    Returns:
+        dict: ultimo_id, linhas, atualizado_em e em_andamento (intervalo de
+              ids de um pedaço interrompido, ou None)
+    """
+    try:
+        with open(os.path.join(diretorio, WATERMARK_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"ultimo_id": 0, "linhas": 0, "atualizado_em": None, "em_andamento": None}
+
+
+def _salvar_watermark(diretorio, estado):
+    """Grava o watermark de forma atômica (arquivo temporário + replace)."""
+    caminho = os.path.join(diretorio, WATERMARK_FILE)
+    temporario = caminho + ".tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(estado, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, caminho)
+
+
+def _nome_pedaco(primeiro_id, ultimo_id):
+    return f"uso-{primeiro_id:012d}-{ultimo_id:012d}"
+
+
+def _apagar_pedaco(diretorio, intervalo):
+    """Remove os arquivos de um pedaço interrompido."""
+    nome = _nome_pedaco(*intervalo)
+    for caminho in glob.glob(os.path.join(diretorio, "*", f"{nome}-*.parquet")):
+        os.remove(caminho)
+
+
+# =============================================================================
+# LEITURA DO MYSQL
+# =============================================================================
+
+def _consulta(tabela, tabela_titulos, atraso_segundos):
+    colunas_recursos = "".join(f", f.{campo}" for campo in CAMPOS_RECURSOS)
+    seguranca = (f"AND f.created_at < CURRENT_TIMESTAMP - INTERVAL {int(atraso_segundos)} SECOND "
+                 if atraso_segundos else "")
+    return text(
+        f"SELECT f.id, f.timestamp_end, f.app_title_id, "
+        f"COALESCE(t.title, f.application_or_url) AS application_or_url, "
+        f"f.duration_seconds, f.process_name{colunas_recursos} "
+        f"FROM `{tabela}` f "
+        f"LEFT JOIN `{tabela_titulos}` t ON t.id = f.app_title_id "
+        f"WHERE f.id > :ultimo_id {seguranca}"
+        f"ORDER BY f.id LIMIT :limite")
+
+
+def _para_arrow(linhas):
+    """Linhas do cursor -> tabela Arrow no ESQUEMA_EXPORTACAO."""
+    colunas = list(zip(*linhas))
+    arrays = []
+    for i, campo in enumerate(ESQUEMA_EXPORTACAO):
+        if campo.name in _DECIMAIS:
+            array = pa.array(colunas[i], _DECIMAIS[campo.name]).cast(campo.type)
+        else:
+            array = pa.array(colunas[i], campo.type)
+        arrays.append(array)
+    return pa.Table.from_arrays(arrays, schema=ESQUEMA_EXPORTACAO)
+
+
+def _ler_pedaco(engine, consulta, ultimo_id, tamanho_pedaco, tamanho_leitura):
+    """Um pedaço keyset, lido em partes pelo cursor do lado do servidor."""
+    partes = []
+    with engine.connect() as conexao:
+        resultado = conexao.execution_options(stream_results=True).execute(
+            consulta, {"ultimo_id": ultimo_id, "limite": tamanho_pedaco})
+        for linhas in resultado.partitions(tamanho_leitura):
+            partes.append(_para_arrow(linhas))
+    if not partes:
+        return None
+    return pa.concat_tables(partes)
+
+
+# =============================================================================
+# EXPORTAÇÃO
+# =============================================================================
+
+def exportar_parquet(engine, diretorio=EXPORT_DIR, tabela=TABLE_NAME,
+                     tabela_titulos=TITLES_TABLE, tamanho_pedaco=EXPORT_CHUNK_ROWS,
+                     tamanho_leitura=EXPORT_FETCH_ROWS, atraso_segundos=EXPORT_SAFETY_SECONDS,
+                     compressao=PARQUET_COMPRESSION):
+    """
+    Exporta as sessões novas de uso_aplicativos para Parquet.
+
+    Args:
+        engine: Engine SQLAlchemy do MySQL
+        diretorio (str): Diretório raiz do conjunto de dados
+        tabela (str): Tabela de sessões
+        tabela_titulos (str): Tabela de dimensão dos títulos
+        tamanho_pedaco (int): Linhas por consulta keyset
+        tamanho_leitura (int): Linhas por leitura do cursor
+        atraso_segundos (int): Idade mínima das linhas (0 = sem margem)
+        compressao (str): Codec Parquet
+
+    Returns:
+        dict: linhas e pedacos exportados nesta execução, e ultimo_id
+    """
+    os.makedirs(diretorio, exist_ok=True)
+    estado = ler_watermark(diretorio)
+    if estado.get("em_andamento"):
+        # A execução anterior parou no meio de um pedaço
+        _apagar_pedaco(diretorio, estado["em_andamento"])
+        estado["em_andamento"] = None
+
+    consulta = _consulta(tabela, tabela_titulos, atraso_segundos)
+    resumo = {"linhas": 0, "pedacos": 0, "ultimo_id": estado["ultimo_id"]}
+    while True:
+        pedaco = _ler_pedaco(engine, consulta, estado["ultimo_id"], tamanho_pedaco, tamanho_leitura)
+        if pedaco is None:
+            break
+
+        ids = pedaco["id"]
+        intervalo = [ids[0].as_py(), ids[-1].as_py()]
+        estado["em_andamento"] = intervalo
+        _salvar_watermark(diretorio, estado)
+
+        gravar_particionado(pedaco, diretorio, compressao=compressao,
+                            nome_base=_nome_pedaco(*intervalo))
+
+        estado.update(ultimo_id=intervalo[1], em_andamento=None,
+                      linhas=estado["linhas"] + pedaco.num_rows,
+                      atualizado_em=datetime.datetime.now().isoformat(timespec="seconds"))
+        _salvar_watermark(diretorio, estado)
+
+        resumo["linhas"] += pedaco.num_rows
+        resumo["pedacos"] += 1
+        resumo["ultimo_id"] = intervalo[1]
+        if pedaco.num_rows < tamanho_pedaco:
+            break
+    return resumo
+
+
+def main():
+    """Exporta as sessões novas com as credenciais do .env."""
+    parser = argparse.ArgumentParser(
+        description="Exporta as sessões novas de uso_aplicativos para Parquet particionado por dia.")
+    parser.add_argument("--diretorio", default=EXPORT_DIR)
+    parser.add_argument("--tabela", default=TABLE_NAME)
+    parser.add_argument("--pedaco", type=int, default=EXPORT_CHUNK_ROWS,
+                        help="Linhas por consulta (padrão: %(default)s)")
+    parser.add_argument("--atraso", type=int, default=EXPORT_SAFETY_SECONDS,
+                        help="Idade mínima, em segundos, das linhas exportadas (padrão: %(default)s)")
+    args = parser.parse_args()
+
+    from sqlalchemy import create_engine
+    from Meu_Dia import get_database_url
+
+    engine = create_engine(get_database_url())
+    resumo = exportar_parquet(engine, args.diretorio, args.tabela,
+                              tamanho_pedaco=args.pedaco, atraso_segundos=args.atraso)
+    print(f"{resumo['linhas']} sessões exportadas em {resumo['pedacos']} pedaços para "
+          f"{args.diretorio} (último id: {resumo['ultimo_id']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+"""
+Gravador em Segundo Plano para a Tabela uso_aplicativos
+=======================================================
+
+Grava as sessões de atividade no MySQL durante o monitoramento, e não
+apenas ao final. Uma thread dedicada consome uma fila limitada e envia
+INSERTs de múltiplas linhas a cada N registros ou T segundos, o que
+acontecer primeiro.
+
+Funcionalidades:
+- Fila limitada com contrapressão (backpressure) sobre o produtor
+- Lotes por quantidade (BATCH_SIZE) ou por tempo (FLUSH_INTERVAL_SECONDS)
+- Uma única engine SQLAlchemy reaproveitada durante toda a sessão
+- Derramamento (spill) em disco enquanto o MySQL está inacessível
+- Reenvio automático dos dados derramados quando a conexão volta
+- Linhas de fatos compactas: o título vira app_title_id (Dicionario_Titulos)
+- Chave de sessão determinística (session_key): reenviar a mesma sessão,
+  seja do arquivo de pendentes ou de um backup, nunca duplica a linha
+
+A fila, os lotes e o derramamento ficam em GravadorEmLotes; GravadorMySQL
+apenas define como um lote chega ao banco. Outros destinos (como o envio
+ao coletor central, em Coletor_Atividade.py) reaproveitam a mesma base.
+
+Fluxo dos dados:
+    registrar() -> fila limitada -> thread gravadora -> INSERT em lote
+                        |                    |
+                        +--(fila cheia)------+--(MySQL fora)--> arquivo de pendentes
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import abc
+import hashlib
+import json
+import os
+import queue
+import socket
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+
+from Diario_Atividade import DiarioAtividade, FSYNC_SEMPRE
+from Dicionario_Titulos import DicionarioTitulos
+from Esquema_Atividade import migrar_esquema
+from Recursos_Processo import CAMPOS_RECURSOS
+
+# =============================================================================
+# CONFIGURAÇÕES DO GRAVADOR
+# =============================================================================
+
+TABLE_NAME = "uso_aplicativos"       # Tabela de destino
+HOST_NAME = socket.gethostname()     # Computador monitorado (entra na session_key)
+
+BATCH_SIZE = 200                     # Registros por INSERT em lote
+FLUSH_INTERVAL_SECONDS = 30.0        # Tempo máximo até enviar um lote parcial
+MAX_QUEUE_SIZE = 5000                # Capacidade da fila em memória
+PUT_TIMEOUT_SECONDS = 0.5            # Espera máxima do produtor com a fila cheia
+RETRY_INTERVAL_SECONDS = 30.0        # Intervalo entre tentativas de reconexão
+
+# Arquivo onde os registros ficam enquanto o MySQL está inacessível
+SPILL_FILE = "uso_aplicativos_pendentes.jsonl"
+
+# Colunas gravadas em cada linha da tabela
+# Com o dicionário de títulos (padrão), o título por extenso não é gravado
+# O resumo de recursos (CAMPOS_RECURSOS) fica nulo se a sessão não o tiver
+COLUNAS = ("timestamp_end", "app_title_id", "duration_seconds", "process_name",
+           "session_key") + CAMPOS_RECURSOS
+COLUNAS_LEGADO = ("timestamp_end", "application_or_url", "duration_seconds",
+                  "session_key") + CAMPOS_RECURSOS
+
+# Marcador interno para encerrar a thread gravadora
+_FIM = object()
+
+
+def chave_sessao(registro, host=HOST_NAME):
+    """
+    Chave determinística de uma sessão: SHA-1 de (host, timestamp_end, título).
+
+    O timestamp_end é usado exatamente como gravado no diário (ISO com
+    microssegundos), então a mesma sessão gera a mesma chave venha ela do
+    rastreador, do arquivo de pendentes, do activity_log.jsonl ou do CSV.
+
+    Args:
+        registro (dict): Sessão no formato do rastreador
+        host (str): Computador onde a sessão foi registrada
+
+    Returns:
+        bytes: 20 bytes (coluna session_key)
+    """
+    texto = "\x1f".join((host, registro["timestamp_end"], registro["application_or_url"] or ""))
+    return hashlib.sha1(texto.encode("utf-8")).digest()
+
+
+class GravadorEmLotes(threading.Thread, metaclass=abc.ABCMeta):
+    """
+    Thread que envia sessões de atividade a um destino em lotes.
+
+    O produtor (loop de monitoramento) chama ``registrar`` e segue em
+    frente; o envio acontece nesta thread. Se a fila encher, o produtor
+    espera até PUT_TIMEOUT_SECONDS e, persistindo a lentidão, o registro
+    vai direto para o arquivo de pendentes, de modo que nada é perdido.
+
+    Classe abstrata: subclasses definem o destino implementando
+    ``_inserir`` (e, se preciso, ``_preparar_destino``); fila, lotes,
+    derramamento e reenvio são comuns a todas.
+
+    Args:
+        batch_size (int): Registros por lote
+        flush_interval_seconds (float): Tempo máximo até enviar um lote parcial
+        max_fila (int): Capacidade da fila em memória
+        arquivo_pendentes (str): Arquivo JSON Lines de derramamento
+        retry_interval_seconds (float): Intervalo entre tentativas de reconexão
+        descricao (str): Nome do destino nas mensagens (ex.: "MySQL")
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, flush_interval_seconds=FLUSH_INTERVAL_SECONDS,
+                 max_fila=MAX_QUEUE_SIZE, arquivo_pendentes=SPILL_FILE,
+                 retry_interval_seconds=RETRY_INTERVAL_SECONDS, descricao="destino"):
+        super().__init__(name=f"Gravador-{descricao}", daemon=True)
+
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.arquivo_pendentes = arquivo_pendentes
+        self.retry_interval_seconds = retry_interval_seconds
+        self.descricao = descricao
+
+        self._fila = queue.Queue(maxsize=max_fila)
+        self._lock_pendentes = threading.Lock()
+        self._offline_desde = None
+
+        # Estatísticas simples para o resumo final
+        self.total_gravados = 0
+        self.total_derramados = 0
+
+        # Registros que entraram na fila e, destes, os já gravados ou
+        # derramados (a fila é FIFO: quando processados alcança o valor de
+        # enfileirados de um instante, tudo o que entrou até ali está seguro)
+        self.total_enfileirados = 0
+        self.total_processados = 0
+        self._lock_contadores = threading.Lock()
+
+    # -------------------------------------------------------------------------
+    # Lado do produtor
+    # -------------------------------------------------------------------------
+
+    def registrar(self, registro):
+        """
+        Enfileira uma sessão para gravação.
+
+        O registro é aceito no formato do rastreador (com o título por
+        extenso); a tradução para app_title_id acontece na thread gravadora.
+
+        Bloqueia por no máximo PUT_TIMEOUT_SECONDS quando a fila está cheia
+        (contrapressão). Se ainda assim não houver espaço, o registro é
+        derramado no arquivo de pendentes.
+
+        Args:
+            registro (dict): Sessão com timestamp_end, application_or_url
+                             e duration_seconds
+        """
+        try:
+            self._fila.put(registro, timeout=PUT_TIMEOUT_SECONDS)
+        except queue.Full:
+            self._derramar([registro])
+            return
+        with self._lock_contadores:
+            self.total_enfileirados += 1
+
+    def parar(self, timeout=None):
+        """
+        Solicita o encerramento, envia o último lote e aguarda a thread.
+
+        Args:
+            timeout (float): Tempo máximo de espera pela thread (None = sem limite)
+        """
+        if self.is_alive():
+            self._fila.put(_FIM)
+            self.join(timeout)
+
+    def gravar_lote(self, registros):
+        """
+        Grava um lote de forma síncrona, sem passar pela fila.
+
+        Usado por ferramentas que já trabalham em lotes (como a recuperação
+        de backups); erros de conexão são propagados em vez de derramados.
+
+        Args:
+            registros (list): Sessões no formato do rastreador
+        """
+        self._preparar_destino()
+        if registros:
+            self._inserir(registros)
+
+    # -------------------------------------------------------------------------
+    # Lado da thread gravadora
+    # -------------------------------------------------------------------------
+
+    def run(self):
+        # Destino preparado já na partida (no MySQL, o esquema é verificado
+        # e migrado), e não só no primeiro lote
+        try:
+            self._preparar_destino()
+        except Exception as e:
+            motivo = str(e).splitlines()[0] if str(e) else type(e).__name__
+            print(f"{self.descricao} indisponível na partida: {motivo}")
+
+        lote = []
+        prazo = time.monotonic() + self.flush_interval_seconds
+
+        while True:
+            try:
+                item = self._fila.get(timeout=max(0.0, prazo - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            if item is _FIM:
+                break
+            if item is not None:
+                lote.append(item)
+
+            if len(lote) >= self.batch_size or time.monotonic() >= prazo:
+                self._descarregar(lote)
+                lote = []
+                prazo = time.monotonic() + self.flush_interval_seconds
+
+        # Encerramento: último lote e nova tentativa com pendentes
+        self._offline_desde = None
+        self._descarregar(lote)
+
+    def _descarregar(self, lote):
+        """Envia um lote ao destino, ou o derrama em disco se estiver fora do ar."""
+        if not lote and not self._ha_pendentes():
+            return
+
+        if self._offline_desde is not None:
+            if time.monotonic() - self._offline_desde < self.retry_interval_seconds:
+                self._derramar(lote)
+                self.total_processados += len(lote)
+                return
+
+        try:
+            self._preparar_destino()
+            # Primeiro o que ficou pendente, preservando a ordem cronológica
+            self._reenviar_pendentes()
+            if lote:
+                self._inserir(lote)
+            self._offline_desde = None
+        except Exception as e:
+            if self._offline_desde is None:
+                motivo = str(e).splitlines()[0] if str(e) else type(e).__name__
+                print(f"{self.descricao} indisponível, derramando registros em {self.arquivo_pendentes}: {motivo}")
+            self._offline_desde = time.monotonic()
+            self._derramar(lote)
+        self.total_processados += len(lote)
+
+    # -------------------------------------------------------------------------
+    # Pontos de extensão
+    # -------------------------------------------------------------------------
+
+    def _preparar_destino(self):
+        """Prepara o destino antes do primeiro envio (padrão: nada a fazer)."""
+
+    @abc.abstractmethod
+    def _inserir(self, registros):
+        """Envia um lote ao destino; deve levantar exceção em caso de falha."""
+
+    # -------------------------------------------------------------------------
+    # Derramamento em disco e reenvio
+    # -------------------------------------------------------------------------
+
+    def _ha_pendentes(self):
+        """Indica se existem registros derramados aguardando reenvio."""
+        return (os.path.exists(self.arquivo_pendentes)
+                or os.path.exists(self.arquivo_pendentes + ".reenvio"))
+
+    def _derramar(self, registros):
+        """Acrescenta registros ao arquivo de pendentes com fsync imediato."""
+        if not registros:
+            return
+        with self._lock_pendentes:
+            with DiarioAtividade(self.arquivo_pendentes, fsync_policy=FSYNC_SEMPRE) as diario:
+                for registro in registros:
+                    diario.registrar(registro)
+            # Chamado pelo produtor (fila cheia) e pela thread gravadora
+            self.total_derramados += len(registros)
+
+    def _reenviar_pendentes(self):
+        """
+        Reenvia ao destino os registros derramados, em lotes.
+
+        O arquivo de pendentes é renomeado antes do reenvio para que novos
+        derramamentos não se misturem a ele. Se a conexão cair no meio do
+        caminho, apenas a parte ainda não enviada é preservada.
+        """
+        em_reenvio = self.arquivo_pendentes + ".reenvio"
+
+        with self._lock_pendentes:
+            if not os.path.exists(em_reenvio):
+                if not os.path.exists(self.arquivo_pendentes):
+                    return
+                os.replace(self.arquivo_pendentes, em_reenvio)
+
+        enviados = 0
+        with open(em_reenvio, 'rb') as f:
+            offset_confirmado = 0
+            try:
+                while True:
+                    lote = []
+                    for linha in f:
+                        linha = linha.strip()
+                        if not linha:
+                            continue
+                        try:
+                            lote.append(json.loads(linha))
+                        except json.JSONDecodeError:
+                            continue
+                        if len(lote) >= self.batch_size:
+                            break
+                    if not lote:
+                        break
+                    self._inserir(lote)
+                    enviados += len(lote)
+                    offset_confirmado = f.tell()
+            except Exception:
+                # Mantém apenas o que não foi confirmado para a próxima tentativa
+                f.seek(offset_confirmado)
+                restante = f.read()
+                with open(em_reenvio + ".tmp", 'wb') as destino:
+                    destino.write(restante)
+                    destino.flush()
+                    os.fsync(destino.fileno())
+                os.replace(em_reenvio + ".tmp", em_reenvio)
+                raise
+
+        os.remove(em_reenvio)
+        if enviados:
+            print(f"{enviados} registros pendentes reenviados ao {self.descricao}.")
+
+
+class GravadorMySQL(GravadorEmLotes):
+    """
+    Thread que envia sessões de atividade ao MySQL em lotes.
+
+    Args:
+        url_conexao (str): URL SQLAlchemy, ex.: mysql+pymysql://u:s@host/banco
+        tabela (str): Tabela de destino
+        batch_size (int): Registros por INSERT em lote
+        flush_interval_seconds (float): Tempo máximo até enviar um lote parcial
+        max_fila (int): Capacidade da fila em memória
+        arquivo_pendentes (str): Arquivo JSON Lines de derramamento
+        retry_interval_seconds (float): Intervalo entre tentativas de reconexão
+        engine: Engine SQLAlchemy já criada (opcional; substitui url_conexao)
+        usar_dicionario (bool): Grava app_title_id em vez do título por extenso
+        host (str): Computador monitorado, usado na session_key (registros
+                    com o campo "host" usam o próprio)
+
+    Exemplo de uso:
+        gravador = GravadorMySQL(url)
+        gravador.start()
+        gravador.registrar({"timestamp_end": "...", ...})
+        gravador.parar()
+    """
+
+    def __init__(self, url_conexao=None, tabela=TABLE_NAME, batch_size=BATCH_SIZE,
+                 flush_interval_seconds=FLUSH_INTERVAL_SECONDS, max_fila=MAX_QUEUE_SIZE,
+                 arquivo_pendentes=SPILL_FILE, retry_interval_seconds=RETRY_INTERVAL_SECONDS,
+                 engine=None, usar_dicionario=True, host=HOST_NAME):
+        super().__init__(batch_size, flush_interval_seconds, max_fila, arquivo_pendentes,
+                         retry_interval_seconds, descricao="MySQL")
+
+        if engine is None:
+            # pool_pre_ping descarta conexões mortas antes de usá-las
+            engine = create_engine(url_conexao, pool_pre_ping=True, pool_recycle=3600)
+
+        self.engine = engine
+        self.tabela = tabela
+        self.host = host
+
+        # Cache título -> id compartilhado por todos os lotes desta sessão
+        self.dicionario = DicionarioTitulos(engine) if usar_dicionario else None
+        self.colunas = COLUNAS if usar_dicionario else COLUNAS_LEGADO
+        self._tabela_verificada = False
+
+        # Sessão já gravada (mesma session_key) é ignorada sem erro
+        colunas = ", ".join(f"`{c}`" for c in self.colunas)
+        valores = ", ".join(f":{c}" for c in self.colunas)
+        self._insert_sql = text(f"INSERT INTO `{tabela}` ({colunas}) VALUES ({valores}) "
+                                f"ON DUPLICATE KEY UPDATE id = id")
+
+    def _preparar_destino(self):
+        """Cria ou migra a tabela (Esquema_Atividade) na primeira conexão bem-sucedida."""
+        if not self._tabela_verificada:
+            tabela_titulos = self.dicionario.tabela if self.dicionario is not None else None
+            pendencias = migrar_esquema(self.engine, self.tabela, tabela_titulos)
+            if pendencias:
+                print(f"Tabela {self.tabela} migrada: {'; '.join(pendencias)}")
+            self._tabela_verificada = True
+
+    def _inserir(self, registros):
+        """
+        Executa o INSERT de múltiplas linhas em uma transação.
+
+        Com o driver pymysql, ``executemany`` sobre um INSERT ... VALUES é
+        reescrito em um único comando com várias tuplas de valores.
+        """
+        if self.dicionario is not None:
+            # Títulos novos do lote são resolvidos em uma única ida ao banco
+            ids = self.dicionario.ids_de(
+                {r["application_or_url"] for r in registros if r.get("application_or_url")})
+            registros = [dict(r, app_title_id=ids.get(r.get("application_or_url")))
+                         for r in registros]
+
+        linhas = [{c: r.get(c) for c in self.colunas} for r in registros]
+        for linha, registro in zip(linhas, registros):
+            linha["session_key"] = chave_sessao(registro, registro.get("host") or self.host)
+        with self.engine.begin() as conexao:
+            conexao.execute(self._insert_sql, linhas)
+        self.total_gravados += len(linhas)
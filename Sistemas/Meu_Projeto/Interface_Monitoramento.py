@@ -9,14 +9,18 @@ e uma área de texto para exibir logs em tempo real.
 
 Funcionalidades:
 - Iniciar/parar monitoramento com botões
-- Exibição de logs em tempo real
+- Exibição de logs em tempo real (com limite de linhas)
 - Controle visual do status do sistema
 - Interface simples e intuitiva
+- Um único rastreador por máquina: se outro monitor já está rodando, a
+  interface assina os eventos do serviço local dele em vez de consultar
+  as janelas de novo (Servico_Rastreador.py)
 
 Dependências:
 - tkinter (incluído no Python)
 - threading (para execução paralela)
 - Meu_Dia.py (script principal de monitoramento)
+- Rastreador_Atividade.py e Destinos_Atividade.py (motor compartilhado)
 
 Criado em: 28/06/2025
 Autor: Francisco H. Lomas
@@ -26,8 +30,9 @@ Versão: 1.0
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import threading
-import time
 import datetime
+import queue
+from collections import deque
 import os
 import sys
 from pathlib import Path
@@ -45,12 +50,31 @@ except ImportError as e:
 
 # Importa as funções do sistema de monitoramento
 from Meu_Dia import (
-    get_active_application_info, 
-    save_log_to_json, 
-    create_dataframe_and_insert_into_mysql,
+    get_database_url,
     RECORD_INTERVAL_SECONDS,
+    MIN_INTERVAL_SECONDS,
     OUTPUT_FILE
 )
+from Rastreador_Atividade import RastreadorAtividade
+from Processos_Janela import obter_janela_ativa
+from Destinos_Atividade import DestinoMemoria, DestinoMySQL
+from Arquivo_Rotativo import ArquivoRotativo, ARCHIVE_DIR
+from Servico_Rastreador import ServicoRastreador, ClienteRastreador, descrever_evento, porta_ocupada
+from Buffer_Sessoes import BufferSessoes
+from Agregados_Atividade import AgregadosAtividade
+
+# Quantidade de aplicativos exibidos no resumo ao lado do contador
+TOP_N_APLICATIVOS = 3
+
+# Área de logs: a thread de monitoramento só enfileira mensagens; a
+# interface as aplica em lote a cada LOG_REFRESH_MS e mantém no máximo
+# LOG_MAX_LINES linhas, descartando as mais antigas
+LOG_REFRESH_MS = 250
+LOG_MAX_LINES = 1000
+
+# Ao parar, intervalo entre verificações de que a thread de monitoramento
+# saiu (só então o rastreador é finalizado e os destinos fechados)
+STOP_POLL_MS = 100
 
 class ConfiguracaoBancoDialog:
     """Dialog para configuração do banco de dados."""
@@ -190,14 +214,22 @@ class SistemaMonitoramentoGUI:
     
     Esta classe cria uma janela com controles para iniciar/parar
     o monitoramento de atividade e exibe logs em tempo real.
+    
+    A thread de monitoramento nunca toca nos widgets: ela coloca as
+    mensagens em uma fila (queue.SimpleQueue) e a interface esvazia a
+    fila em lote em um temporizador fixo. O custo de atualização fica
+    constante, por mais longo que seja o monitoramento.
     """
     
-    def __init__(self, root):
+    def __init__(self, root, max_linhas_log=LOG_MAX_LINES,
+                 intervalo_atualizacao_ms=LOG_REFRESH_MS):
         """
         Inicializa a interface gráfica.
         
         Args:
             root: Widget raiz do tkinter (Tk())
+            max_linhas_log (int): Linhas mantidas na área de logs
+            intervalo_atualizacao_ms (int): Intervalo entre atualizações da tela
         """
         self.root = root
         self.root.title("Sistema de Monitoramento de Atividade")
@@ -207,9 +239,24 @@ class SistemaMonitoramentoGUI:
         # Variáveis de controle
         self.monitoring = False
         self.monitor_thread = None
-        self.activity_log = []
-        self.current_active_window = None
-        self.session_start_time = None
+        self.activity_log = BufferSessoes()
+        self.agregados = AgregadosAtividade()
+        self.rastreador = None
+        self.parar_evento = threading.Event()
+        
+        # Serviço local hospedado por esta interface, ou cliente do
+        # serviço de outro monitor (assinatura dos eventos)
+        self.servico = None
+        self.cliente = None
+        self.resumo_remoto = None
+        self.assinatura_encerrada = False
+        
+        # Mensagens pendentes de exibição (produzidas por qualquer thread)
+        self.max_linhas_log = max_linhas_log
+        self.intervalo_atualizacao_ms = intervalo_atualizacao_ms
+        self.fila_logs = queue.SimpleQueue()
+        self.contador_pendente = False
+        self.linhas_log = 0
         
         # Configuração do banco de dados
         self.db_config = None
@@ -219,6 +266,9 @@ class SistemaMonitoramentoGUI:
         
         # Configurar fechamento da janela
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        
+        # Temporizador que aplica os logs e o contador na tela
+        self.root.after(self.intervalo_atualizacao_ms, self.atualizar_tela)
     
     def criar_interface(self):
         """Cria todos os elementos da interface gráfica."""
@@ -282,6 +332,10 @@ class SistemaMonitoramentoGUI:
         self.count_label = tk.Label(status_frame, text="Atividades: 0", 
                                     font=("Arial", 10))
         self.count_label.pack(side=tk.RIGHT)
+        
+        # Aplicativos mais usados hoje (agregados incrementais)
+        self.top_label = tk.Label(status_frame, text="", font=("Arial", 9))
+        self.top_label.pack(side=tk.RIGHT, padx=(0, 20))
     
     def configurar_banco(self):
         """Abre diálogo para configuração do banco de dados."""
@@ -294,136 +348,329 @@ class SistemaMonitoramentoGUI:
             messagebox.showinfo("Sucesso", "Configuração do banco de dados salva!")
     
     def iniciar_monitoramento(self):
-        """Inicia o monitoramento de atividade em uma thread separada."""
-        if not self.db_config:
-            messagebox.showerror("Erro", "Configure o banco de dados primeiro!")
+        """
+        Inicia o monitoramento de atividade em uma thread separada.
+        
+        Se outro monitor já hospeda o serviço local, apenas assina os
+        eventos dele; caso contrário, reserva a porta do serviço, cria o
+        rastreador e hospeda o serviço para os próximos monitores. Os
+        destinos só são criados depois de reservada a porta.
+        """
+        if self.monitoring:
             return
         
-        if not self.monitoring:
-            self.monitoring = True
-            self.monitor_thread = threading.Thread(target=self.monitorar_atividade, daemon=True)
-            self.monitor_thread.start()
-            
-            # Atualizar interface
-            self.start_button.config(state="disabled")
-            self.stop_button.config(state="normal")
-            self.status_label.config(text="Status: Monitorando")
+        cliente = ClienteRastreador()
+        servico = None
+        assinar = cliente.disponivel()
+        if not assinar:
+            if not self.db_config:
+                messagebox.showerror("Erro", "Configure o banco de dados primeiro!")
+                return
+            servico = ServicoRastreador(agregados=self.agregados)
+            try:
+                servico.reservar()
+            except OSError as e:
+                servico = None
+                # Outro monitor aberto ao mesmo tempo ficou com a porta
+                assinar = porta_ocupada(e) and cliente.aguardar()
+                if not assinar:
+                    self.adicionar_log(f"Serviço local indisponível: {str(e)}")
+        
+        if assinar:
+            self.cliente = cliente
+            self.assinatura_encerrada = False
+            alvo = self.assinar_servico
+            status = "Status: Assinando rastreador existente"
+        else:
+            try:
+                self.rastreador = self.criar_rastreador()
+            except Exception as e:
+                if servico is not None:
+                    servico.parar()
+                messagebox.showerror("Erro", f"Falha ao preparar o monitoramento:\n{str(e)}")
+                return
             
-            self.adicionar_log("Monitoramento iniciado!")
+            self.servico = servico
+            if servico is not None:
+                servico.iniciar(self.rastreador)
+            alvo = self.monitorar_atividade
+            status = "Status: Monitorando"
+        
+        self.monitoring = True
+        self.parar_evento.clear()
+        self.monitor_thread = threading.Thread(target=alvo, daemon=True)
+        self.monitor_thread.start()
+        
+        # Atualizar interface
+        self.start_button.config(state="disabled")
+        self.stop_button.config(state="normal")
+        self.status_label.config(text=status)
+        
+        self.adicionar_log("Monitoramento iniciado!")
     
-    def parar_monitoramento(self):
-        """Para o monitoramento de atividade."""
-        if self.monitoring:
+    def parar_monitoramento(self, hospedeiro_encerrado=False, ao_concluir=None):
+        """
+        Para o monitoramento de atividade (ou só a assinatura dos eventos).
+        
+        Args:
+            hospedeiro_encerrado (bool): A assinatura terminou porque o
+                                         monitor que hospedava foi fechado
+            ao_concluir (callable): Chamado quando a parada terminar (o
+                                    rastreador pode levar algumas
+                                    verificações para ser finalizado)
+        """
+        if self.monitoring and self.cliente is not None:
+            # O rastreador é de outro monitor e continua rodando; a thread
+            # de assinatura percebe o evento no próximo "ping" do serviço
             self.monitoring = False
+            self.parar_evento.set()
+            self.cliente = None
+            self.resumo_remoto = None
             
-            # Aguardar thread terminar
-            if self.monitor_thread and self.monitor_thread.is_alive():
-                self.monitor_thread.join(timeout=2)
-            
-            # Registrar última sessão
-            if self.current_active_window and self.session_start_time:
-                duration = (datetime.datetime.now() - self.session_start_time).total_seconds()
-                self.activity_log.append({
-                    "timestamp_end": datetime.datetime.now().isoformat(),
-                    "application_or_url": self.current_active_window,
-                    "duration_seconds": round(duration, 2)
-                })
-                self.adicionar_log(f"Sessão final: {self.current_active_window} por {round(duration, 2)}s")
-            
-            # Salvar e inserir no banco
-            self.salvar_dados()
-            
-            # Atualizar interface
             self.start_button.config(state="normal")
             self.stop_button.config(state="disabled")
             self.status_label.config(text="Status: Parado")
+            if not hospedeiro_encerrado:
+                self.adicionar_log("Assinatura encerrada (o rastreador continua no outro monitor)")
+            if ao_concluir is not None:
+                ao_concluir()
+        
+        elif self.monitoring:
+            self.monitoring = False
+            self.parar_evento.set()
+            self.stop_button.config(state="disabled")
+            self.status_label.config(text="Status: Parando...")
             
-            self.adicionar_log("Monitoramento parado!")
+            # Sem join: concluir_parada espera a thread sair reagendando-se
+            # pelo mainloop, que continua respondendo
+            self.concluir_parada(ao_concluir)
+        
+        elif ao_concluir is not None:
+            ao_concluir()
+    
+    def concluir_parada(self, ao_concluir=None):
+        """
+        Finaliza o rastreador depois que a thread de monitoramento sair.
+        
+        finalizar() e fechar() não podem rodar junto com uma verificação
+        ainda em andamento na thread (uma consulta de janela lenta, por
+        exemplo); enquanto ela não sai, a verificação é reagendada sem
+        travar a interface.
+        """
+        if self.monitor_thread and self.monitor_thread.is_alive():
+            self.root.after(STOP_POLL_MS, self.concluir_parada, ao_concluir)
+            return
+        
+        # Registrar última sessão
+        registro = self.rastreador.finalizar()
+        if registro is not None:
+            self.adicionar_log(f"Sessão final: {registro['application_or_url']} por {registro['duration_seconds']}s")
+            self.atualizar_contador()
+        
+        # Avisa os assinantes e libera a porta do serviço
+        if self.servico is not None:
+            self.servico.parar()
+            self.servico = None
+        
+        # Salvar e inserir no banco
+        self.salvar_dados()
+        
+        # Atualizar interface
+        self.start_button.config(state="normal")
+        self.stop_button.config(state="disabled")
+        self.status_label.config(text="Status: Parado")
+        
+        self.adicionar_log("Monitoramento parado!")
+        if ao_concluir is not None:
+            ao_concluir()
+    
+    def criar_rastreador(self):
+        """
+        Cria o rastreador com os destinos desta interface.
+        
+        As credenciais do diálogo de configuração vão direto para o
+        destino MySQL, sem alterar variáveis globais do Meu_Dia.
+        """
+        url = get_database_url(
+            host=self.db_config['host'],
+            user=self.db_config['user'],
+            password=self.db_config['password'],
+            database=self.db_config['database']
+        )
+        
+        destino_mysql = DestinoMySQL(url, tabela=self.db_config['table'])
+        
+        # Totais persistidos no resumo com a mesma engine do gravador
+        self.agregados.engine = destino_mysql.gravador.engine
+        
+        destinos = [
+            DestinoMemoria(self.activity_log),
+            ArquivoRotativo(ARCHIVE_DIR, caminho_json=OUTPUT_FILE),
+            destino_mysql,
+            self.agregados
+        ]
+        
+        return RastreadorAtividade(
+            fonte=obter_janela_ativa,
+            destinos=destinos,
+            intervalo=RECORD_INTERVAL_SECONDS,
+            intervalo_minimo=MIN_INTERVAL_SECONDS,
+            titulos=self.activity_log.dicionario,
+            ao_registrar=self.ao_registrar_sessao,
+            ao_mudar=self.ao_mudar_janela,
+            ao_erro=lambda destino, e: self.adicionar_log(
+                f"Erro em {type(destino).__name__}: {str(e)}")
+        )
+    
+    def ao_registrar_sessao(self, registro):
+        """Chamado pela thread de monitoramento a cada sessão encerrada."""
+        self.adicionar_log(
+            f"Atividade: {registro['application_or_url']} por {registro['duration_seconds']}s")
+        self.contador_pendente = True
+    
+    def ao_mudar_janela(self, janela, instante):
+        """Chamado pela thread de monitoramento quando a janela ativa muda."""
+        if janela:
+            self.adicionar_log(f"Ativo agora: {janela}")
     
     def monitorar_atividade(self):
         """Função principal de monitoramento executada em thread separada."""
-        while self.monitoring:
-            try:
-                timestamp_now = datetime.datetime.now()
-                current_app_info = get_active_application_info()
-                
-                # Verifica mudança de atividade
-                if current_app_info != self.current_active_window:
-                    # Registra sessão anterior
-                    if self.current_active_window and self.session_start_time:
-                        duration = (timestamp_now - self.session_start_time).total_seconds()
-                        self.activity_log.append({
-                            "timestamp_end": timestamp_now.isoformat(),
-                            "application_or_url": self.current_active_window,
-                            "duration_seconds": round(duration, 2)
-                        })
-                        
-                        # Atualiza log na interface
-                        self.root.after(0, self.adicionar_log, 
-                                       f"Atividade: {self.current_active_window} por {round(duration, 2)}s")
-                    
-                    # Inicia nova sessão
-                    self.current_active_window = current_app_info
-                    self.session_start_time = timestamp_now
-                    
-                    if current_app_info:
-                        self.root.after(0, self.adicionar_log, f"Ativo agora: {current_app_info}")
-                
-                # Atualiza contador
-                self.root.after(0, self.atualizar_contador)
-                
-                time.sleep(RECORD_INTERVAL_SECONDS)
-                
-            except Exception as e:
-                self.root.after(0, self.adicionar_log, f"Erro: {str(e)}")
-                time.sleep(RECORD_INTERVAL_SECONDS)
+        try:
+            self.rastreador.executar(self.parar_evento)
+        except Exception as e:
+            self.adicionar_log(f"Erro: {str(e)}")
+    
+    def assinar_servico(self):
+        """
+        Acompanha os eventos do rastreador de outro monitor (thread separada).
+        
+        Os totais exibidos vêm das consultas ao serviço, feitas aqui e
+        não na thread da interface.
+        """
+        cliente = self.cliente
+        try:
+            estado = cliente.estado()
+            self.adicionar_log(f"Assinando o rastreador do processo {estado['pid']} ({cliente.url})")
+            self.atualizar_resumo_remoto(cliente)
+            for evento in cliente.eventos(parar_evento=self.parar_evento):
+                dados = evento["dados"]
+                if evento["tipo"] == "sessao":
+                    self.adicionar_log(
+                        f"Atividade: {dados['application_or_url']} por {dados['duration_seconds']}s")
+                    self.atualizar_resumo_remoto(cliente)
+                elif evento["tipo"] == "janela" and dados["janela"]:
+                    self.adicionar_log(f"Ativo agora: {dados['janela']}")
+                elif evento["tipo"] == "fim":
+                    self.adicionar_log(descrever_evento(evento))
+        except OSError as e:
+            self.adicionar_log(f"Conexão com o rastreador perdida: {str(e)}")
+        
+        if not self.parar_evento.is_set():
+            # A interface não assume o rastreamento de outro monitor
+            self.adicionar_log("O monitoramento PAROU nesta interface. Clique em Iniciar "
+                               "para monitorar por aqui (ou acompanhar quem assumiu).")
+            self.assinatura_encerrada = True
+    
+    def atualizar_resumo_remoto(self, cliente):
+        """Consulta contador e top do dia no serviço (thread de assinatura)."""
+        total = cliente.estado()["total_sessoes"]
+        top = cliente.agregados(TOP_N_APLICATIVOS, data=datetime.date.today())
+        if self.cliente is cliente:
+            self.resumo_remoto = (total, top)
+            self.contador_pendente = True
     
     def salvar_dados(self):
-        """Salva dados em JSON e insere no banco de dados."""
+        """Fecha os destinos: envia o último lote ao MySQL e compacta o JSON."""
         try:
-            # Salva em JSON
-            save_log_to_json()
+            self.rastreador.fechar()
             self.adicionar_log("Dados salvos em JSON")
-            
-            # Insere no banco
-            if self.db_config:
-                # Atualiza configurações globais
-                import Meu_Dia
-                Meu_Dia.DATABASE_HOST = self.db_config['host']
-                Meu_Dia.DATABASE_USER = self.db_config['user']
-                Meu_Dia.DATABASE_PASSWORD = self.db_config['password']
-                Meu_Dia.DATABASE_NAME = self.db_config['database']
-                Meu_Dia.TABLE_NAME = self.db_config['table']
-                
-                create_dataframe_and_insert_into_mysql(self.activity_log)
-                self.adicionar_log("Dados inseridos no banco de dados!")
+            self.adicionar_log("Dados inseridos no banco de dados!")
             
         except Exception as e:
             self.adicionar_log(f"Erro ao salvar dados: {str(e)}")
     
     def adicionar_log(self, mensagem):
-        """Adiciona mensagem ao log da interface."""
+        """
+        Enfileira uma mensagem para a área de logs.
+        
+        Pode ser chamada de qualquer thread; o horário é o do momento da
+        chamada, e a mensagem aparece na próxima atualização da tela.
+        """
         timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        log_entry = f"[{timestamp}] {mensagem}\n"
+        self.fila_logs.put(f"[{timestamp}] {mensagem}\n")
+    
+    def atualizar_tela(self):
+        """Aplica em lote os logs enfileirados e o contador; reagenda a si mesma."""
+        # Esvazia a fila guardando só as linhas que caberão na área de logs
+        novas = deque(maxlen=self.max_linhas_log)
+        descartadas = 0
+        while True:
+            try:
+                linha = self.fila_logs.get_nowait()
+            except queue.Empty:
+                break
+            if len(novas) == novas.maxlen:
+                descartadas += 1
+            novas.append(linha)
+        
+        if novas:
+            # Só rola até o fim se o usuário já estava no fim
+            no_fim = self.log_text.yview()[1] >= 1.0
+            
+            if descartadas:
+                # Lote maior que a área inteira: substitui todo o conteúdo
+                self.log_text.delete("1.0", tk.END)
+                self.linhas_log = 0
+            texto = "".join(novas)
+            self.log_text.insert(tk.END, texto)
+            # Mensagens com várias linhas (erros, por exemplo) contam cada uma
+            self.linhas_log += texto.count("\n")
+            
+            # Anel: remove as linhas mais antigas acima do limite
+            excesso = self.linhas_log - self.max_linhas_log
+            if excesso > 0:
+                self.log_text.delete("1.0", f"{excesso + 1}.0")
+                self.linhas_log = self.max_linhas_log
+            
+            if no_fim:
+                self.log_text.see(tk.END)
         
-        self.log_text.insert(tk.END, log_entry)
-        self.log_text.see(tk.END)
+        if self.contador_pendente:
+            self.contador_pendente = False
+            self.atualizar_contador()
+        
+        if self.assinatura_encerrada:
+            # O hospedeiro foi encerrado: volta a interface ao estado parado
+            self.assinatura_encerrada = False
+            if self.monitoring and self.cliente is not None:
+                self.parar_monitoramento(hospedeiro_encerrado=True)
+        
+        self.root.after(self.intervalo_atualizacao_ms, self.atualizar_tela)
     
     def atualizar_contador(self):
-        """Atualiza o contador de atividades."""
-        self.count_label.config(text=f"Atividades: {len(self.activity_log)}")
+        """Atualiza o contador de atividades e o top 3 do dia."""
+        if self.resumo_remoto is not None:
+            total, top = self.resumo_remoto
+        else:
+            total = len(self.activity_log)
+            top = self.agregados.top(TOP_N_APLICATIVOS, data=datetime.date.today())
+        self.count_label.config(text=f"Atividades: {total}")
+        
+        resumo = " | ".join(f"{app[:30]}: {segundos / 60:.0f} min" for app, segundos in top)
+        self.top_label.config(text=f"Hoje: {resumo}" if resumo else "")
     
     def limpar_logs(self):
         """Limpa a área de logs."""
         self.log_text.delete(1.0, tk.END)
+        self.linhas_log = 0
         self.adicionar_log("Logs limpos!")
     
     def on_closing(self):
         """Trata o fechamento da janela."""
         if self.monitoring:
             if messagebox.askokcancel("Sair", "O monitoramento está ativo. Deseja parar e sair?"):
-                self.parar_monitoramento()
-                self.root.destroy()
+                # A janela só é destruída depois que o rastreador for finalizado
+                self.parar_monitoramento(ao_concluir=self.root.destroy)
         else:
             self.root.destroy()
 
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Armazenamento das Sessões em Parquet Particionado por Dia
+=========================================================
+
+Destino do rastreador que acumula as sessões em memória (BufferSessoes)
+e grava lotes em arquivos Parquet comprimidos, um diretório por dia:
+
+    activity_log_parquet/
+    ├── data=2025-07-02/
+    │   ├── part-20250702T223314-0.parquet
+    │   └── part-20250702T231502-0.parquet
+    └── data=2025-07-03/
+        └── part-20250703T090011-0.parquet
+
+Vantagens sobre o activity_log.csv:
+- Colunas tipadas (timestamp, texto com dicionário, float) e comprimidas
+- Nenhum DataFrame montado por sessão: o lote inteiro vira uma tabela
+  Arrow sem cópia a partir do buffer colunar
+- Leitura por intervalo de datas com poda de partições (predicate
+  pushdown): só os dias pedidos são abertos
+
+Dependências:
+- pyarrow
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import datetime
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from Buffer_Sessoes import BufferSessoes
+
+# =============================================================================
+# CONFIGURAÇÕES
+# =============================================================================
+
+PARQUET_DIR = "activity_log_parquet"   # Diretório raiz do conjunto de dados
+PARQUET_BATCH_ROWS = 500               # Sessões acumuladas antes de gravar
+PARQUET_FLUSH_SECONDS = 600.0          # Tempo máximo com sessões só em memória
+PARQUET_COMPRESSION = "zstd"           # Codec de compressão das colunas
+
+# Partição por dia (estilo Hive: data=AAAA-MM-DD)
+PARTICIONAMENTO = ds.partitioning(pa.schema([("data", pa.date32())]), flavor="hive")
+
+
+def gravar_particionado(tabela, diretorio=PARQUET_DIR, coluna_tempo="timestamp_end",
+                        compressao=PARQUET_COMPRESSION, nome_base=None):
+    """
+    Grava uma tabela Arrow no conjunto de dados particionado por dia.
+
+    Cada chamada cria arquivos novos (nome com o instante da gravação);
+    arquivos existentes nunca são reescritos. Com nome_base, os nomes
+    são determinísticos e uma nova gravação com o mesmo nome substitui
+    os arquivos anteriores.
+
+    Args:
+        tabela (pyarrow.Table): Linhas a gravar
+        diretorio (str): Diretório raiz do conjunto de dados
+        coluna_tempo (str): Coluna timestamp usada para derivar o dia
+        compressao (str): Codec Parquet ("zstd", "snappy", "gzip"...)
+        nome_base (str): Prefixo dos arquivos (padrão: part-<instante>)
+
+    Returns:
+        int: Quantidade de linhas gravadas
+    """
+    if tabela.num_rows == 0:
+        return 0
+
+    tabela = tabela.append_column("data", pc.cast(tabela[coluna_tempo], pa.date32()))
+    if nome_base is None:
+        nome_base = "part-" + datetime.datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    formato = ds.ParquetFileFormat()
+
+    ds.write_dataset(
+        tabela,
+        diretorio,
+        format=formato,
+        file_options=formato.make_write_options(compression=compressao),
+        partitioning=PARTICIONAMENTO,
+        basename_template=f"{nome_base}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return tabela.num_rows
+
+
+def ler_parquet(diretorio=PARQUET_DIR, inicio=None, fim=None, colunas=None):
+    """
+    Lê as sessões de um intervalo de datas.
+
+    O filtro é aplicado sobre a coluna de partição, então apenas os
+    diretórios dos dias pedidos são listados e abertos.
+
+    Args:
+        diretorio (str): Diretório raiz do conjunto de dados
+        inicio (datetime.date): Primeiro dia (inclusive); None = sem limite
+        fim (datetime.date): Último dia (inclusive); None = sem limite
+        colunas (list): Colunas desejadas (None = todas)
+
+    Returns:
+        pandas.DataFrame: Sessões do período
+
+    Exemplo de uso:
+        df = ler_parquet(inicio=datetime.date(2025, 7, 1), fim=datetime.date(2025, 7, 7))
+    """
+    conjunto = ds.dataset(diretorio, format="parquet", partitioning=PARTICIONAMENTO)
+
+    filtro = None
+    if inicio is not None:
+        filtro = ds.field("data") >= pa.scalar(inicio, pa.date32())
+    if fim is not None:
+        ate = ds.field("data") <= pa.scalar(fim, pa.date32())
+        filtro = ate if filtro is None else filtro & ate
+
+    return conjunto.to_table(columns=colunas, filter=filtro).to_pandas()
+
+
+class DestinoParquet:
+    """
+    Destino que grava as sessões em Parquet particionado por dia.
+
+    As sessões ficam em um BufferSessoes até somarem ``linhas_por_lote``
+    ou até ``intervalo_gravacao`` segundos desde a última gravação; então
+    o buffer inteiro é gravado de uma vez e esvaziado. O prazo é vigiado
+    por uma thread própria, então um rastreador ocioso (sem novas sessões)
+    também grava o que acumulou. Ao fechar, o que restou é gravado.
+
+    Cada arquivo leva no dicionário só os títulos e processos do seu lote.
+
+    Args:
+        diretorio (str): Diretório raiz do conjunto de dados
+        linhas_por_lote (int): Sessões acumuladas antes de gravar
+        intervalo_gravacao (float): Segundos máximos sem gravar
+        compressao (str): Codec Parquet
+    """
+
+    def __init__(self, diretorio=PARQUET_DIR, linhas_por_lote=PARQUET_BATCH_ROWS,
+                 intervalo_gravacao=PARQUET_FLUSH_SECONDS, compressao=PARQUET_COMPRESSION):
+        self.diretorio = diretorio
+        self.linhas_por_lote = linhas_por_lote
+        self.intervalo_gravacao = intervalo_gravacao
+        self.compressao = compressao
+        self.total_gravados = 0
+
+        self._buffer = BufferSessoes()
+        self._ultima_gravacao = time.monotonic()
+
+        # O buffer é compartilhado com a thread do prazo de gravação
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._temporizador = threading.Thread(target=self._gravar_no_prazo,
+                                              name="GravacaoParquet", daemon=True)
+        self._temporizador.start()
+
+    def registrar(self, registro):
+        with self._lock:
+            self._buffer.adicionar(registro)
+            if len(self._buffer) >= self.linhas_por_lote:
+                self._gravar()
+
+    def gravar(self):
+        """Grava o conteúdo do buffer e o esvazia."""
+        with self._lock:
+            self._gravar()
+
+    def fechar(self):
+        self._parar.set()
+        self._temporizador.join()
+        self.gravar()
+
+    def _gravar(self):
+        if len(self._buffer):
+            self.total_gravados += gravar_particionado(
+                self._buffer.para_arrow(apenas_usados=True), self.diretorio,
+                compressao=self.compressao)
+            self._buffer.limpar()
+        self._ultima_gravacao = time.monotonic()
+
+    def _gravar_no_prazo(self):
+        """Thread do prazo: grava o buffer a cada intervalo_gravacao sem gravação."""
+        espera = self.intervalo_gravacao
+        while not self._parar.wait(espera):
+            with self._lock:
+                idade = time.monotonic() - self._ultima_gravacao
+                if idade >= self.intervalo_gravacao:
+                    try:
+                        self._gravar()
+                    except (OSError, pa.ArrowException) as e:
+                        # As sessões continuam no buffer para a próxima tentativa
+                        print(f"Falha ao gravar o Parquet: {e}")
+                        self._ultima_gravacao = time.monotonic()
+                    idade = 0.0
+            espera = self.intervalo_gravacao - idade
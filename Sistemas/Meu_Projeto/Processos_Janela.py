@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Resolução da Janela Ativa para o Processo Dono
+==============================================
+
+Os títulos de janela mudam o tempo todo (abas do navegador, arquivos no
+editor), e o mesmo aplicativo acaba espalhado em milhares de títulos
+distintos. Esta fonte de janelas devolve, além do título, o nome do
+executável dono da janela (ex.: "Cursor.exe", "chrome.exe"), de modo que
+os totais por aplicativo sejam exatos e baratos.
+
+Custo por amostra:
+- PID da janela: uma chamada GetWindowThreadProcessId (Windows)
+- Mesma janela da amostra anterior (mesmo handle e mesmo PID): o nome
+  guardado é reaproveitado sem nenhuma chamada ao sistema; o handle de
+  uma janela morre com o processo dono, então o par não muda de dono
+- Janela nova: cache LRU indexado por (pid, create_time); o par
+  identifica o processo de forma única mesmo com reaproveitamento de PIDs,
+  e o nome só é consultado ao sistema na primeira vez
+
+Em sistemas sem suporte à obtenção do PID (ou sem o psutil instalado),
+o processo fica como None e o rastreador continua funcionando apenas
+com o título.
+
+Dependências:
+- psutil
+- pygetwindow
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import ctypes
+import sys
+from collections import namedtuple
+from functools import lru_cache
+
+# Quantidade de processos distintos mantidos no cache de nomes
+PROCESS_CACHE_SIZE = 256
+
+# Observação da fonte de janelas: título, nome do executável e PID
+JanelaAtiva = namedtuple("JanelaAtiva", ["titulo", "processo", "pid"])
+
+# (handle, pid, nome) da janela da última amostra
+_ultima_janela = (None, None, None)
+
+
+def pid_da_janela(janela):
+    """
+    PID do processo dono de uma janela do pygetwindow.
+
+    Args:
+        janela: Objeto de janela do pygetwindow
+
+    Returns:
+        int or None: PID, ou None se o sistema não permitir obtê-lo
+    """
+    if sys.platform != "win32":
+        return None
+    try:
+        pid = ctypes.c_ulong()
+        ctypes.windll.user32.GetWindowThreadProcessId(janela._hWnd, ctypes.byref(pid))
+        return pid.value or None
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=PROCESS_CACHE_SIZE)
+def _nome_por_chave(pid, create_time):
+    """Nome do executável; a chave (pid, create_time) identifica o processo."""
+    import psutil
+
+    return psutil.Process(pid).name()
+
+
+def nome_processo(pid):
+    """
+    Nome do executável de um PID, com cache.
+
+    Args:
+        pid (int): Identificador do processo
+
+    Returns:
+        str or None: Nome do executável, ou None se o processo já terminou
+                     ou não pode ser consultado
+    """
+    if not pid:
+        return None
+    try:
+        import psutil
+    except ImportError:
+        return None
+
+    try:
+        return _nome_por_chave(pid, psutil.Process(pid).create_time())
+    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        return None
+
+
+def _nome_da_janela(hwnd, pid):
+    """Nome do executável da janela, sem consultar o sistema se ela não mudou."""
+    global _ultima_janela
+    if pid and _ultima_janela[:2] == (hwnd, pid):
+        return _ultima_janela[2]
+    nome = nome_processo(pid)
+    _ultima_janela = (hwnd, pid, nome)
+    return nome
+
+
+def obter_janela_ativa():
+    """
+    Fonte de janelas com título e processo.
+
+    Returns:
+        JanelaAtiva or None: (titulo, processo, pid) da janela em foco
+    """
+    try:
+        import pygetwindow as gw
+
+        janela = gw.getActiveWindow()
+        if not janela:
+            return None
+        pid = pid_da_janela(janela)
+        return JanelaAtiva(janela.title, _nome_da_janela(getattr(janela, "_hWnd", None), pid), pid)
+    except Exception:
+        return None
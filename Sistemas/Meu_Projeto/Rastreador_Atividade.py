@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de Rastreamento de Atividade
+==================================
+
+Implementação única do ciclo "consultar janela ativa -> comparar com a
+anterior -> registrar sessão encerrada", compartilhada por todas as
+interfaces de monitoramento (Meu_Dia.py, Interface_Monitoramento.py,
+Meu_Dia_CSV.py e Monitoramento_Atividade.py).
+
+O rastreador é baseado em instância: cada um tem sua própria fonte de
+janelas, seus próprios destinos (sinks) e seu próprio estado de sessão,
+sem variáveis globais. Assim o loop crítico é otimizado e medido em um
+único lugar, e vários rastreadores podem coexistir no mesmo processo.
+
+Conceitos:
+- Fonte de janelas: função sem argumentos que retorna a janela ativa
+  (ou None), como JanelaAtiva(titulo, processo, pid) ou apenas o título.
+  Padrão: obter_janela_ativa (pygetwindow + psutil, Processos_Janela.py).
+- Destino: objeto com os métodos registrar(registro) e fechar().
+  Veja Destinos_Atividade.py (JSON, CSV, MySQL e memória).
+
+Exemplo de uso:
+    from Destinos_Atividade import DestinoMemoria, DestinoJSON
+
+    rastreador = RastreadorAtividade(destinos=[DestinoMemoria(), DestinoJSON()])
+    parar = threading.Event()
+    rastreador.executar(parar)      # até parar.set()
+    rastreador.finalizar()          # registra a sessão em andamento
+    rastreador.fechar()             # fecha todos os destinos
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import datetime
+import threading
+import time
+
+from Dicionario_Titulos import DicionarioTitulos
+from Processos_Janela import obter_janela_ativa
+from Agendador_Amostragem import (AgendadorAdaptativo, MIN_INTERVAL_SECONDS,
+                                  BACKOFF_FACTOR)
+
+# =============================================================================
+# CONFIGURAÇÕES DO RASTREADOR
+# =============================================================================
+
+# Intervalo máximo entre verificações de atividade (em segundos)
+# Logo após uma mudança de janela o rastreador verifica a cada
+# MIN_INTERVAL_SECONDS e recua gradualmente até este valor
+RECORD_INTERVAL_SECONDS = 5
+
+# =============================================================================
+# FONTES DE JANELAS
+# =============================================================================
+
+def obter_titulo_janela_ativa():
+    """
+    Fonte padrão: título da janela em foco, obtido via pygetwindow.
+
+    O pygetwindow é importado apenas na primeira chamada, para que fontes
+    alternativas (testes, replays) funcionem sem a biblioteca instalada.
+
+    Returns:
+        str or None: Título da janela ativa ou None se não conseguir obter
+    """
+    try:
+        import pygetwindow as gw
+
+        active_window = gw.getActiveWindow()
+        if active_window:
+            return active_window.title
+    except Exception:
+        # Sem janela ativa, sem permissão ou sem suporte no sistema
+        return None
+    return None
+
+# =============================================================================
+# MOTOR DE RASTREAMENTO
+# =============================================================================
+
+class RastreadorAtividade:
+    """
+    Rastreia a janela ativa e entrega cada sessão encerrada aos destinos.
+
+    Args:
+        fonte (callable): Retorna a janela ativa (JanelaAtiva ou título) ou None
+        destinos (list): Objetos com registrar(registro) e fechar()
+        intervalo (float): Intervalo máximo entre verificações (segundos)
+        intervalo_minimo (float): Intervalo logo após uma mudança de janela
+        relogio (callable): Retorna o instante atual (datetime), usado no
+                            timestamp_end dos registros
+        relogio_monotonico (callable): Relógio monotônico usado para medir
+                                       as durações e agendar as amostras
+        ao_registrar (callable): Chamado com cada registro de sessão encerrada
+        ao_mudar (callable): Chamado com (titulo, instante) a cada nova janela
+        ao_erro (callable): Chamado com (destino, exceção) se um destino falhar
+        titulos (DicionarioTitulos): Dicionário para internar os títulos;
+                                     compartilhe com um BufferSessoes para
+                                     que ambos usem os mesmos ids
+        classificador (ClassificadorCategorias): Se informado, cada registro
+                                     recebe também "category"
+        recursos (AmostradorRecursos): Se informado, amostra CPU% e RSS do
+                                     processo ativo e acrescenta o resumo da
+                                     sessão (CAMPOS_RECURSOS) a cada registro
+
+    Formato de cada registro entregue aos destinos:
+        {
+            "timestamp_end": "2025-06-28T14:30:15.123456",
+            "application_or_url": "Documento - Microsoft Word",
+            "duration_seconds": 45.67,
+            "process_name": "WINWORD.EXE",    # None se não identificado
+            "category": "Escritório",         # só com classificador
+            "cpu_percent_avg": 12.5, ...      # só com recursos
+        }
+    """
+
+    def __init__(self, fonte=None, destinos=(), intervalo=RECORD_INTERVAL_SECONDS,
+                 intervalo_minimo=MIN_INTERVAL_SECONDS, relogio=datetime.datetime.now,
+                 relogio_monotonico=time.monotonic, ao_registrar=None, ao_mudar=None,
+                 ao_erro=None, titulos=None, classificador=None, recursos=None):
+        self.fonte = fonte or obter_janela_ativa
+        self.destinos = list(destinos)
+        self.intervalo = intervalo
+        self.intervalo_minimo = min(intervalo_minimo, intervalo)
+        self.relogio = relogio
+        self.relogio_monotonico = relogio_monotonico
+        self.ao_registrar = ao_registrar
+        self.ao_mudar = ao_mudar
+        self.ao_erro = ao_erro
+        self.classificador = classificador
+        self.recursos = recursos
+
+        # Títulos internados: cada título distinto existe uma única vez na
+        # memória, por mais sessões que o repitam
+        self.titulos = titulos if titulos is not None else DicionarioTitulos()
+
+        # Estado da sessão atual
+        self._observacao_atual = None   # valor bruto da fonte, para comparação
+        self.janela_atual = None
+        self.processo_atual = None
+        self.pid_atual = None
+        self.inicio_sessao = None
+        self._inicio_monotonico = None
+        self.total_sessoes = 0
+        self.total_amostras = 0
+        self.agendador = None
+
+    def amostrar(self):
+        """
+        Executa uma verificação da janela ativa.
+
+        Returns:
+            dict or None: Registro da sessão encerrada, se a janela mudou
+        """
+        return self._verificar()[1]
+
+    def _verificar(self):
+        """Uma amostra; retorna (mudou, registro da sessão encerrada)."""
+        self.total_amostras += 1
+        observacao = self.fonte()
+
+        # Caminho comum (janela inalterada): uma única comparação
+        if observacao == self._observacao_atual:
+            if self.recursos is not None:
+                # Limitado pelo intervalo do amostrador: em geral, só uma comparação
+                self.recursos.amostrar(self.pid_atual, self.relogio_monotonico())
+            return False, None
+
+        instante = self.relogio()
+        monotonico = self.relogio_monotonico()
+        registro = self._encerrar_sessao(instante, monotonico)
+
+        # Inicia nova sessão
+        if isinstance(observacao, tuple):
+            titulo, processo, pid = observacao
+        else:
+            titulo, processo, pid = observacao, None, None
+        self._observacao_atual = observacao
+        self.janela_atual = self.titulos.internar(titulo)
+        self.processo_atual = self.titulos.internar(processo)
+        self.pid_atual = pid
+        self.inicio_sessao = instante
+        self._inicio_monotonico = monotonico
+        if self.recursos is not None:
+            # Primeira leitura do novo processo (inicia a medição de CPU%)
+            self.recursos.nova_janela()
+            self.recursos.amostrar(pid, monotonico)
+        if self.ao_mudar is not None:
+            self.ao_mudar(self.janela_atual, instante)
+
+        return True, registro
+
+    def executar(self, parar_evento=None):
+        """
+        Loop de monitoramento até que parar_evento seja sinalizado.
+
+        As amostras seguem o AgendadorAdaptativo: rápidas logo após uma
+        mudança de janela, mais espaçadas em períodos estáveis. Sinalizar
+        parar_evento interrompe a espera imediatamente.
+
+        Args:
+            parar_evento (threading.Event): Evento de parada; se None, o
+                                            loop roda até KeyboardInterrupt
+        """
+        if parar_evento is None:
+            parar_evento = threading.Event()
+
+        self.agendador = AgendadorAdaptativo(
+            intervalo_minimo=self.intervalo_minimo,
+            intervalo_maximo=self.intervalo,
+            fator_recuo=BACKOFF_FACTOR,
+            parar_evento=parar_evento,
+            relogio=self.relogio_monotonico
+        )
+
+        while not parar_evento.is_set():
+            mudou, _ = self._verificar()
+            self.agendador.ajustar(mudou)
+            if not self.agendador.aguardar():
+                break
+
+    def finalizar(self):
+        """
+        Registra a sessão em andamento (ao parar o monitoramento).
+
+        Returns:
+            dict or None: Registro da última sessão, se havia uma
+        """
+        registro = self._encerrar_sessao(self.relogio(), self.relogio_monotonico())
+        self._observacao_atual = None
+        self.janela_atual = None
+        self.processo_atual = None
+        self.pid_atual = None
+        self.inicio_sessao = None
+        self._inicio_monotonico = None
+        return registro
+
+    def fechar(self):
+        """Fecha todos os destinos (envia lotes pendentes, compacta arquivos)."""
+        for destino in self.destinos:
+            try:
+                destino.fechar()
+            except Exception as e:
+                self._reportar_erro(destino, e)
+
+    def _encerrar_sessao(self, instante, monotonico):
+        """Monta o registro da sessão atual e o entrega aos destinos."""
+        if self.janela_atual is None or self._inicio_monotonico is None:
+            return None
+
+        # Duração pelo relógio monotônico: não é afetada por ajustes de hora
+        duracao = monotonico - self._inicio_monotonico
+        registro = {
+            "timestamp_end": instante.isoformat(),
+            "application_or_url": self.janela_atual,
+            "duration_seconds": round(duracao, 2),
+            "process_name": self.processo_atual
+        }
+        if self.classificador is not None:
+            # Memorizado por (título, processo): só títulos novos avaliam as regras
+            registro["category"] = self.classificador.classificar(self.janela_atual,
+                                                                   self.processo_atual)
+        if self.recursos is not None:
+            registro.update(self.recursos.encerrar_sessao())
+        self.total_sessoes += 1
+
+        # Uma falha em um destino não interrompe os demais
+        for destino in self.destinos:
+            try:
+                destino.registrar(registro)
+            except Exception as e:
+                self._reportar_erro(destino, e)
+
+        if self.ao_registrar is not None:
+            self.ao_registrar(registro)
+
+        return registro
+
+    def _reportar_erro(self, destino, erro):
+        if self.ao_erro is not None:
+            self.ao_erro(destino, erro)
+        else:
+            print(f"Erro no destino {type(destino).__name__}: {erro}")
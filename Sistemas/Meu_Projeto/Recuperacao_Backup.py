@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+Recuperação dos Backups JSON/CSV para o MySQL
+=============================================
+
+O activity_log.jsonl (diário), o activity_log.json e o activity_log.csv
+são os backups "caso o MySQL falhe". Este módulo os reenvia ao banco
+depois de uma queda, sem duplicar nada:
+
+- Cada sessão tem uma chave determinística (session_key), o SHA-1 de
+  (host, timestamp_end, título), com índice único na tabela
+- O arquivo é lido em streaming, em lotes; para cada lote, um único
+  SELECT descobre quais chaves o MySQL já tem e só as faltantes são
+  inseridas
+- Um checkpoint ao lado do arquivo guarda até onde ele já foi conferido,
+  então a próxima recuperação começa do ponto em que a anterior parou:
+  o custo é proporcional ao trecho novo, e não ao arquivo inteiro
+
+Um diretório de arquivo rotativo (Arquivo_Rotativo.py) é expandido para
+todos os seus segmentos: os fechados (.zst/.gz), lidos descompactando em
+streaming, e os abertos. Segmentos fechados não mudam mais, então cada um
+é conferido por inteiro uma única vez.
+
+O checkpoint guarda também uma assinatura do início do arquivo. Backups
+reescritos no lugar (o activity_log.json é regenerado a partir do
+segmento aberto a cada encerramento) deixam de casar com a assinatura e
+são conferidos de novo desde o início, em vez de terem registros pulados.
+
+Uso pela linha de comando:
+    python Recuperacao_Backup.py                       # activity_log_arquivo/ e activity_log.jsonl
+    python Recuperacao_Backup.py activity_log.csv --host NOTEBOOK-CASA
+
+Sessões de dias já consolidados pela retenção (Retencao_Atividade.py)
+são puladas e contadas como "expiradas": as linhas brutas desses dias
+foram apagadas depois de somadas em uso_aplicativos_diario, e reinseri-las
+faria a próxima retenção somá-las de novo.
+
+Observação: linhas gravadas antes da existência da coluna session_key
+ficam com a chave nula e não são reconhecidas como já existentes.
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import argparse
+import csv
+import datetime
+import hashlib
+import json
+import os
+
+from sqlalchemy import bindparam, text
+
+from Diario_Atividade import JOURNAL_FILE
+from Arquivo_Rotativo import segmentos, ler_segmento, ARCHIVE_DIR
+from Gravador_MySQL import GravadorMySQL, chave_sessao, TABLE_NAME, HOST_NAME
+from Recursos_Processo import CAMPOS_RECURSOS
+from Retencao_Atividade import dias_consolidados
+
+# =============================================================================
+# CONFIGURAÇÕES
+# =============================================================================
+
+RECOVERY_BATCH_SIZE = 500            # Sessões conferidas por ida ao banco
+CHECKPOINT_SUFFIX = ".checkpoint"    # Arquivo de checkpoint: <backup>.checkpoint
+
+# Tamanho dos pedaços lidos do array JSON legado
+_PEDACO_JSON = 64 * 1024
+
+# Bytes do início do backup que formam a assinatura do checkpoint
+_BYTES_ASSINATURA = 4096
+
+# Extensões dos segmentos fechados do arquivo rotativo
+_EXTENSOES_COMPACTADAS = (".zst", ".gz")
+
+
+# =============================================================================
+# LEITURA DOS BACKUPS EM STREAMING
+# =============================================================================
+# Cada leitor recebe a posição inicial e devolve pares (registro, posição
+# logo após o registro). Para JSON Lines e CSV a posição é o byte no
+# arquivo; para o array JSON legado e os segmentos compactados, a
+# quantidade de registros.
+
+def _normalizar(registro):
+    """Converte um registro lido de backup para o formato do rastreador."""
+    duracao = registro.get("duration_seconds")
+    normalizado = {
+        "timestamp_end": registro["timestamp_end"],
+        "application_or_url": registro.get("application_or_url") or None,
+        "duration_seconds": float(duracao) if duracao not in (None, "") else 0.0,
+        "process_name": registro.get("process_name") or None,
+    }
+    # Diários do coletor central trazem o computador de origem
+    if registro.get("host"):
+        normalizado["host"] = registro["host"]
+    # Resumo de recursos da sessão, se foi amostrado (vazio no CSV vira nulo)
+    for campo in CAMPOS_RECURSOS:
+        if registro.get(campo) not in (None, ""):
+            normalizado[campo] = float(registro[campo])
+    return normalizado
+
+
+def _ler_jsonl(caminho, inicio):
+    with open(caminho, 'rb') as f:
+        f.seek(inicio)
+        for linha in f:
+            if not linha.endswith(b"\n"):
+                # Última linha ainda incompleta: fica para a próxima vez
+                return
+            texto = linha.strip()
+            if texto:
+                try:
+                    registro = json.loads(texto)
+                except json.JSONDecodeError:
+                    continue
+                yield _normalizar(registro), f.tell()
+
+
+def _ler_csv(caminho, inicio):
+    with open(caminho, 'rb') as f:
+        cabecalho = next(csv.reader([f.readline().decode("utf-8")]), None)
+        if not cabecalho:
+            return
+        f.seek(max(inicio, f.tell()))
+        for linha in f:
+            if not linha.endswith(b"\n"):
+                return
+            valores = next(csv.reader([linha.decode("utf-8")]), None)
+            if valores:
+                yield _normalizar(dict(zip(cabecalho, valores))), f.tell()
+
+
+def _ler_array_json(caminho, inicio):
+    """Lê o array JSON legado objeto a objeto, sem carregá-lo inteiro."""
+    decodificador = json.JSONDecoder()
+    with open(caminho, 'r', encoding='utf-8') as f:
+        buffer = ""
+        posicao = 0
+        fim_arquivo = False
+        while True:
+            buffer = buffer.lstrip(" \t\r\n[,")
+            if buffer.startswith("]"):
+                return
+            try:
+                registro, tamanho = decodificador.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if fim_arquivo:
+                    return
+                pedaco = f.read(_PEDACO_JSON)
+                fim_arquivo = not pedaco
+                buffer += pedaco
+                continue
+            buffer = buffer[tamanho:]
+            posicao += 1
+            if posicao > inicio:
+                yield _normalizar(registro), posicao
+
+
+def _ler_segmento_compactado(caminho, inicio):
+    """Lê um segmento fechado (.zst/.gz) descompactando em streaming."""
+    for posicao, registro in enumerate(ler_segmento(caminho), 1):
+        if posicao > inicio:
+            yield _normalizar(registro), posicao
+
+
+def _leitor_de(caminho):
+    """Escolhe o leitor pela extensão do arquivo."""
+    extensao = os.path.splitext(caminho)[1].lower()
+    if extensao in _EXTENSOES_COMPACTADAS:
+        return _ler_segmento_compactado
+    if extensao == ".csv":
+        return _ler_csv
+    if extensao == ".json":
+        return _ler_array_json
+    return _ler_jsonl
+
+
+# =============================================================================
+# CHECKPOINT
+# =============================================================================
+
+def _assinatura(caminho, tamanho):
+    """SHA-1 dos primeiros ``tamanho`` bytes do backup."""
+    with open(caminho, 'rb') as f:
+        return hashlib.sha1(f.read(tamanho)).hexdigest()
+
+
+def _ler_checkpoint(arquivo_checkpoint, caminho):
+    """
+    Posição já conferida do backup.
+
+    A conferência recomeça do início (as chaves evitam duplicatas) se o
+    backup encolheu desde o checkpoint, se o seu início não casa mais com
+    a assinatura (foi reescrito no lugar) ou se o checkpoint é de uma
+    versão sem assinatura.
+    """
+    try:
+        with open(arquivo_checkpoint, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return 0
+    if os.path.getsize(caminho) < checkpoint.get("tamanho", 0):
+        return 0
+    assinados = checkpoint.get("bytes_assinados")
+    if assinados is None or _assinatura(caminho, assinados) != checkpoint.get("assinatura"):
+        return 0
+    return checkpoint.get("posicao", 0)
+
+
+def _salvar_checkpoint(arquivo_checkpoint, caminho, posicao):
+    """Grava o checkpoint de forma atômica (arquivo temporário + replace)."""
+    temporario = arquivo_checkpoint + ".tmp"
+    tamanho = os.path.getsize(caminho)
+    assinados = min(tamanho, _BYTES_ASSINATURA)
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump({"arquivo": os.path.basename(caminho), "posicao": posicao,
+                   "tamanho": tamanho, "bytes_assinados": assinados,
+                   "assinatura": _assinatura(caminho, assinados)}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporario, arquivo_checkpoint)
+
+
+# =============================================================================
+# RECUPERAÇÃO
+# =============================================================================
+
+def _faltantes(gravador, lote):
+    """
+    Sessões do lote cuja session_key ainda não está no MySQL.
+
+    Sessões de dias já consolidados pela retenção ficam de fora.
+
+    Returns:
+        tuple: (faltantes, expiradas)
+    """
+    dias = [datetime.date.fromisoformat(r["timestamp_end"][:10]) for r in lote]
+    with gravador.engine.connect() as conexao:
+        consolidados = dias_consolidados(conexao, dias)
+        validas = [r for r, dia in zip(lote, dias) if dia not in consolidados]
+        por_chave = {chave_sessao(r, r.get("host") or gravador.host): r for r in validas}
+        if not por_chave:
+            return [], len(lote) - len(validas)
+        existentes = conexao.execute(
+            text(f"SELECT session_key FROM `{gravador.tabela}` "
+                 f"WHERE session_key IN :chaves").bindparams(
+                     bindparam("chaves", expanding=True)),
+            {"chaves": list(por_chave)}
+        )
+        for (chave,) in existentes:
+            por_chave.pop(bytes(chave), None)
+    return list(por_chave.values()), len(lote) - len(validas)
+
+
+def recuperar_backup(caminho, gravador, tamanho_lote=RECOVERY_BATCH_SIZE,
+                     arquivo_checkpoint=None):
+    """
+    Reenvia ao MySQL as sessões de um backup que ainda não estão lá.
+
+    Args:
+        caminho (str): Backup (.jsonl, .json, .csv ou segmento .zst/.gz)
+        gravador (GravadorMySQL): Gravador configurado (não precisa estar
+                                  iniciado); define engine, tabela e host
+        tamanho_lote (int): Sessões conferidas por ida ao banco
+        arquivo_checkpoint (str): Checkpoint (padrão: <caminho>.checkpoint)
+
+    Returns:
+        dict: lidos, existentes, expirados (dias já consolidados) e
+              inseridos nesta execução
+    """
+    arquivo_checkpoint = arquivo_checkpoint or caminho + CHECKPOINT_SUFFIX
+    resumo = {"lidos": 0, "existentes": 0, "expirados": 0, "inseridos": 0}
+    if not os.path.exists(caminho):
+        return resumo
+
+    inicio = _ler_checkpoint(arquivo_checkpoint, caminho)
+    leitor = _leitor_de(caminho)
+
+    gravador.gravar_lote([])   # garante tabela, dicionário e session_key
+    lote, posicao = [], inicio
+    for registro, posicao_seguinte in leitor(caminho, inicio):
+        lote.append(registro)
+        posicao = posicao_seguinte
+        if len(lote) >= tamanho_lote:
+            _enviar_lote(gravador, lote, resumo)
+            _salvar_checkpoint(arquivo_checkpoint, caminho, posicao)
+            lote = []
+
+    _enviar_lote(gravador, lote, resumo)
+    if posicao != inicio:
+        _salvar_checkpoint(arquivo_checkpoint, caminho, posicao)
+    return resumo
+
+
+def _enviar_lote(gravador, lote, resumo):
+    if not lote:
+        return
+    faltantes, expiradas = _faltantes(gravador, lote)
+    gravador.gravar_lote(faltantes)
+    resumo["lidos"] += len(lote)
+    resumo["inseridos"] += len(faltantes)
+    resumo["expirados"] += expiradas
+    resumo["existentes"] += len(lote) - len(faltantes) - expiradas
+
+
+def caminhos_do_arquivo(diretorio=ARCHIVE_DIR):
+    """
+    Todos os segmentos de um arquivo rotativo, fechados e abertos.
+
+    O checkpoint de um segmento bruto (posição em bytes) não vale para a
+    sua versão compactada e é descartado quando a compactação aparece.
+
+    Returns:
+        list: Caminhos em ordem cronológica
+    """
+    caminhos = []
+    for entrada in segmentos(diretorio):
+        if entrada["arquivo"] != entrada["segmento"]:
+            obsoleto = os.path.join(diretorio, entrada["segmento"]) + CHECKPOINT_SUFFIX
+            if os.path.exists(obsoleto):
+                os.remove(obsoleto)
+        caminhos.append(os.path.join(diretorio, entrada["arquivo"]))
+    return caminhos
+
+
+def main():
+    """Recupera os backups informados na linha de comando."""
+    parser = argparse.ArgumentParser(
+        description="Reenvia ao MySQL as sessões dos backups que ainda não estão no banco.")
+    parser.add_argument("arquivos", nargs="*", default=[ARCHIVE_DIR, JOURNAL_FILE],
+                        help="Backups .jsonl, .json, .csv, .zst, .gz ou diretórios de arquivo "
+                             "rotativo (padrão: %(default)s)")
+    parser.add_argument("--tabela", default=TABLE_NAME)
+    parser.add_argument("--host", default=HOST_NAME,
+                        help="Computador onde o backup foi gerado (padrão: este)")
+    parser.add_argument("--lote", type=int, default=RECOVERY_BATCH_SIZE)
+    args = parser.parse_args()
+
+    # Credenciais do .env, as mesmas do monitoramento
+    from Meu_Dia import get_database_url
+
+    gravador = GravadorMySQL(get_database_url(), tabela=args.tabela, host=args.host)
+    caminhos = []
+    for caminho in args.arquivos:
+        caminhos.extend(caminhos_do_arquivo(caminho) if os.path.isdir(caminho) else [caminho])
+
+    for caminho in caminhos:
+        resumo = recuperar_backup(caminho, gravador, tamanho_lote=args.lote)
+        print(f"{caminho}: {resumo['lidos']} lidos, {resumo['existentes']} já no banco, "
+              f"{resumo['expirados']} de dias consolidados, {resumo['inseridos']} inseridos")
+
+
+if __name__ == "__main__":
+    main()
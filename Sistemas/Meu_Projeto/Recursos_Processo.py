@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Amostragem de Recursos do Processo em Primeiro Plano
+====================================================
+
+Além de qual janela está ativa, mede quanto ela custa: CPU% e memória
+residente (RSS) do processo dono da janela, via psutil, em uma taxa
+baixa e configurável (RESOURCE_SAMPLE_SECONDS), independente da taxa de
+verificação da janela.
+
+- As amostras vão para um buffer circular de tamanho fixo (arrays
+  tipados, sem crescer com o tempo de monitoramento)
+- Cada sessão acumula mínimo, máximo e soma das suas amostras; ao
+  encerrar a sessão, o resumo (mín/média/máx de CPU e RSS e a quantidade
+  de amostras) é acrescentado ao registro e gravado na mesma linha de
+  ``uso_aplicativos``
+- Custo por verificação limitado: fora dos instantes de amostragem é
+  uma única comparação; em um instante de amostragem, uma leitura
+  ``oneshot()`` do psutil para um objeto Process reaproveitado
+
+Uso com o rastreador:
+    recursos = AmostradorRecursos(intervalo=10.0)
+    rastreador = RastreadorAtividade(fonte=obter_janela_ativa, recursos=recursos)
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import time
+from array import array
+
+# =============================================================================
+# CONFIGURAÇÕES
+# =============================================================================
+
+RESOURCE_SAMPLE_SECONDS = 10.0   # Intervalo mínimo entre amostras de recursos
+RESOURCE_RING_SIZE = 360         # Amostras recentes guardadas (1 hora a cada 10 s)
+
+# Campos acrescentados a cada registro de sessão (colunas de uso_aplicativos)
+CAMPOS_RECURSOS = ("resource_samples", "cpu_percent_min", "cpu_percent_avg",
+                   "cpu_percent_max", "rss_mb_min", "rss_mb_avg", "rss_mb_max")
+
+_UM_MB = 1024 * 1024
+
+
+class MedidorPsutil:
+    """
+    Lê CPU% e RSS de um processo pelo psutil.
+
+    O objeto psutil.Process do último PID é reaproveitado: cpu_percent()
+    mede o consumo desde a chamada anterior no mesmo objeto, então a
+    primeira leitura de um processo novo só inicia a medição. Um PID com
+    acesso negado não é consultado de novo até a janela ativa mudar de
+    processo.
+
+    Chamada: medidor(pid) -> (cpu_percent, rss_bytes) ou None
+    """
+
+    def __init__(self):
+        self._pid = None
+        self._processo = None
+        self._negado = None
+
+    def __call__(self, pid):
+        if pid is None or pid == self._negado:
+            return None
+        try:
+            import psutil
+        except ImportError:
+            return None
+
+        self._negado = None
+        try:
+            if pid != self._pid:
+                self._pid = pid
+                self._processo = psutil.Process(pid)
+                self._processo.cpu_percent(None)
+                return None
+            with self._processo.oneshot():
+                return self._processo.cpu_percent(None), self._processo.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess) as e:
+            if isinstance(e, psutil.AccessDenied):
+                self._negado = pid
+            self._pid = None
+            self._processo = None
+            return None
+
+
+class AmostradorRecursos:
+    """
+    Amostra os recursos do processo ativo e resume cada sessão.
+
+    Args:
+        intervalo (float): Segundos mínimos entre duas amostras
+        capacidade (int): Tamanho do buffer circular de amostras recentes
+        medidor (callable): medidor(pid) -> (cpu_percent, rss_bytes) ou None
+                            (padrão: MedidorPsutil)
+        relogio (callable): Relógio monotônico (segundos)
+    """
+
+    def __init__(self, intervalo=RESOURCE_SAMPLE_SECONDS, capacidade=RESOURCE_RING_SIZE,
+                 medidor=None, relogio=time.monotonic):
+        self.intervalo = intervalo
+        self.capacidade = capacidade
+        self.medidor = medidor or MedidorPsutil()
+        self.relogio = relogio
+
+        # Buffer circular: instante, CPU% e RSS (MB) das amostras recentes
+        self._instantes = array('d', bytes(8 * capacidade))
+        self._cpu = array('f', bytes(4 * capacidade))
+        self._rss = array('f', bytes(4 * capacidade))
+        self._proxima = 0
+        self.total_amostras = 0
+
+        self._ultima = None
+        self._reiniciar_sessao()
+
+    def _reiniciar_sessao(self):
+        self._n = 0
+        self._cpu_min = self._cpu_max = self._cpu_soma = 0.0
+        self._rss_min = self._rss_max = self._rss_soma = 0.0
+
+    def amostrar(self, pid, agora=None):
+        """
+        Registra uma amostra do processo, se o intervalo já passou.
+
+        O intervalo só conta a partir de uma leitura bem-sucedida: depois
+        da leitura que apenas inicia a medição de um processo novo, a
+        verificação seguinte já amostra.
+
+        Args:
+            pid (int): Processo da janela ativa
+            agora (float): Instante monotônico (padrão: relogio())
+
+        Returns:
+            bool: True se uma amostra foi registrada
+        """
+        agora = self.relogio() if agora is None else agora
+        if self._ultima is not None and agora - self._ultima < self.intervalo:
+            return False
+
+        medida = self.medidor(pid)
+        if medida is None:
+            return False
+        self._ultima = agora
+        cpu = float(medida[0])
+        rss = medida[1] / _UM_MB
+
+        i = self._proxima
+        self._instantes[i] = agora
+        self._cpu[i] = cpu
+        self._rss[i] = rss
+        self._proxima = (i + 1) % self.capacidade
+        self.total_amostras += 1
+
+        if self._n == 0:
+            self._cpu_min = self._cpu_max = cpu
+            self._rss_min = self._rss_max = rss
+        else:
+            self._cpu_min = min(self._cpu_min, cpu)
+            self._cpu_max = max(self._cpu_max, cpu)
+            self._rss_min = min(self._rss_min, rss)
+            self._rss_max = max(self._rss_max, rss)
+        self._n += 1
+        self._cpu_soma += cpu
+        self._rss_soma += rss
+        return True
+
+    def encerrar_sessao(self):
+        """
+        Resumo das amostras da sessão que terminou, e reinício dos acumuladores.
+
+        Returns:
+            dict: CAMPOS_RECURSOS (valores None se a sessão não teve amostras)
+        """
+        if self._n == 0:
+            resumo = dict.fromkeys(CAMPOS_RECURSOS)
+            resumo["resource_samples"] = 0
+        else:
+            resumo = {
+                "resource_samples": self._n,
+                "cpu_percent_min": round(self._cpu_min, 1),
+                "cpu_percent_avg": round(self._cpu_soma / self._n, 1),
+                "cpu_percent_max": round(self._cpu_max, 1),
+                "rss_mb_min": round(self._rss_min, 1),
+                "rss_mb_avg": round(self._rss_soma / self._n, 1),
+                "rss_mb_max": round(self._rss_max, 1),
+            }
+        self._reiniciar_sessao()
+        return resumo
+
+    def nova_janela(self):
+        """Descarta o intervalo em curso: a próxima verificação já amostra."""
+        self._ultima = None
+
+    def recentes(self):
+        """
+        Amostras do buffer circular, da mais antiga para a mais recente.
+
+        Returns:
+            list: [(instante, cpu_percent, rss_mb), ...]
+        """
+        n = min(self.total_amostras, self.capacidade)
+        inicio = (self._proxima - n) % self.capacidade
+        indices = [(inicio + k) % self.capacidade for k in range(n)]
+        return [(self._instantes[i], self._cpu[i], self._rss[i]) for i in indices]
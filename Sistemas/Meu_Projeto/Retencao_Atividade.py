@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Retenção: Sessões Antigas Consolidadas em Totais Diários
+========================================================
+
+As linhas por sessão de ``uso_aplicativos`` crescem sem limite, mas os
+dados antigos só são lidos como totais por dia. Este job consolida as
+sessões com mais de RETENTION_DAYS dias em ``uso_aplicativos_diario``
+(data, aplicativo, total de segundos, sessões) e então remove as linhas
+brutas:
+
+- Tabela particionada (Esquema_Atividade): trabalha por partição mensal
+  inteira já vencida. Cada dia da partição é consolidado e apagado (ou
+  copiado para a tabela uso_aplicativos_pAAAAMM) em uma transação
+  própria; a partição, já vazia, é então descartada (DROP PARTITION)
+- Tabela sem partições: cada dia é consolidado e apagado (ou copiado para
+  uso_aplicativos_arquivo) na mesma transação
+
+A consolidação soma às linhas diárias existentes. Sessões de um dia já
+consolidado podem voltar depois (reenvio de pendentes, coletor): depois
+do DROP PARTITION elas caem na partição mensal seguinte e são somadas
+quando ela vencer, sem apagar o total anterior. Como as linhas brutas de
+um dia saem na mesma transação em que são somadas, executar o job de
+novo após uma interrupção nunca conta nada em dobro. A recuperação de
+backups (Recuperacao_Backup.py) pula as sessões de dias já consolidados
+(dias_consolidados), que senão seriam somadas outra vez.
+
+Uso pela linha de comando:
+    python Retencao_Atividade.py                  # 90 dias, apaga as partições
+    python Retencao_Atividade.py --dias 30 --modo arquivar
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import argparse
+import datetime
+import re
+
+from sqlalchemy import bindparam, text
+
+from Esquema_Atividade import TABLE_NAME, proximo_mes
+
+# =============================================================================
+# CONFIGURAÇÕES
+# =============================================================================
+
+RETENTION_DAYS = 90                    # Sessões mais antigas que isso são consolidadas
+DAILY_TABLE = "uso_aplicativos_diario"
+
+# O que fazer com as linhas brutas depois de consolidadas
+MODO_APAGAR = "apagar"
+MODO_ARQUIVAR = "arquivar"
+MODOS_RETENCAO = (MODO_APAGAR, MODO_ARQUIVAR)
+RETENTION_MODE = MODO_APAGAR
+
+# app_title_id 0 agrupa as linhas sem título conhecido
+CREATE_DAILY_SQL = """
+CREATE TABLE IF NOT EXISTS `{tabela}` (
+    data DATE NOT NULL,
+    app_title_id INT UNSIGNED NOT NULL,
+    total_seconds DECIMAL(14,2) NOT NULL,
+    sessions INT UNSIGNED NOT NULL,
+    PRIMARY KEY (data, app_title_id)
+)
+"""
+
+
+def _consolidar_dia(conexao, tabela, tabela_diaria, dia, particao=None, arquivo=None):
+    """
+    Soma os totais de um dia às linhas diárias e remove as linhas brutas.
+
+    Tudo na transação da conexão: ou o dia é somado e sai da tabela de
+    sessões, ou nada acontece.
+
+    Returns:
+        int: Linhas brutas removidas
+    """
+    origem = f"`{tabela}` PARTITION (`{particao}`)" if particao else f"`{tabela}`"
+    filtro = "WHERE timestamp_end >= :inicio AND timestamp_end < :fim"
+    intervalo = {"inicio": dia, "fim": dia + datetime.timedelta(days=1)}
+    conexao.execute(text(
+        f"INSERT INTO `{tabela_diaria}` (data, app_title_id, total_seconds, sessions) "
+        f"SELECT DATE(timestamp_end), COALESCE(app_title_id, 0), "
+        f"SUM(duration_seconds), COUNT(*) "
+        f"FROM {origem} {filtro} "
+        f"GROUP BY DATE(timestamp_end), COALESCE(app_title_id, 0) "
+        f"ON DUPLICATE KEY UPDATE "
+        f"total_seconds = total_seconds + VALUES(total_seconds), "
+        f"sessions = sessions + VALUES(sessions)"), intervalo)
+    if arquivo is not None:
+        conexao.execute(text(f"INSERT INTO `{arquivo}` SELECT * FROM {origem} {filtro}"), intervalo)
+    return conexao.execute(text(f"DELETE FROM {origem} {filtro}"), intervalo).rowcount
+
+
+def dias_consolidados(conexao, dias, tabela_diaria=DAILY_TABLE):
+    """
+    Quais dos dias já foram consolidados em ``tabela_diaria``.
+
+    Sessões desses dias não devem voltar para a tabela de sessões: o total
+    do dia já as contou quando as linhas brutas foram removidas.
+
+    Args:
+        conexao: Conexão SQLAlchemy
+        dias (iterable): Datas (datetime.date) a verificar
+
+    Returns:
+        set: Datas já consolidadas (vazio se a tabela diária não existe)
+    """
+    dias = list(set(dias))
+    if not dias:
+        return set()
+    existe = conexao.execute(text(
+        "SELECT COUNT(*) FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabela"),
+        {"tabela": tabela_diaria}).scalar()
+    if not existe:
+        return set()
+    return set(conexao.execute(text(
+        f"SELECT DISTINCT data FROM `{tabela_diaria}` WHERE data IN :dias").bindparams(
+            bindparam("dias", expanding=True)), {"dias": dias}).scalars())
+
+
+def _particoes_vencidas(conexao, tabela, corte):
+    """Partições mensais cujo mês inteiro é anterior ao corte, em ordem."""
+    nomes = [nome for (nome,) in conexao.execute(text(
+        "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabela "
+        "AND PARTITION_NAME IS NOT NULL ORDER BY PARTITION_ORDINAL_POSITION"),
+        {"tabela": tabela})]
+    if not nomes:
+        return None
+
+    vencidas = []
+    for nome in nomes:
+        if not re.fullmatch(r"p\d{6}", nome):
+            continue
+        mes = datetime.datetime.strptime(nome, "p%Y%m").date()
+        if proximo_mes(mes) > corte:
+            break
+        vencidas.append(nome)
+    return vencidas
+
+
+def executar_retencao(engine, tabela=TABLE_NAME, tabela_diaria=DAILY_TABLE,
+                      dias=RETENTION_DAYS, modo=RETENTION_MODE, hoje=None):
+    """
+    Consolida e remove as sessões mais antigas que ``dias``.
+
+    Args:
+        engine: Engine SQLAlchemy conectada ao MySQL
+        tabela (str): Tabela de sessões
+        tabela_diaria (str): Tabela de totais diários
+        dias (int): Idade mínima (em dias) das sessões consolidadas
+        modo (str): "apagar" ou "arquivar" as linhas brutas
+        hoje (datetime.date): Data de referência (padrão: hoje)
+
+    Returns:
+        dict: dias consolidados, partições removidas e linhas removidas
+    """
+    if modo not in MODOS_RETENCAO:
+        raise ValueError(f"Modo de retenção inválido: {modo!r} (use um de {MODOS_RETENCAO})")
+
+    corte = (hoje or datetime.date.today()) - datetime.timedelta(days=dias)
+    resumo = {"dias": 0, "particoes": [], "linhas": 0}
+
+    with engine.begin() as conexao:
+        conexao.execute(text(CREATE_DAILY_SQL.format(tabela=tabela_diaria)))
+        particoes = _particoes_vencidas(conexao, tabela, corte)
+
+    if particoes is None:
+        _reter_por_dia(engine, tabela, tabela_diaria, corte, modo, resumo)
+        return resumo
+
+    for particao in particoes:
+        with engine.connect() as conexao:
+            dias_particao = [d for (d,) in conexao.execute(text(
+                f"SELECT DISTINCT DATE(timestamp_end) FROM `{tabela}` PARTITION (`{particao}`)"))]
+
+        arquivo = None
+        if modo == MODO_ARQUIVAR and dias_particao:
+            arquivo = f"{tabela}_{particao}"
+            with engine.begin() as conexao:
+                _criar_arquivo_particao(conexao, tabela, arquivo)
+
+        # Um dia por transação: soma e remoção juntas
+        for dia in sorted(dias_particao):
+            with engine.begin() as conexao:
+                resumo["linhas"] += _consolidar_dia(conexao, tabela, tabela_diaria, dia,
+                                                    particao, arquivo)
+            resumo["dias"] += 1
+
+        # A partição já está vazia; o DROP só devolve o espaço. Se alguma
+        # sessão chegou nesse meio-tempo, ela fica para a próxima execução.
+        with engine.begin() as conexao:
+            restantes = conexao.execute(text(
+                f"SELECT EXISTS (SELECT 1 FROM `{tabela}` PARTITION (`{particao}`))")).scalar()
+            if restantes:
+                continue
+            conexao.execute(text(f"ALTER TABLE `{tabela}` DROP PARTITION `{particao}`"))
+        resumo["particoes"].append(particao)
+
+    return resumo
+
+
+def _criar_arquivo_particao(conexao, tabela, arquivo):
+    """Cria (se preciso) a tabela sem partições ``<tabela>_<partição>`` do arquivo."""
+    existe = conexao.execute(text(
+        "SELECT COUNT(*) FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :tabela"), {"tabela": arquivo}).scalar()
+    if not existe:
+        conexao.execute(text(f"CREATE TABLE `{arquivo}` LIKE `{tabela}`"))
+        conexao.execute(text(f"ALTER TABLE `{arquivo}` REMOVE PARTITIONING"))
+
+
+def _reter_por_dia(engine, tabela, tabela_diaria, corte, modo, resumo):
+    """Retenção para tabelas sem partições: consolida e remove dia a dia."""
+    with engine.connect() as conexao:
+        dias_vencidos = [d for (d,) in conexao.execute(text(
+            f"SELECT DISTINCT DATE(timestamp_end) FROM `{tabela}` "
+            f"WHERE timestamp_end < :corte"), {"corte": corte})]
+
+    if modo == MODO_ARQUIVAR and dias_vencidos:
+        with engine.begin() as conexao:
+            conexao.execute(text(f"CREATE TABLE IF NOT EXISTS `{tabela}_arquivo` LIKE `{tabela}`"))
+
+    arquivo = f"{tabela}_arquivo" if modo == MODO_ARQUIVAR else None
+    for dia in sorted(dias_vencidos):
+        # Consolidação e remoção do mesmo dia na mesma transação
+        with engine.begin() as conexao:
+            removidas = _consolidar_dia(conexao, tabela, tabela_diaria, dia, arquivo=arquivo)
+        resumo["dias"] += 1
+        resumo["linhas"] += removidas
+
+
+def main():
+    """Executa a retenção com as credenciais do .env."""
+    parser = argparse.ArgumentParser(
+        description="Consolida sessões antigas em totais diários e remove as linhas brutas.")
+    parser.add_argument("--dias", type=int, default=RETENTION_DAYS,
+                        help="Idade mínima das sessões consolidadas (padrão: %(default)s)")
+    parser.add_argument("--modo", choices=MODOS_RETENCAO, default=RETENTION_MODE)
+    parser.add_argument("--tabela", default=TABLE_NAME)
+    args = parser.parse_args()
+
+    from sqlalchemy import create_engine
+    from Meu_Dia import get_database_url
+
+    engine = create_engine(get_database_url())
+    resumo = executar_retencao(engine, args.tabela, dias=args.dias, modo=args.modo)
+    print(f"{resumo['dias']} dias consolidados em {DAILY_TABLE}; "
+          f"{resumo['linhas']} sessões removidas de {args.tabela}"
+          + (f" (partições: {', '.join(resumo['particoes'])})" if resumo["particoes"] else ""))
+
+
+if __name__ == "__main__":
+    main()
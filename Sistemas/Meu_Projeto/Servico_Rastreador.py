@@ -0,0 +1,632 @@
+# -*- coding: utf-8 -*-
+"""
+Serviço Local do Rastreador de Atividade
+========================================
+
+Abrir o Meu_Dia.py e a Interface_Monitoramento.py ao mesmo tempo criava
+dois rastreadores: duas consultas à janela ativa a cada verificação e
+dois gravadores nos mesmos arquivos. O serviço deixa um único processo
+rastreando e expõe o rastreador por uma API HTTP local:
+
+    rastreador (1 por máquina) --> ServicoRastreador (127.0.0.1:8766)
+                                      |-- GET  /eventos    fluxo de eventos (JSON Lines)
+                                      |-- GET  /estado     janela atual e contadores
+                                      |-- GET  /agregados  top de aplicativos/categorias
+                                      |-- GET  /saude
+                                      '-- POST /parar      encerra o monitoramento
+
+O primeiro monitor aberto hospeda o serviço; os seguintes encontram a
+porta ocupada e apenas assinam os eventos (ClienteRastreador), sem
+consultar janelas nem gravar nada. A porta é reservada (reservar())
+antes de o monitor criar os seus destinos: de dois monitores abertos ao
+mesmo tempo, só o que conseguiu a porta grava.
+
+Quando o monitor que hospeda é encerrado, o evento "fim" traz o motivo:
+"encerrado" (o hospedeiro fechou; um Meu_Dia assinante assume o
+rastreamento) ou "parar" (POST /parar: o monitoramento acaba para todos).
+
+O POST /parar exige o token desta execução no cabeçalho
+X-Rastreador-Token. O hospedeiro sorteia o token em reservar() e o grava
+em um arquivo legível só pelo usuário (TRACKER_TOKEN_FILE), de onde o
+ClienteRastreador o lê. Pedidos com cabeçalho Origin (vindos de páginas
+abertas no navegador) são recusados: uma página qualquer não consegue
+parar o rastreamento.
+
+Eventos: {"seq": n, "tipo": "sessao" | "janela" | "fim", "dados": {...}}.
+Cada assinante tem uma fila limitada: um assinante lento nunca atrasa o
+rastreador; quando a fila enche, ele recebe "atrasado" e reconecta a
+partir do último seq visto, recuperando o que estiver no histórico
+recente (EVENT_BACKLOG eventos).
+
+Uso pela linha de comando (com um monitor já rodando):
+    python Servico_Rastreador.py estado
+    python Servico_Rastreador.py seguir
+    python Servico_Rastreador.py top --hoje --categorias
+    python Servico_Rastreador.py parar
+
+Criado em: 28/06/2025
+Autor: Francisco H. Lomas
+Versão: 1.0
+"""
+
+import argparse
+import datetime
+import errno
+import hmac
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# =============================================================================
+# CONFIGURAÇÕES DO SERVIÇO
+# =============================================================================
+
+TRACKER_ADDRESS = "127.0.0.1"       # Só aceita conexões desta máquina
+TRACKER_PORT = 8766
+TRACKER_URL = f"http://{TRACKER_ADDRESS}:{TRACKER_PORT}"
+TRACKER_TIMEOUT_SECONDS = 2.0       # Consultas simples (/estado, /agregados)
+TRACKER_STARTUP_SECONDS = 10.0      # Espera por um serviço que acabou de reservar a porta
+# Token do POST /parar ({porta} = porta do serviço), legível só pelo usuário
+TRACKER_TOKEN_FILE = os.path.join(os.path.expanduser("~"), ".rastreador_atividade_{porta}.token")
+TOKEN_HEADER = "X-Rastreador-Token"
+
+EVENT_BACKLOG = 500                 # Eventos recentes para reconexões
+SUBSCRIBER_QUEUE_SIZE = 1000        # Eventos aguardando um assinante lento
+EVENT_HEARTBEAT_SECONDS = 2.0       # "ping" em fluxos sem eventos
+
+# Motivos do evento "fim"
+MOTIVO_ENCERRADO = "encerrado"      # O hospedeiro fechou; um assinante pode assumir
+MOTIVO_PARADA = "parar"             # Parada pedida (POST /parar): todos param
+
+_PING = {"tipo": "ping"}
+_ATRASADO = {"tipo": "atrasado"}
+# WSAEADDRINUSE: o errno da porta ocupada no Windows
+_ERROS_PORTA_OCUPADA = (errno.EADDRINUSE, 10048)
+
+
+# =============================================================================
+# DIFUSÃO DE EVENTOS
+# =============================================================================
+
+class _Assinatura:
+    """Fila de eventos de um assinante."""
+
+    def __init__(self, capacidade):
+        self.fila = queue.Queue(capacidade)
+        self.atrasada = False
+
+
+class DifusorEventos:
+    """
+    Entrega cada evento publicado a todos os assinantes.
+
+    publicar() nunca bloqueia: o evento vai para o histórico recente e
+    para a fila de cada assinante; um assinante com a fila cheia é
+    marcado como atrasado e deixa de receber eventos até reconectar.
+
+    Args:
+        historico (int): Eventos recentes guardados para reconexões
+        capacidade (int): Tamanho da fila de cada assinante
+    """
+
+    def __init__(self, historico=EVENT_BACKLOG, capacidade=SUBSCRIBER_QUEUE_SIZE):
+        self.capacidade = capacidade
+        self._historico = deque(maxlen=historico)
+        self._assinaturas = set()
+        self._lock = threading.Lock()
+        self.seq = 0
+
+    @property
+    def assinantes(self):
+        return len(self._assinaturas)
+
+    def publicar(self, tipo, dados=None):
+        """
+        Publica um evento.
+
+        Args:
+            tipo (str): "sessao", "janela", "fim", ...
+            dados (dict): Conteúdo serializável em JSON
+
+        Returns:
+            dict: O evento, com o seu número de sequência
+        """
+        with self._lock:
+            self.seq += 1
+            evento = {"seq": self.seq, "tipo": tipo, "dados": dados}
+            self._historico.append(evento)
+            for assinatura in self._assinaturas:
+                self._entregar(assinatura, evento)
+        return evento
+
+    def assinar(self, desde=None):
+        """
+        Nova assinatura.
+
+        Args:
+            desde (int): Último seq já recebido; os eventos seguintes ainda
+                         no histórico são entregues primeiro (None = só
+                         eventos novos)
+        """
+        assinatura = _Assinatura(self.capacidade)
+        with self._lock:
+            if desde is not None:
+                for evento in self._historico:
+                    if evento["seq"] > desde:
+                        self._entregar(assinatura, evento)
+            self._assinaturas.add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+
+    @staticmethod
+    def _entregar(assinatura, evento):
+        if assinatura.atrasada:
+            return
+        try:
+            assinatura.fila.put_nowait(evento)
+        except queue.Full:
+            assinatura.atrasada = True
+
+
+# =============================================================================
+# SERVIDOR
+# =============================================================================
+
+class _ServidorLocal(ThreadingHTTPServer):
+    # No Windows, SO_REUSEADDR deixaria um segundo serviço ocupar a mesma
+    # porta; a porta ocupada é justamente o sinal de "já existe um rastreador"
+    allow_reuse_address = os.name != "nt"
+
+
+class _ManipuladorServico(BaseHTTPRequestHandler):
+    """GET /eventos, /estado, /agregados e /saude; POST /parar."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        partes = urllib.parse.urlsplit(self.path)
+        parametros = {k: v[-1] for k, v in urllib.parse.parse_qs(partes.query).items()}
+        servico = self.server.servico
+        try:
+            if partes.path == "/eventos":
+                desde = parametros.get("desde")
+                return self._transmitir(int(desde) if desde else None)
+            if partes.path == "/estado":
+                return self._responder(200, servico.estado())
+            if partes.path == "/agregados":
+                data = parametros.get("data")
+                return self._responder(200, servico.consultar_agregados(
+                    n=int(parametros.get("n", 5)),
+                    data=datetime.date.fromisoformat(data) if data else None,
+                    chave=parametros.get("chave", "app")))
+            if partes.path == "/saude":
+                return self._responder(200, {"ok": True, "pid": os.getpid()})
+        except (KeyError, ValueError) as e:
+            return self._responder(400, {"erro": str(e)})
+        self._responder(404, {"erro": "caminho desconhecido"})
+
+    def do_POST(self):
+        if self.path != "/parar":
+            return self._responder(404, {"erro": "caminho desconhecido"})
+        servico = self.server.servico
+        token = self.headers.get(TOKEN_HEADER, "")
+        if self.headers.get("Origin") is not None or not servico.token or \
+                not hmac.compare_digest(token.encode("utf-8"), servico.token.encode("utf-8")):
+            return self._responder(403, {"erro": "token ausente ou inválido"})
+        servico.parar_evento.set()
+        self._responder(200, {"parando": True})
+
+    def _transmitir(self, desde):
+        """Fluxo de eventos, um JSON por linha, até o fim do serviço."""
+        difusor = self.server.servico.difusor
+        assinatura = difusor.assinar(desde)
+
+        # Sem Content-Length: o fim do corpo é o fechamento da conexão
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while True:
+                try:
+                    evento = assinatura.fila.get(timeout=EVENT_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    # Fila vazia: avisa o atraso (se houve) ou só mantém a conexão
+                    evento = _ATRASADO if assinatura.atrasada else _PING
+                self.wfile.write(json.dumps(evento, ensure_ascii=False).encode("utf-8") + b"\n")
+                self.wfile.flush()
+                if evento["tipo"] in ("fim", "atrasado"):
+                    break
+        except OSError:
+            # Assinante desconectou
+            pass
+        finally:
+            difusor.cancelar(assinatura)
+
+    def _responder(self, status, conteudo):
+        corpo = json.dumps(conteudo, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def arquivo_token(porta=TRACKER_PORT):
+    """Caminho do arquivo com o token do serviço que escuta em ``porta``."""
+    return TRACKER_TOKEN_FILE.format(porta=porta)
+
+
+def _gravar_token(caminho, token):
+    """Grava o token em um arquivo novo, com permissão só para o usuário."""
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
+    descritor = os.open(caminho, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(descritor, "w", encoding="utf-8") as arquivo:
+        arquivo.write(token)
+
+
+def porta_ocupada(erro):
+    """True se o OSError de reservar()/iniciar() é de porta já em uso."""
+    return erro.errno in _ERROS_PORTA_OCUPADA
+
+
+class ServicoRastreador:
+    """
+    Expõe um RastreadorAtividade aos demais monitores da máquina.
+
+    Os ganchos ao_registrar e ao_mudar do rastreador passam a publicar
+    os eventos (e continuam chamando os ganchos originais). O loop do
+    rastreador continua com quem o hospeda: use parar_evento em
+    rastreador.executar() para atender ao POST /parar.
+
+    Uso com a porta reservada antes de criar os destinos:
+        servico = ServicoRastreador()
+        servico.reservar()               # OSError: outro monitor já hospeda
+        rastreador = RastreadorAtividade(...)
+        servico.iniciar(rastreador)
+
+    Args:
+        rastreador (RastreadorAtividade): Rastreador a expor (ou em iniciar())
+        agregados (AgregadosAtividade): Totais por aplicativo (opcional)
+        categorias (AgregadosAtividade): Totais por categoria (opcional)
+        endereco (str): Endereço de escuta
+        porta (int): Porta HTTP (0 escolhe uma livre)
+    """
+
+    def __init__(self, rastreador=None, agregados=None, categorias=None,
+                 endereco=TRACKER_ADDRESS, porta=TRACKER_PORT):
+        self.rastreador = rastreador
+        self.agregados = {"app": agregados, "categoria": categorias}
+        self.endereco = endereco
+        self.porta = porta
+        self.difusor = DifusorEventos()
+        self.parar_evento = threading.Event()
+        self.url = None
+        self.token = None
+        self._arquivo_token = None
+        self._servidor = None
+        self._thread = None
+        self._ganchos = None
+
+    def reservar(self):
+        """
+        Abre a porta, sem ainda atender: os outros monitores passam a vê-la ocupada.
+
+        As conexões que chegarem antes de iniciar() esperam na fila do socket.
+        Sorteia o token do POST /parar e o grava em arquivo_token(porta).
+
+        Raises:
+            OSError: Porta ocupada (outro monitor já hospeda o serviço)
+        """
+        if self._servidor is not None:
+            return
+        self._servidor = _ServidorLocal((self.endereco, self.porta), _ManipuladorServico)
+        self._servidor.servico = self
+        host, porta = self._servidor.server_address[:2]
+        self.url = f"http://{host}:{porta}"
+        self.token = secrets.token_hex(16)
+        self._arquivo_token = arquivo_token(porta)
+        try:
+            _gravar_token(self._arquivo_token, self.token)
+        except OSError as e:
+            # Sem o arquivo, só o POST /parar fica indisponível
+            print(f"Erro ao gravar o token do serviço em {self._arquivo_token}: {e}")
+            self._arquivo_token = None
+
+    def iniciar(self, rastreador=None, agregados=None, categorias=None):
+        """
+        Reserva a porta (se ainda não reservada) e passa a publicar os eventos do rastreador.
+
+        rastreador, agregados e categorias, se informados, substituem os do construtor.
+
+        Raises:
+            OSError: Porta ocupada (outro monitor já hospeda o serviço)
+        """
+        if rastreador is not None:
+            self.rastreador = rastreador
+        if agregados is not None:
+            self.agregados["app"] = agregados
+        if categorias is not None:
+            self.agregados["categoria"] = categorias
+        self.reservar()
+
+        rastreador = self.rastreador
+        self._ganchos = (rastreador.ao_registrar, rastreador.ao_mudar)
+        ao_registrar, ao_mudar = self._ganchos
+
+        def publicar_sessao(registro):
+            self.difusor.publicar("sessao", registro)
+            if ao_registrar is not None:
+                ao_registrar(registro)
+
+        def publicar_janela(janela, instante):
+            self.difusor.publicar("janela", {"janela": janela,
+                                             "processo": rastreador.processo_atual,
+                                             "instante": instante.isoformat()})
+            if ao_mudar is not None:
+                ao_mudar(janela, instante)
+
+        rastreador.ao_registrar = publicar_sessao
+        rastreador.ao_mudar = publicar_janela
+
+        self._thread = threading.Thread(target=self._servidor.serve_forever,
+                                        name="ServicoRastreador", daemon=True)
+        self._thread.start()
+
+    def parar(self, motivo=MOTIVO_ENCERRADO):
+        """
+        Avisa os assinantes ("fim", com o motivo), fecha a porta e devolve os ganchos.
+
+        Args:
+            motivo (str): MOTIVO_ENCERRADO (um assinante pode assumir) ou
+                          MOTIVO_PARADA (o monitoramento acaba para todos)
+        """
+        if self._servidor is None:
+            return
+        if self._thread is not None:
+            self.difusor.publicar("fim", {"motivo": motivo})
+            self._servidor.shutdown()
+            self._thread.join()
+            self._thread = None
+            self.rastreador.ao_registrar, self.rastreador.ao_mudar = self._ganchos
+        self._servidor.server_close()
+        self._servidor = None
+        self._remover_token()
+
+    def _remover_token(self):
+        """Apaga o arquivo do token, se ainda for o desta execução."""
+        if self._arquivo_token is None:
+            return
+        try:
+            with open(self._arquivo_token, encoding="utf-8") as arquivo:
+                if arquivo.read().strip() == self.token:
+                    os.remove(self._arquivo_token)
+        except OSError:
+            pass
+        self._arquivo_token = None
+
+    def estado(self):
+        """Janela atual e contadores do rastreador."""
+        rastreador = self.rastreador
+        inicio = rastreador.inicio_sessao
+        return {
+            "janela": rastreador.janela_atual,
+            "processo": rastreador.processo_atual,
+            "desde": inicio.isoformat() if inicio is not None else None,
+            "total_sessoes": rastreador.total_sessoes,
+            "total_amostras": rastreador.total_amostras,
+            "assinantes": self.difusor.assinantes,
+            "seq": self.difusor.seq,
+            "pid": os.getpid(),
+        }
+
+    def consultar_agregados(self, n=5, data=None, chave="app"):
+        """
+        Top de aplicativos ("app") ou de categorias ("categoria").
+
+        Raises:
+            KeyError: Chave desconhecida ou agregados não configurados
+        """
+        agregados = self.agregados[chave]
+        if agregados is None:
+            raise KeyError(f"agregados por {chave} não configurados")
+        return {"top": agregados.top(n, data=data), "sessoes": agregados.sessoes}
+
+
+# =============================================================================
+# CLIENTE
+# =============================================================================
+
+class ClienteRastreador:
+    """
+    Acesso ao serviço de um rastreador que já está rodando.
+
+    Args:
+        url (str): Endereço do serviço
+        timeout (float): Tempo máximo das consultas simples
+        token (str): Token do POST /parar (padrão: lido de arquivo_token())
+    """
+
+    def __init__(self, url=TRACKER_URL, timeout=TRACKER_TIMEOUT_SECONDS, token=None):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.token = token
+
+    def _ler_token(self):
+        if self.token is not None:
+            return self.token
+        porta = urllib.parse.urlsplit(self.url).port or TRACKER_PORT
+        with open(arquivo_token(porta), encoding="utf-8") as arquivo:
+            return arquivo.read().strip()
+
+    def _pedir(self, caminho, metodo="GET", cabecalhos=None, **parametros):
+        parametros = {k: v for k, v in parametros.items() if v is not None}
+        endereco = self.url + caminho
+        if parametros:
+            endereco += "?" + urllib.parse.urlencode(parametros)
+        pedido = urllib.request.Request(endereco, method=metodo, headers=cabecalhos or {},
+                                        data=b"" if metodo == "POST" else None)
+        with urllib.request.urlopen(pedido, timeout=self.timeout) as resposta:
+            return json.loads(resposta.read())
+
+    def aguardar(self, segundos=TRACKER_STARTUP_SECONDS):
+        """
+        Espera um serviço que acabou de reservar a porta começar a responder.
+
+        Returns:
+            bool: True se o serviço respondeu dentro do prazo
+        """
+        limite = time.monotonic() + segundos
+        while True:
+            if self.disponivel():
+                return True
+            if time.monotonic() >= limite:
+                return False
+            time.sleep(0.2)
+
+    def disponivel(self):
+        """True se há um serviço respondendo no endereço."""
+        try:
+            return bool(self._pedir("/saude").get("ok"))
+        except (OSError, ValueError):
+            return False
+
+    def estado(self):
+        return self._pedir("/estado")
+
+    def agregados(self, n=5, data=None, chave="app"):
+        """[(app, segundos), ...] em ordem decrescente."""
+        resposta = self._pedir("/agregados", n=n, chave=chave,
+                               data=data.isoformat() if data is not None else None)
+        return [tuple(item) for item in resposta["top"]]
+
+    def parar(self):
+        """
+        Pede ao monitor que hospeda o serviço que encerre o monitoramento.
+
+        Raises:
+            OSError: Token ilegível, serviço inacessível ou pedido recusado (403)
+        """
+        return self._pedir("/parar", metodo="POST", cabecalhos={TOKEN_HEADER: self._ler_token()})
+
+    def eventos(self, desde=None, parar_evento=None):
+        """
+        Eventos do serviço, à medida que acontecem.
+
+        Reconecta sozinho quando o serviço avisa que este assinante
+        atrasou. Termina no evento "fim", quando o serviço fecha a
+        conexão ou quando parar_evento é sinalizado (verificado ao menos
+        a cada EVENT_HEARTBEAT_SECONDS).
+
+        Args:
+            desde (int): Último seq já recebido (None = só eventos novos)
+            parar_evento (threading.Event): Encerra a assinatura
+
+        Yields:
+            dict: {"seq", "tipo", "dados"}
+
+        Raises:
+            OSError: Serviço inacessível
+        """
+        while True:
+            endereco = f"{self.url}/eventos"
+            if desde is not None:
+                endereco += f"?desde={desde}"
+            atrasado = False
+            with urllib.request.urlopen(endereco, timeout=EVENT_HEARTBEAT_SECONDS * 3) as resposta:
+                for linha in resposta:
+                    if parar_evento is not None and parar_evento.is_set():
+                        return
+                    evento = json.loads(linha)
+                    if evento["tipo"] == "ping":
+                        continue
+                    if evento["tipo"] == "atrasado":
+                        atrasado = True
+                        break
+                    desde = evento["seq"]
+                    yield evento
+                    if evento["tipo"] == "fim":
+                        return
+            if not atrasado:
+                return
+
+
+def descrever_evento(evento):
+    """Linha de texto de um evento, no formato dos logs do Meu_Dia."""
+    dados = evento.get("dados") or {}
+    if evento["tipo"] == "sessao":
+        return f"Log: {dados['application_or_url']} por {dados['duration_seconds']} segundos"
+    if evento["tipo"] == "janela":
+        return f"Ativo agora: {dados['janela']} em {dados['instante']}"
+    if evento["tipo"] == "fim":
+        if dados.get("motivo") == MOTIVO_PARADA:
+            return "Monitoramento parado a pedido (POST /parar)."
+        return "O monitor que hospedava o serviço foi encerrado."
+    return json.dumps(evento, ensure_ascii=False)
+
+
+# =============================================================================
+# LINHA DE COMANDO
+# =============================================================================
+
+def main():
+    """Consulta ou acompanha o rastreador que está rodando."""
+    parser = argparse.ArgumentParser(
+        description="Consulta o rastreador de atividade que já está rodando nesta máquina.")
+    parser.add_argument("--url", default=TRACKER_URL)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    sub.add_parser("estado", help="Janela atual e contadores")
+    sub.add_parser("seguir", help="Imprime os eventos à medida que acontecem")
+    top = sub.add_parser("top", help="Aplicativos (ou categorias) com mais tempo")
+    top.add_argument("-n", type=int, default=5)
+    top.add_argument("--hoje", action="store_true", help="Só o dia de hoje")
+    top.add_argument("--categorias", action="store_true")
+    sub.add_parser("parar", help="Encerra o monitoramento")
+    args = parser.parse_args()
+
+    cliente = ClienteRastreador(args.url)
+    if not cliente.disponivel():
+        parser.exit(1, f"Nenhum rastreador respondendo em {args.url}\n")
+
+    if args.comando == "estado":
+        for campo, valor in cliente.estado().items():
+            print(f"{campo}: {valor}")
+    elif args.comando == "seguir":
+        try:
+            for evento in cliente.eventos():
+                print(descrever_evento(evento))
+        except KeyboardInterrupt:
+            pass
+    elif args.comando == "top":
+        data = datetime.date.today() if args.hoje else None
+        chave = "categoria" if args.categorias else "app"
+        for posicao, (nome, segundos) in enumerate(cliente.agregados(args.n, data, chave), start=1):
+            print(f"{posicao}. {nome}: {segundos / 3600:.2f} horas")
+    elif args.comando == "parar":
+        try:
+            cliente.parar()
+        except OSError as e:
+            parser.exit(1, f"Parada recusada: {e}\n")
+        print("Parada solicitada.")
+
+
+if __name__ == "__main__":
+    main()